@@ -0,0 +1,95 @@
+# balance.py
+import time
+
+# default correction joints: joint -> sign of its offset per degree of body tilt.
+# Roll is corrected with the hips (left and right legs opposite), pitch with the
+# thighs (front and back legs opposite). Flip a sign if your build leans the wrong way.
+ROLL_JOINTS = {"fl_hip": 1.0, "bl_hip": 1.0, "fr_hip": -1.0, "br_hip": -1.0}
+PITCH_JOINTS = {"fl_thigh": 1.0, "fr_thigh": 1.0, "bl_thigh": -1.0, "br_thigh": -1.0}
+
+
+class BalanceStabilizer:
+    """
+    Per-tick correction stage for MotionEngine: reads body roll/pitch from an
+    ImuSampler (dog_hal) and offsets hip/thigh angles so the torso stays level.
+
+    PI control on each axis, with a deadband and a clamp on the total offset.
+    update() runs once per control tick; apply() adds the offsets to a frame.
+    The IMU read is ImuSampler.latest(), so the stage never blocks on the bus.
+    A stale sample (older than max_age) holds the last offsets.
+    """
+    def __init__(self, imu, kp=0.6, ki=0.0, deadband=0.5, max_correction=15.0, max_age=0.1,
+                 roll_joints=None, pitch_joints=None):
+        self.imu = imu
+        self.kp = kp
+        self.ki = ki
+        self.deadband = deadband
+        self.max_correction = max_correction
+        self.max_age = max_age
+        self.roll_joints = dict(ROLL_JOINTS if roll_joints is None else roll_joints)
+        self.pitch_joints = dict(PITCH_JOINTS if pitch_joints is None else pitch_joints)
+        self.joints = set(self.roll_joints) | set(self.pitch_joints)
+        self.enabled = True
+        self.reset()
+
+    def reset(self):
+        self._roll_i = 0.0
+        self._pitch_i = 0.0
+        self._roll_out = 0.0
+        self._pitch_out = 0.0
+        self._last_t = None
+        # offsets currently included in the commanded pose, per joint
+        self.applied = {nm: 0.0 for nm in self.joints}
+
+    def _axis(self, error, integ, dt):
+        if abs(error) < self.deadband:
+            error = 0.0
+        integ += error * dt
+        if self.ki:
+            # anti-windup: keep the integral term inside the output clamp
+            lim = self.max_correction / self.ki
+            integ = max(-lim, min(lim, integ))
+        out = -(self.kp * error + self.ki * integ)
+        return max(-self.max_correction, min(self.max_correction, out)), integ
+
+    def update(self):
+        """Recompute roll/pitch corrections from the latest IMU sample."""
+        if not self.enabled:
+            self._roll_out = self._pitch_out = 0.0
+            return
+        sample = self.imu.latest()
+        now = time.monotonic()
+        if sample is None or now - sample.t > self.max_age:
+            return
+        dt = 0.0 if self._last_t is None else sample.t - self._last_t
+        if dt < 0.0 or (self._last_t is not None and dt == 0.0):
+            return
+        self._last_t = sample.t
+        self._roll_out, self._roll_i = self._axis(sample.roll, self._roll_i, dt)
+        self._pitch_out, self._pitch_i = self._axis(sample.pitch, self._pitch_i, dt)
+
+    def offset(self, name):
+        """Current correction (deg) for one joint."""
+        off = self.roll_joints.get(name, 0.0) * self._roll_out + self.pitch_joints.get(name, 0.0) * self._pitch_out
+        return max(-self.max_correction, min(self.max_correction, off))
+
+    def nominal(self, name, value):
+        """Commanded angle with the last applied correction removed."""
+        return value - self.applied.get(name, 0.0)
+
+    def columns(self, names):
+        """Positions of the correction joints within a frame's `names`."""
+        return [(c, nm) for c, nm in enumerate(names) if nm in self.joints]
+
+    def apply(self, values, columns):
+        """Copy of the frame `values` (list or numpy array) with corrections added at `columns`."""
+        out = values.copy() if hasattr(values, "copy") else list(values)
+        for c, nm in columns:
+            off = self.offset(nm)
+            out[c] = out[c] + off
+            self.applied[nm] = off
+        return out
+
+    def state(self):
+        return {"roll_correction": self._roll_out, "pitch_correction": self._pitch_out,
+                "enabled": self.enabled}
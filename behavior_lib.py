@@ -0,0 +1,260 @@
+# behavior_lib.py
+# Compiled behavior library: behaviors.json + dog_sequences.py -> one binary
+# file that BehaviorManager memory-maps and decodes one behavior at a time.
+#
+#   python behavior_lib.py --json behaviors.json --sequences dog_sequences \
+#       --servo-map servo_map_dog.json -o behaviors.rdbl
+#   BehaviorManager(engine, behaviors_path="behaviors.rdbl")
+import argparse
+import importlib
+import json
+import math
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+
+# file layout (little endian):
+#   header: magic, format version, joint count, behavior count, index size (bytes)
+#   joints: u32 length + JSON list of servo names (column order of every keyframe)
+#   index:  per behavior, sorted by name: data offset u32, keyframes u32, name length u16, name utf-8
+#   data:   per behavior: n f32 durations, then n * joints f32 angles (NaN = joint not set in that keyframe)
+_MAGIC = b"RDBL"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHII")
+_LEN = struct.Struct("<I")
+_ENTRY = struct.Struct("<IIH")
+_DEFAULT_STEP = 1.0  # BehaviorManager's default step duration for behaviors.json
+
+
+class BehaviorLibraryError(Exception):
+    pass
+
+
+# --- sources ---
+def behaviors_from_json(path):
+    """behaviors.json ({"name": {"sequence": [{"target_positions", "duration"}]}}) -> {name: keyframes}."""
+    with open(path, "r") as f:
+        data = json.load(f)
+    out = {}
+    for name, behavior in data.items():
+        out[name] = [{"duration": step.get("duration", _DEFAULT_STEP), "pose": step.get("target_positions", {})}
+                     for step in behavior.get("sequence", [])]
+    return out
+
+
+def behaviors_from_module(module):
+    """Module-level keyframe lists ([{"duration", "pose"}], as in dog_sequences.py) -> {name: keyframes}."""
+    if isinstance(module, str):
+        module = importlib.import_module(module)
+    out = {}
+    for name, value in vars(module).items():
+        if name.startswith("_") or not isinstance(value, list) or not value:
+            continue
+        if all(isinstance(kf, dict) and "pose" in kf for kf in value):
+            out[name] = [dict(kf) for kf in value]
+    return out
+
+
+def servo_limits(servo_map_path):
+    """(servo names in map order, {name: (lo, hi)}) with the same angle clamp as ServoController."""
+    with open(servo_map_path, "r") as f:
+        servos = json.load(f)["servos"]
+    names = [s["name"] for s in servos]
+    limits = {s["name"]: (s["angle_min"] - s.get("offset", 0), s["angle_max"] - s.get("offset", 0)) for s in servos}
+    return names, limits
+
+
+# --- conversion ---
+def validate(behaviors, names, limits=None, name_mapping=None):
+    """
+    Check every keyframe against the servo map. Returns (behaviors with mapped
+    joint names, errors, warnings); unknown joints, unsupported keyframe fields
+    and bad numbers are errors, angles the servo would clamp are warnings.
+    """
+    known = set(names)
+    mapping = name_mapping or {}
+    errors, warnings = [], []
+    out = {}
+    for bname, keyframes in behaviors.items():
+        if len(bname.encode()) > 0xFFFF:
+            errors.append(f"{bname[:40]}...: name too long")
+            continue
+        mapped = []
+        for k, kf in enumerate(keyframes):
+            where = f"{bname}[{k}]"
+            extra = set(kf) - {"duration", "pose"}
+            if extra:
+                errors.append(f"{where}: unsupported keyframe fields {sorted(extra)}")
+            duration = kf.get("duration", 0.5)
+            if not isinstance(duration, (int, float)) or not math.isfinite(duration) or duration < 0:
+                errors.append(f"{where}: bad duration {duration!r}")
+                duration = 0.0
+            pose = {}
+            for joint, angle in kf.get("pose", {}).items():
+                joint = mapping.get(joint, joint)
+                if joint not in known:
+                    errors.append(f"{where}: unknown servo {joint}")
+                    continue
+                if not isinstance(angle, (int, float)) or not math.isfinite(angle):
+                    errors.append(f"{where}: bad angle {angle!r} for {joint}")
+                    continue
+                if limits is not None:
+                    lo, hi = limits[joint]
+                    if not lo <= angle <= hi:
+                        warnings.append(f"{where}: {joint}={angle} outside {lo}..{hi}, will be clamped")
+                pose[joint] = angle
+            mapped.append({"duration": duration, "pose": pose})
+        out[bname] = mapped
+    return out, errors, warnings
+
+
+def write_library(path, behaviors, names):
+    """
+    Write already validated {name: keyframes} with `names` as the joint columns.
+    The file is replaced atomically, so a library mapped by a running process keeps
+    its old contents until it is reloaded.
+    """
+    column = {nm: c for c, nm in enumerate(names)}
+    n_joints = len(names)
+    joints = json.dumps(list(names)).encode()
+    order = sorted(behaviors)
+    index_size = sum(_ENTRY.size + len(nm.encode()) for nm in order)
+    offset = _HEADER.size + _LEN.size + len(joints) + index_size
+    offset += -offset % 4
+    data_start = offset
+    entries, blocks = [], []
+    for nm in order:
+        keyframes = behaviors[nm]
+        row = [math.nan] * n_joints
+        values = [kf["duration"] for kf in keyframes]
+        for kf in keyframes:
+            frame = list(row)
+            for joint, angle in kf["pose"].items():
+                frame[column[joint]] = angle
+            values.extend(frame)
+        block = struct.pack(f"<{len(values)}f", *values)
+        entries.append((nm, offset, len(keyframes)))
+        blocks.append(block)
+        offset += len(block)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, n_joints, len(order), index_size))
+        f.write(_LEN.pack(len(joints)) + joints)
+        for nm, off, n in entries:
+            raw = nm.encode()
+            f.write(_ENTRY.pack(off, n, len(raw)) + raw)
+        f.write(b"\0" * (data_start - f.tell()))
+        for block in blocks:
+            f.write(block)
+    os.replace(tmp, path)
+    return offset
+
+
+def convert(output, servo_map, json_path=None, sequences=None, name_mapping=None):
+    """
+    Build a library from behaviors.json and/or a sequences module (behaviors.json
+    wins on duplicate names). Raises BehaviorLibraryError listing every problem;
+    returns {"behaviors", "keyframes", "bytes", "warnings", "skipped"}.
+    """
+    names, limits = servo_limits(servo_map)
+    behaviors = behaviors_from_json(json_path) if json_path else {}
+    skipped = []
+    if sequences:
+        for nm, keyframes in behaviors_from_module(sequences).items():
+            if nm in behaviors:
+                skipped.append(nm)
+            else:
+                behaviors[nm] = keyframes
+    behaviors, errors, warnings = validate(behaviors, names, limits, name_mapping)
+    if errors:
+        raise BehaviorLibraryError("invalid behaviors:\n  " + "\n  ".join(errors))
+    size = write_library(output, behaviors, names)
+    return {"behaviors": len(behaviors), "keyframes": sum(len(k) for k in behaviors.values()),
+            "bytes": size, "warnings": warnings, "skipped": skipped}
+
+
+# --- runtime ---
+class BehaviorLibrary(Mapping):
+    """
+    Read-only {name: keyframes} view of a compiled library file.
+
+    Opening maps the file and reads only the header and index; a behavior's
+    keyframes are decoded from the mapping when it is looked up (callers
+    cache the result). Joint names were validated at conversion, so nothing
+    is checked here. Values are stored as float32 and rounded to 1e-4 on
+    decode.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mm
+        if len(mm) < _HEADER.size:
+            raise BehaviorLibraryError(f"{path}: not a behavior library")
+        magic, version, n_joints, n_behaviors, index_size = _HEADER.unpack_from(mm, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise BehaviorLibraryError(f"{path}: not a behavior library (or unsupported version)")
+        length = _LEN.unpack_from(mm, _HEADER.size)[0]
+        o = _HEADER.size + _LEN.size
+        self.joints = json.loads(mm[o:o + length])
+        o += length
+        self._index = {}
+        for _ in range(n_behaviors):
+            offset, n, name_len = _ENTRY.unpack_from(mm, o)
+            o += _ENTRY.size
+            self._index[mm[o:o + name_len].decode()] = (offset, n)
+            o += name_len
+        self._n_joints = n_joints
+
+    def __getitem__(self, name):
+        offset, n = self._index[name]
+        joints = self.joints
+        nj = self._n_joints
+        values = struct.unpack_from(f"<{n + n * nj}f", self._mm, offset)
+        keyframes = []
+        for k in range(n):
+            row = values[n + k * nj:n + (k + 1) * nj]
+            pose = {joints[c]: round(v, 4) for c, v in enumerate(row) if v == v}
+            keyframes.append({"duration": round(values[k], 4), "pose": pose})
+        return keyframes
+
+    def raw(self, name):
+        """Encoded keyframes of `name` (for cheap change detection)."""
+        offset, n = self._index[name]
+        return self._mm[offset:offset + 4 * (n + n * self._n_joints)]
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def close(self):
+        self._mm.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile behaviors into a binary behavior library")
+    parser.add_argument("--json", default="behaviors.json", help="behaviors.json ('' to skip)")
+    parser.add_argument("--sequences", default="dog_sequences", help="module with keyframe lists ('' to skip)")
+    parser.add_argument("--servo-map", default="servo_map_dog.json")
+    parser.add_argument("-o", "--output", default="behaviors.rdbl")
+    args = parser.parse_args()
+    try:
+        result = convert(args.output, args.servo_map, args.json or None, args.sequences or None)
+    except BehaviorLibraryError as e:
+        raise SystemExit(f"[BehaviorLib] {e}")
+    for w in result["warnings"]:
+        print(f"[BehaviorLib] Warning: {w}")
+    if result["skipped"]:
+        print(f"[BehaviorLib] Kept behaviors.json version of: {', '.join(result['skipped'])}")
+    print(f"[BehaviorLib] Wrote {args.output}: {result['behaviors']} behaviors, "
+          f"{result['keyframes']} keyframes, {result['bytes']} bytes")
+
+
+if __name__ == "__main__":
+    main()
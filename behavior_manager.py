@@ -1,11 +1,18 @@
 from motion_engine import MotionGoal
+from behavior_lib import BehaviorLibrary, BehaviorLibraryError, validate
+import threading
 import uuid
 import json
 
 class BehaviorManager:
     def __init__(self, motion_engine, behaviors_path="behaviors.json"):
         self.motion_engine = motion_engine
+        self.behaviors_path = behaviors_path
         self.behaviors = self._load_behaviors(behaviors_path)
+        # behavior name -> keyframe list in MotionGoal form, built on first use
+        self._compiled = {}
+        # held while a library is decoded or swapped, so a replaced mapping isn't closed mid-read
+        self._swap_lock = threading.Lock()
         # Map from behaviors.json names to servo_map.json names (if needed)
         self.servo_name_mapping = {
             # Example: "front_left_hip": "fl_hip", etc. Add more if needed
@@ -17,16 +24,66 @@ class BehaviorManager:
             "wave_paw": {"fl_hip": 30, "fl_knee": 45},
         }
 
+    def _read_behaviors(self, path):
+        if path.endswith(".rdbl"):
+            # compiled library (behavior_lib.py): mapped now, behaviors decoded on first use
+            return BehaviorLibrary(path)
+        with open(path, 'r') as f:
+            return json.load(f)
+
     def _load_behaviors(self, path):
         try:
-            with open(path, 'r') as f:
-                return json.load(f)
+            return self._read_behaviors(path)
         except FileNotFoundError:
             print(f"[BehaviorManager] Warning: {path} not found, using default behaviors")
             return {}
         except json.JSONDecodeError as e:
             print(f"[BehaviorManager] Error parsing {path}: {e}")
             return {}
+        except BehaviorLibraryError as e:
+            print(f"[BehaviorManager] Error loading {path}: {e}")
+            return {}
+
+    def reload_behaviors(self, path=None):
+        """
+        Re-read the behaviors file (default: the one loaded at startup) on the calling
+        thread and swap it in. Only behaviors whose definition changed (or that were
+        removed) lose their compiled keyframes and cached trajectories; goals already
+        queued keep the keyframes they were pushed with. A file that doesn't parse or
+        names unknown servos is rejected and the old behaviors stay. A replaced .rdbl
+        library is closed (unmapped) once the new one is in place.
+        Returns the names of changed / added / removed behaviors, or None if rejected.
+        """
+        path = path or self.behaviors_path
+        try:
+            new = self._read_behaviors(path)
+            if not isinstance(new, BehaviorLibrary):
+                # a library was validated by its converter; check JSON here, not at run time
+                poses = {nm: self._behavior_poses(b) for nm, b in new.items()}
+                errors = validate(poses, self.motion_engine.servo.servo_names)[1]
+                if errors:
+                    raise ValueError("; ".join(errors))
+        except Exception as e:
+            print(f"[BehaviorManager] Reload of {path} rejected: {e}")
+            return None
+        with self._swap_lock:
+            old = self.behaviors
+            changed = [nm for nm in set(old) | set(new)
+                       if nm not in old or nm not in new or self._definition(old, nm) != self._definition(new, nm)]
+            self.behaviors = new
+            self.behaviors_path = path
+            for nm in changed:
+                self._compiled.pop(nm, None)
+                self.motion_engine.invalidate_cache_key(f"behavior:{nm}")
+            if isinstance(old, BehaviorLibrary) and old is not new:
+                old.close()  # compiled keyframes are plain lists, nothing still points into the mapping
+        return sorted(changed)
+
+    @staticmethod
+    def _definition(behaviors, name):
+        if isinstance(behaviors, BehaviorLibrary):
+            return ("rdbl", behaviors.joints, behaviors.raw(name))
+        return ("json", behaviors[name])
 
     def _map_servo_names(self, target_positions):
         mapped = {}
@@ -35,26 +92,45 @@ class BehaviorManager:
             mapped[mapped_name] = angle
         return mapped
 
+    def _compile_behavior(self, behavior_name):
+        poses = self._compiled.get(behavior_name)
+        if poses is not None:
+            return poses
+        with self._swap_lock:
+            behaviors = self.behaviors
+            behavior = behaviors[behavior_name]
+            if isinstance(behaviors, BehaviorLibrary):
+                # keyframes already in MotionGoal form, joint names resolved by the converter
+                poses = behavior
+            else:
+                poses = self._behavior_poses(behavior)
+            self._compiled[behavior_name] = poses
+        return poses
+
+    def _behavior_poses(self, behavior):
+        poses = []
+        for step in behavior.get("sequence", []):
+            target_positions = step.get("target_positions", {})
+            duration = step.get("duration", 1.0)
+            mapped_pose = self._map_servo_names(target_positions)
+            poses.append({"duration": duration, "pose": mapped_pose})
+        return poses
+
     def execute_behavior(self, behavior_name, priority=5):
         if behavior_name not in self.behaviors:
             print(f"[BehaviorManager] Unknown behavior: {behavior_name}")
             return None
-        behavior = self.behaviors[behavior_name]
-        sequence = behavior.get("sequence", [])
-        if not sequence:
+        poses = self._compile_behavior(behavior_name)
+        if not poses:
             print(f"[BehaviorManager] Empty sequence for behavior: {behavior_name}")
             return None
-        poses = []
-        for step in sequence:
-            target_positions = step.get("target_positions", {})
-            duration = step.get("duration", 1.0)
-            mapped_pose = self._map_servo_names(target_positions)
-            poses.append({"duration": duration, "pose": mapped_pose})
+        # the engine caches the sampled PWM trajectory under this key
         goal = MotionGoal(
             goal_id=str(uuid.uuid4()),
             action="sequence",
             poses=poses,
             priority=priority,
+            cache_key=f"behavior:{behavior_name}",
         )
         print(f"[BehaviorManager] Executing behavior: {behavior_name} with {len(poses)} steps")
         return self.motion_engine.push_goal(goal)
@@ -0,0 +1,69 @@
+# bench_interp.py
+# Ticks/sec of the MotionEngine interpolation + angle->PWM + write path,
+# per-joint dicts vs fixed-order pose arrays, for 12 and 24 joints.
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+from servo_controller import ServoController, load_numpy
+from trajectory import KeyframeCurve
+
+np = load_numpy()
+
+SERVO_MAP_PATH = "servo_map_dog.json"
+
+
+def make_servo_map(n_joints, path):
+    """Servo map with n_joints servos (the dog's 12 repeated across boards 0x40, 0x41, ...)."""
+    with open(SERVO_MAP_PATH, "r") as f:
+        base = json.load(f)["servos"]
+    servos = []
+    for i in range(n_joints):
+        cfg = dict(base[i % len(base)])
+        board = i // len(base)
+        cfg["name"] = f"{cfg['name']}_{board}" if board else cfg["name"]
+        cfg["board_addr"] = f"0x{0x40 + board:02x}"
+        servos.append(cfg)
+    with open(path, "w") as f:
+        json.dump({"servos": servos}, f)
+
+
+def bench(servo, vectorized, write_bus=True, ticks=3000):
+    """Same per-tick work as MotionEngine._execute_sequence, without the sleeps."""
+    names = servo.servo_names
+    poses = [{"duration": 1.0, "pose": {nm: 120.0 for nm in names}}]
+    curve = KeyframeCurve(names, poses, [20.0] * len(names), vectorized=vectorized)
+    if vectorized:
+        write = servo.set_pose_array if write_bus else servo.pwm12_array
+    else:
+        index, pwm12_at = servo._servo_index, servo._pwm12_at
+        if write_bus:
+            write = lambda values: servo.set_pose(dict(zip(names, values)))
+        else:
+            write = lambda values: [pwm12_at(index[nm], ang) for nm, ang in dict(zip(names, values)).items()]
+    start = time.perf_counter()
+    for i in range(ticks):
+        write(curve.sample((i % 100) / 100.0))
+    return ticks / (time.perf_counter() - start)
+
+
+def main():
+    print(f"numpy: {'yes' if np is not None else 'no (pure Python fallback)'}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_joints in (12, 24):
+            path = os.path.join(tmp, f"map_{n_joints}.json")
+            make_servo_map(n_joints, path)
+            # keep the constructor's startup logging out of the output
+            with contextlib.redirect_stdout(io.StringIO()):
+                servo = ServoController(path, simulate_if_no_hw=True)
+                rows = [(label, bench(servo, False, write_bus), bench(servo, True, write_bus))
+                        for label, write_bus in (("interp+convert", False), ("interp+convert+write", True))]
+            for label, dict_tps, array_tps in rows:
+                print(f"{n_joints:2d} joints {label:22s} dict {dict_tps:9.0f} ticks/s   array {array_tps:9.0f} ticks/s")
+
+
+if __name__ == "__main__":
+    main()
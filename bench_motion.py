@@ -0,0 +1,225 @@
+# bench_motion.py
+# Simulation-only performance suite for the servo / motion stack.
+#
+#   python bench_motion.py                    # run, print results as JSON
+#   python bench_motion.py --save-baseline    # run and store as bench_baseline.json
+#   python bench_motion.py --check            # run, compare to the baseline, exit 1 on regression
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import time
+
+from behavior_manager import BehaviorManager
+from motion_engine import MotionEngine, MotionGoal, TERMINAL_STATES
+from servo_controller import ServoController, load_numpy
+from trajectory import compile_sequence
+
+np = load_numpy()
+
+SERVO_MAP_PATH = "servo_map_dog.json"
+BEHAVIORS_PATH = "behaviors.json"
+BASELINE_PATH = "bench_baseline.json"
+CONTROL_RATES = (30, 100, 250)
+
+# metric -> (better direction, absolute slack added to the relative tolerance).
+# Timing metrics on a loaded machine wobble by a fixed amount no matter how
+# small the baseline is, so they get some absolute room as well.
+METRICS = {
+    "angle_to_pwm12_per_s": ("higher", 0.0),
+    "set_pose_frames_per_s": ("higher", 0.0),
+    "first_write_latency_ms": ("lower", 1.0),
+    "cancel_goal_us": ("lower", 5.0),
+    "behavior_compile_ms": ("lower", 0.05),
+}
+for _hz in CONTROL_RATES:
+    METRICS[f"tick_{_hz}hz_jitter_mean_ms"] = ("lower", 0.5)
+    METRICS[f"tick_{_hz}hz_jitter_max_ms"] = ("lower", 5.0)
+    METRICS[f"tick_{_hz}hz_overrun_rate"] = ("lower", 0.05)
+
+
+def _quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def _wait(engine, goal_id, timeout=30.0):
+    end = time.monotonic() + timeout
+    while engine.get_status(goal_id) not in TERMINAL_STATES and time.monotonic() < end:
+        time.sleep(0.005)
+
+
+def bench_angle_to_pwm12(servo, n=200_000):
+    cfgs = list(servo.servos.values())
+    convert = servo._angle_to_pwm12
+    start = time.perf_counter()
+    for i in range(n):
+        convert(float(i % 180), cfgs[i % len(cfgs)])
+    return n / (time.perf_counter() - start)
+
+
+def bench_set_pose(servo, n=5_000):
+    # alternate two full poses so every frame really changes every channel
+    a = {nm: cfg["angle_min"] + 10 for nm, cfg in servo.servos.items()}
+    b = {nm: cfg["angle_max"] - 10 for nm, cfg in servo.servos.items()}
+    start = time.perf_counter()
+    for i in range(n):
+        servo.set_pose(a if i & 1 else b)
+    return n / (time.perf_counter() - start)
+
+
+def bench_ticks(servo, control_hz, seconds=1.0):
+    """Jitter / overrun rate of the live tick loop at control_hz."""
+    engine = MotionEngine(servo, control_hz=control_hz, limit_velocity=False)
+    try:
+        lo = {nm: cfg["angle_min"] + 10 for nm, cfg in servo.servos.items()}
+        hi = {nm: cfg["angle_max"] - 10 for nm, cfg in servo.servos.items()}
+        goal = engine.push_goal(MotionGoal("ticks", "sequence", [{"duration": seconds / 2, "pose": hi},
+                                                                 {"duration": seconds / 2, "pose": lo}]))
+        _wait(engine, goal)
+        stats = engine.get_timing_stats()
+    finally:
+        engine.stop()
+    ticks = max(1, stats["ticks"])
+    return {
+        f"tick_{control_hz}hz_jitter_mean_ms": stats["jitter_mean"] * 1e3,
+        f"tick_{control_hz}hz_jitter_max_ms": stats["jitter_max"] * 1e3,
+        f"tick_{control_hz}hz_overrun_rate": stats["overruns"] / ticks,
+    }
+
+
+def bench_first_write(servo, n=20):
+    """push_goal -> first servo write on an idle engine, mean over n goals."""
+    engine = MotionEngine(servo, control_hz=100, limit_velocity=False)
+    try:
+        for i in range(n):
+            angle = 80.0 if i & 1 else 100.0
+            goal = engine.push_goal(MotionGoal(f"latency{i}", "pose", [{"duration": 0.01, "pose": {"fl_hip": angle}}]))
+            _wait(engine, goal)
+            time.sleep(0.01)
+        return engine.get_timing_stats()["first_write_latency_mean"] * 1e3
+    finally:
+        engine.stop()
+
+
+def bench_cancel(servo, depth=5_000):
+    """Mean cancel_goal() cost with `depth` goals queued behind a long-running one."""
+    engine = MotionEngine(servo, control_hz=30, limit_velocity=False)
+    try:
+        busy = engine.push_goal(MotionGoal("busy", "pose", [{"duration": 60.0, "pose": {"fl_hip": 100.0}}], priority=10))
+        while engine.get_status(busy) != "ACTIVE":
+            time.sleep(0.001)
+        ids = [engine.push_goal(MotionGoal(f"q{i}", "pose", [{"duration": 0.1, "pose": {"fl_hip": 90.0}}],
+                                           priority=i % 7)) for i in range(depth)]
+        # cancel from the middle outward, so neither heap end is favoured
+        order = ids[depth // 2:] + ids[:depth // 2]
+        start = time.perf_counter()
+        for goal_id in order:
+            engine.cancel_goal(goal_id)
+        elapsed = time.perf_counter() - start
+        engine.cancel_goal(busy)
+        return elapsed / depth * 1e6
+    finally:
+        engine.stop()
+
+
+def bench_behavior_compile(servo, repeat=50):
+    """Behavior JSON -> keyframes -> sampled PWM table (uncached), mean ms per behavior."""
+    engine = MotionEngine(servo, control_hz=50)
+    try:
+        manager = _quiet(BehaviorManager, engine, behaviors_path=BEHAVIORS_PATH)
+        start_pose = servo.get_current_pose()
+        names = list(manager.behaviors)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            manager._compiled.clear()
+            for name in names:
+                poses = manager._compile_behavior(name)
+                if poses:
+                    compile_sequence(servo, poses, start_pose, engine.control_hz)
+        return (time.perf_counter() - start) / (repeat * max(1, len(names))) * 1e3
+    finally:
+        engine.stop()
+
+
+def run(quick=False):
+    servo = _quiet(ServoController, SERVO_MAP_PATH, simulate_if_no_hw=True)
+    scale = 0.2 if quick else 1.0
+    results = {
+        "angle_to_pwm12_per_s": bench_angle_to_pwm12(servo, int(200_000 * scale)),
+        "set_pose_frames_per_s": bench_set_pose(servo, int(5_000 * scale)),
+    }
+    for hz in CONTROL_RATES:
+        results.update(bench_ticks(servo, hz, seconds=0.5 if quick else 1.0))
+    results["first_write_latency_ms"] = bench_first_write(servo, 10 if quick else 20)
+    results["cancel_goal_us"] = bench_cancel(servo, 1_000 if quick else 5_000)
+    results["behavior_compile_ms"] = bench_behavior_compile(servo, 10 if quick else 50)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "numpy": np is not None,
+            "timestamp": time.time(),
+        },
+        "results": results,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """[(metric, value, baseline, limit, ok)] for every metric present in both."""
+    rows = []
+    for metric, (better, slack) in METRICS.items():
+        if metric not in results or metric not in baseline:
+            continue
+        value, base = results[metric], baseline[metric]
+        if better == "higher":
+            limit = base * (1.0 - tolerance) - slack
+            ok = value >= limit
+        else:
+            limit = base * (1.0 + tolerance) + slack
+            ok = value <= limit
+        rows.append((metric, value, base, limit, ok))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RoboDog motion benchmarks (simulation)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--check", action="store_true", help="fail (exit 1) on a regression vs the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown (default 0.25)")
+    parser.add_argument("--quick", action="store_true", help="shorter runs, noisier numbers")
+    parser.add_argument("--output", help="also write the results JSON here")
+    args = parser.parse_args()
+
+    report = run(quick=args.quick)
+    if args.check:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)["results"]
+        rows = compare(report["results"], baseline, args.tolerance)
+        report["check"] = {
+            "baseline": args.baseline,
+            "tolerance": args.tolerance,
+            "passed": all(ok for *_, ok in rows),
+            "regressions": [{"metric": m, "value": v, "baseline": b, "limit": lim}
+                            for m, v, b, lim, ok in rows if not ok],
+        }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(text + "\n")
+    if args.check and not report["check"]["passed"]:
+        for reg in report["check"]["regressions"]:
+            print(f"REGRESSION {reg['metric']}: {reg['value']:.4g} (baseline {reg['baseline']:.4g},"
+                  f" limit {reg['limit']:.4g})", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
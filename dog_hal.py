@@ -1,60 +1,289 @@
 # dog_hal.py
+import sys
 import time
-from servo_controller import ServoController
+_import_start = time.perf_counter()  # module import is the first startup phase (see startup_times)
+# if not, its import is part of this module's and isn't reported separately
+_servo_preloaded = "servo_controller" in sys.modules
+import math
+import random
+import threading
+from array import array
+from collections import namedtuple
 
-# Optional: use any IMU library (example: MPU6050)
-try:
-    from mpu6050 import mpu6050
-    _HAS_IMU = True
-except Exception:
-    _HAS_IMU = False
+from servo_controller import ServoController, startup_report
+from scheduler import TickScheduler
+
+# Optional: use any IMU library (example: MPU6050), imported on first use (see _load_imu)
+_imu_driver = None
+
+
+def _load_imu():
+    """The mpu6050 class if the library imports, else None (cached)."""
+    global _imu_driver
+    if _imu_driver is None:
+        try:
+            from mpu6050 import mpu6050
+            _imu_driver = mpu6050
+        except Exception:
+            _imu_driver = False
+    return _imu_driver or None
+
+
+GRAVITY = 9.80665
+
+# one fused IMU sample: accel m/s^2, gyro deg/s, temp °C, roll/pitch/yaw deg
+ImuSample = namedtuple("ImuSample", "t ax ay az gx gy gz temp roll pitch yaw")
+_IMU_FIELDS = len(ImuSample._fields)
 
 
 class GyroSensor:
     """
     Wrapper around an IMU (gyro + accel).
-    Falls back to simulation if hardware not available.
+    Falls back to simulation if hardware not available and simulate_if_no_hw
+    is set; otherwise a missing library or a failed init raises.
     """
     def __init__(self, i2c_addr=0x68, simulate_if_no_hw=True):
-        self.simulate = simulate_if_no_hw or not _HAS_IMU
-        if not self.simulate and _HAS_IMU:
+        driver = _load_imu()
+        if driver is None and not simulate_if_no_hw:
+            raise RuntimeError("IMU library (mpu6050) is not available")
+        self.simulate = driver is None
+        self._sim_t0 = time.monotonic()
+        self._disturbance = None  # (roll, pitch, until) injected in simulation
+        if not self.simulate:
             try:
-                self.sensor = mpu6050(i2c_addr)
+                self.sensor = driver(i2c_addr)
                 print("[HAL] GyroSensor initialized (hardware mode)")
             except Exception as e:
+                if not simulate_if_no_hw:
+                    raise
                 print(f"[HAL] Gyro init failed: {e}, switching to simulation")
                 self.simulate = True
         if self.simulate:
             print("[HAL] GyroSensor initialized (simulation mode)")
 
+    def inject_tilt(self, roll_deg, pitch_deg, duration_s=None):
+        """Simulation only: add a body tilt (deg) on top of the sway, for duration_s or until cleared."""
+        until = None if duration_s is None else time.monotonic() + duration_s
+        self._disturbance = (roll_deg, pitch_deg, until)
+
+    def clear_tilt(self):
+        self._disturbance = None
+
+    def _sim_angles(self, t):
+        """Simulated body roll/pitch (deg): a slow sway, like a dog standing still, plus injected tilt."""
+        roll = 0.8 * math.sin(2 * math.pi * 0.3 * t)
+        pitch = 0.5 * math.sin(2 * math.pi * 0.2 * t + 1.0)
+        dist = self._disturbance
+        if dist is not None:
+            if dist[2] is not None and self._sim_t0 + t > dist[2]:
+                self._disturbance = None
+            else:
+                roll += dist[0]
+                pitch += dist[1]
+        return roll, pitch
+
+    def read_motion(self):
+        """
+        One accel + gyro read: (ax, ay, az, gx, gy, gz) in m/s^2 and deg/s.
+        In simulation mode the data follows _sim_angles with sensor noise.
+        """
+        if not self.simulate:
+            a = self.sensor.get_accel_data()
+            g = self.sensor.get_gyro_data()
+            return a["x"], a["y"], a["z"], g["x"], g["y"], g["z"]
+        t = time.monotonic() - self._sim_t0
+        dt = 1e-3
+        roll, pitch = self._sim_angles(t)
+        roll2, pitch2 = self._sim_angles(t + dt)
+        r, p = math.radians(roll), math.radians(pitch)
+        noise = random.gauss
+        return (-GRAVITY * math.sin(p) + noise(0.0, 0.05),
+                GRAVITY * math.sin(r) * math.cos(p) + noise(0.0, 0.05),
+                GRAVITY * math.cos(r) * math.cos(p) + noise(0.0, 0.05),
+                (roll2 - roll) / dt + noise(0.0, 0.1),
+                (pitch2 - pitch) / dt + noise(0.0, 0.1),
+                noise(0.0, 0.1))
+
+    def read_temp(self):
+        if self.simulate:
+            return 25.0
+        return self.sensor.get_temp()
+
     def read_orientation(self):
         """
         Returns dict with accel (m/s^2), gyro (deg/s), temp (°C).
-        In simulation mode, returns dummy values.
+        In simulation mode, returns synthetic values (see read_motion).
         """
-        if self.simulate:
-            return {
-                "accel": {"x": 0.0, "y": 0.0, "z": 9.8},
-                "gyro": {"x": 0.0, "y": 0.0, "z": 0.0},
-                "temp": 25.0
-            }
+        ax, ay, az, gx, gy, gz = self.read_motion()
         return {
-            "accel": self.sensor.get_accel_data(),
-            "gyro": self.sensor.get_gyro_data(),
-            "temp": self.sensor.get_temp()
+            "accel": {"x": ax, "y": ay, "z": az},
+            "gyro": {"x": gx, "y": gy, "z": gz},
+            "temp": self.read_temp()
         }
 
 
+class ImuSampler:
+    """
+    Background thread reading a GyroSensor at a fixed rate into a preallocated
+    ring buffer of ImuSample rows, with a complementary filter keeping
+    roll/pitch (accel-corrected) and yaw (gyro-integrated, drifts) current.
+
+    The sampler thread is the only writer. A sample is published by bumping
+    the sample count after its row is written, so readers never take a lock
+    or touch the bus.
+    """
+    def __init__(self, sensor, rate_hz=100, capacity=512, alpha=0.98, temp_every_s=1.0, instrumentation=None):
+        self.sensor = sensor
+        # optional metrics.Instrumentation: "imu_read" latency, "imu_tick" lateness
+        self.instrumentation = instrumentation
+        self.rate_hz = rate_hz
+        self.capacity = capacity
+        self.alpha = alpha
+        self._temp_every = max(1, int(rate_hz * temp_every_s))
+        self._buf = array("d", bytes(8 * _IMU_FIELDS * capacity))
+        self._count = 0
+        self.read_errors = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    def _run(self):
+        inst = self.instrumentation
+        ticker = TickScheduler(self.rate_hz, instrumentation=inst, name="imu_tick")
+        ticker.restart()
+        roll = pitch = yaw = 0.0
+        temp = self.sensor.read_temp()
+        last_t = None
+        buf, cap, alpha = self._buf, self.capacity, self.alpha
+        while not self._stop_event.is_set():
+            ticker.wait()
+            timed = inst is not None and inst.enabled
+            if timed:
+                t0 = time.perf_counter()
+            try:
+                ax, ay, az, gx, gy, gz = self.sensor.read_motion()
+                if self._count % self._temp_every == 0:
+                    temp = self.sensor.read_temp()
+            except Exception:
+                self.read_errors += 1
+                continue
+            if timed:
+                inst.observe("imu_read", time.perf_counter() - t0)
+            now = time.monotonic()
+            acc_roll = math.degrees(math.atan2(ay, az))
+            acc_pitch = math.degrees(math.atan2(-ax, math.sqrt(ay * ay + az * az)))
+            if last_t is None:
+                roll, pitch = acc_roll, acc_pitch
+            else:
+                dt = now - last_t
+                roll = alpha * (roll + gx * dt) + (1.0 - alpha) * acc_roll
+                pitch = alpha * (pitch + gy * dt) + (1.0 - alpha) * acc_pitch
+                yaw += gz * dt
+            last_t = now
+            o = (self._count % cap) * _IMU_FIELDS
+            buf[o:o + _IMU_FIELDS] = array("d", (now, ax, ay, az, gx, gy, gz, temp, roll, pitch, yaw))
+            self._count += 1
+
+    def _read_slot(self, n):
+        o = (n % self.capacity) * _IMU_FIELDS
+        return ImuSample(*self._buf[o:o + _IMU_FIELDS])
+
+    def latest(self):
+        """Most recent ImuSample (t is time.monotonic()), or None before the first sample."""
+        while True:
+            n = self._count
+            if n == 0:
+                return None
+            sample = self._read_slot(n - 1)
+            # retry only if the writer lapped the whole ring while we copied
+            if self._count - n < self.capacity - 1:
+                return sample
+
+    def history(self, seconds=None, n=None):
+        """Samples oldest-first: the last `n`, or those from the last `seconds` (default: all buffered)."""
+        end = self._count
+        start = max(0, end - self.capacity + 1)
+        if n is not None:
+            start = max(start, end - n)
+        samples = [self._read_slot(i) for i in range(start, end)]
+        if seconds is not None and samples:
+            cutoff = samples[-1].t - seconds
+            samples = [s for s in samples if s.t >= cutoff]
+        return samples
+
+    @property
+    def sample_count(self):
+        return self._count
+
+    def stats(self):
+        return {"samples": self._count, "read_errors": self.read_errors, "rate_hz": self.rate_hz}
+
+
 class DogHAL:
     """
     Robo Dog Hardware Abstraction Layer.
     Provides unified access to servos (via ServoController) and sensors (gyro).
     """
     def __init__(self, servo_map_path="servo_map_dog.json",
-                 imu_addr=0x68, simulate_if_no_hw=True):
-        self.servos = ServoController(servo_map_path, simulate_if_no_hw=simulate_if_no_hw)
-        self.gyro = GyroSensor(i2c_addr=imu_addr, simulate_if_no_hw=simulate_if_no_hw)
+                 imu_addr=0x68, simulate_if_no_hw=True, imu_rate_hz=100, instrumentation=None,
+                 pose_snapshot=None):
+        start = time.perf_counter()
+        global _import_time
+        # the IMU comes up on its own thread while the servo boards initialize
+        gyro = []
+        imu_times = {}
+
+        def init_gyro():
+            t = time.perf_counter()
+            try:
+                gyro.append(GyroSensor(i2c_addr=imu_addr, simulate_if_no_hw=simulate_if_no_hw))
+            except Exception as e:
+                gyro.append(e)
+            imu_times["imu_init"] = time.perf_counter() - t
+        imu_thread = threading.Thread(target=init_gyro, daemon=True)
+        imu_thread.start()
+        self.servos = ServoController(servo_map_path, simulate_if_no_hw=simulate_if_no_hw,
+                                      instrumentation=instrumentation, pose_snapshot=pose_snapshot)
+        # one metrics.Instrumentation for the servos, the IMU sampler and any MotionEngine on top
+        self.instrumentation = self.servos.instrumentation
+        imu_thread.join()
+        if isinstance(gyro[0], Exception):
+            raise gyro[0]
+        self.gyro = gyro[0]
         self.simulate = simulate_if_no_hw
+        # imu_rate_hz=0 disables the background sampler (get_orientation then reads the bus directly)
+        t = time.perf_counter()
+        self.imu = None
+        if imu_rate_hz:
+            self.imu = ImuSampler(self.gyro, rate_hz=imu_rate_hz, instrumentation=self.instrumentation)
+            self.instrumentation.source("imu", self.imu.stats)
+            self.imu.start()
+        # servo phases, then the IMU (its init overlapped the servo phases)
+        self.startup_times = {}
+        if _import_time is not None:
+            self.startup_times["module_import"] = _import_time
+            _import_time = None
+        self.startup_times.update((f"servo_{name}", dt) for name, dt in self.servos.startup_times.items()
+                                  if name != "total" and (name != "module_import" or _servo_preloaded))
+        self.startup_times.update(imu_times)
+        self.startup_times["imu_sampler"] = time.perf_counter() - t
+        self.startup_times["total"] = (time.perf_counter() - start + self.startup_times.get("module_import", 0.0)
+                                       + self.startup_times.get("servo_module_import", 0.0))
+
+    def startup_report(self):
+        """Startup phases (imu_init ran alongside the servo_* phases, so shares can exceed 100%)."""
+        return startup_report(self.startup_times)
 
     # ---- Servo Control Wrappers ----
     def set_pose(self, pose_dict):
@@ -75,8 +304,31 @@ class DogHAL:
 
     # ---- Sensor Access ----
     def get_orientation(self):
-        """Return IMU orientation (accel, gyro, temp)"""
-        return self.gyro.read_orientation()
+        """Return IMU orientation (accel, gyro, temp), plus fused roll/pitch/yaw when sampling"""
+        sample = self.imu.latest() if self.imu else None
+        if sample is None:
+            return self.gyro.read_orientation()
+        return {
+            "accel": {"x": sample.ax, "y": sample.ay, "z": sample.az},
+            "gyro": {"x": sample.gx, "y": sample.gy, "z": sample.gz},
+            "temp": sample.temp,
+            "roll": sample.roll,
+            "pitch": sample.pitch,
+            "yaw": sample.yaw,
+        }
+
+    def get_imu_sample(self):
+        """Latest fused ImuSample from the background sampler (non-blocking), or None"""
+        return self.imu.latest() if self.imu else None
+
+    def get_imu_history(self, seconds=None, n=None):
+        """Buffered ImuSamples, oldest first (see ImuSampler.history)"""
+        return self.imu.history(seconds=seconds, n=n) if self.imu else []
+
+    # ---- Metrics ----
+    def get_metrics(self):
+        """Snapshot of the shared instrumentation (see metrics.Instrumentation.snapshot)"""
+        return self.instrumentation.snapshot()
 
     # ---- Safety ----
     def emergency_stop(self, set_neutral=False):
@@ -86,3 +338,12 @@ class DogHAL:
     def enable_outputs(self):
         """Re-enable servo outputs after stop"""
         self.servos.enable_outputs()
+
+    def close(self):
+        """Stop the background IMU sampler"""
+        if self.imu:
+            self.imu.stop()
+
+
+# import time of this module and its dependencies (see DogHAL startup_times)
+_import_time = time.perf_counter() - _import_start
@@ -0,0 +1,195 @@
+# feedback.py
+import threading
+import time
+from collections import deque
+
+# statuses that end a goal; never coalesced away
+_TERMINAL = ("SUCCEEDED", "PREEMPTED", "ABORTED", "FAILED")
+
+
+class Subscription:
+    """
+    One feedback subscriber with its own bounded queue and delivery thread.
+
+    Non-terminal messages are coalesced per goal: while one is still waiting,
+    a newer one for the same goal replaces it, so only the latest progress is
+    delivered. max_hz caps how often non-terminal messages reach the callback
+    (the rest coalesce meanwhile). When the queue holds maxlen messages, the
+    oldest non-terminal one (else the oldest) is dropped and counted.
+    """
+    def __init__(self, dispatcher, callback, max_hz=None, maxlen=64, coalesce=True):
+        self._dispatcher = dispatcher
+        self.callback = callback
+        self.min_interval = 1.0 / max_hz if max_hz else 0.0
+        self.maxlen = maxlen
+        self.coalesce = coalesce
+        # entries: ("goal", goal_id) -> latest in _latest, or ("msg", message) (terminal / not coalesced)
+        self._queue = deque()
+        self._latest = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._last_delivery = 0.0
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _offer(self, msg):
+        """Control-thread side: O(1) unless the queue is full."""
+        with self._cond:
+            if self._closed:
+                return
+            goal_id = msg[0]
+            if self.coalesce and msg[1] not in _TERMINAL:
+                if goal_id in self._latest:
+                    self._latest[goal_id] = msg
+                    self.coalesced += 1
+                    return
+                entry = ("goal", goal_id)
+                self._latest[goal_id] = msg
+            else:
+                entry = ("msg", msg)
+            if len(self._queue) >= self.maxlen:
+                self._drop_one()
+            self._queue.append(entry)
+            self._cond.notify()
+
+    def _drop_one(self):
+        # caller holds _cond
+        victim = None
+        for entry in self._queue:
+            if entry[0] == "goal" or entry[1][1] not in _TERMINAL:
+                victim = entry
+                break
+        if victim is None:
+            victim = self._queue[0]
+        self._queue.remove(victim)
+        if victim[0] == "goal":
+            self._latest.pop(victim[1], None)
+        self.dropped += 1
+
+    def _next(self):
+        """Block for the next message (None when closed and drained)."""
+        with self._cond:
+            while True:
+                if not self._queue:
+                    if self._closed:
+                        return None
+                    self._cond.wait()
+                    continue
+                entry = self._queue[0]
+                msg = self._latest[entry[1]] if entry[0] == "goal" else entry[1]
+                wait = self._last_delivery + self.min_interval - time.monotonic()
+                if wait > 0.0 and msg[1] not in _TERMINAL and not self._closed:
+                    # rate limited: newer progress keeps coalescing into this slot meanwhile
+                    self._cond.wait(wait)
+                    continue
+                self._queue.popleft()
+                if entry[0] == "goal":
+                    msg = self._latest.pop(entry[1])
+                return msg
+
+    def _run(self):
+        inst = self._dispatcher.instrumentation
+        while True:
+            msg = self._next()
+            if msg is None:
+                return
+            fb = self._dispatcher.build(msg)
+            timed = inst is not None and inst.enabled
+            if timed:
+                t0 = time.perf_counter()
+            try:
+                self.callback(fb)
+            except Exception:
+                self.errors += 1
+            if timed:
+                inst.stage("feedback", time.perf_counter() - t0)
+            self._last_delivery = time.monotonic()
+            self.delivered += 1
+
+    def pending(self):
+        return len(self._queue)
+
+    def close(self, timeout=1.0):
+        """Stop after delivering what is queued (up to `timeout` seconds)."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {"delivered": self.delivered, "coalesced": self.coalesced, "dropped": self.dropped,
+                "errors": self.errors, "pending": len(self._queue)}
+
+
+class FeedbackDispatcher:
+    """
+    Fans MotionEngine feedback out to subscribers off the control thread.
+
+    publish() only enqueues a small tuple per subscriber; the feedback dict is
+    built by each subscriber's thread just before its callback runs. A slow
+    subscriber only delays itself.
+
+    current_pose of a terminal message is copied from `pose_fn` at publish
+    time, so it is the pose the goal ended in. Progress messages (which may
+    be coalesced) read it at delivery time instead and say so with
+    "pose_at_delivery": True; by then a later goal may have moved the joints.
+    """
+    def __init__(self, pose_fn, instrumentation=None):
+        self._pose_fn = pose_fn
+        self.instrumentation = instrumentation
+        self._subs = ()  # replaced, never mutated, so publish() can read it without a lock
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback, max_hz=None, maxlen=64, coalesce=True):
+        sub = Subscription(self, callback, max_hz=max_hz, maxlen=maxlen, coalesce=coalesce)
+        with self._lock:
+            self._subs = self._subs + (sub,)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subs = tuple(s for s in self._subs if s is not sub)
+        sub.close()
+
+    def publish(self, goal_id, status, progress, message=None, extra=None):
+        subs = self._subs
+        if not subs:
+            return
+        # only terminal statuses pay for the pose copy on the control thread
+        pose = self._pose_fn() if status in _TERMINAL else None
+        msg = (goal_id, status, progress, message, extra, time.time(), pose)
+        for sub in subs:
+            sub._offer(msg)
+
+    def build(self, msg):
+        goal_id, status, progress, message, extra, timestamp, pose = msg
+        fb = {
+            "goal_id": goal_id,
+            "status": status,
+            "progress": progress,
+            "current_pose": pose if pose is not None else self._pose_fn(),
+            "message": message,
+            "timestamp": timestamp
+        }
+        if pose is None:
+            fb["pose_at_delivery"] = True
+        if extra:
+            fb.update(extra)
+        return fb
+
+    def dropped(self):
+        return sum(s.dropped for s in self._subs)
+
+    def stats(self):
+        return [s.stats() for s in self._subs]
+
+    def close(self, timeout=1.0):
+        with self._lock:
+            subs, self._subs = self._subs, ()
+        for sub in subs:
+            sub.close(timeout)
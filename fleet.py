@@ -0,0 +1,285 @@
+# fleet.py
+# One process per robot (ServoController + MotionEngine + BehaviorManager),
+# driven from a coordinator over shared-memory rings:
+#
+#   fleet = Fleet([RobotSpec("rex", "servo_map_dog.json"), RobotSpec("fido", "servo_map_dog.json")])
+#   fleet.start()
+#   gid = fleet.perform("rex", "sit")
+#   fleet.wait("rex", gid)
+#   fleet.stop()
+import argparse
+import collections
+import contextlib
+import io
+import json
+import multiprocessing
+import struct
+import threading
+import time
+from dataclasses import dataclass
+
+from shm_ring import ShmRing
+
+# telemetry ring records: one type byte, then
+#   b"P": pose frame  <tick u64, t f64, n u16> + n f64 angles (servo map order)
+#   b"E": event       JSON (feedback with a terminal status, stats, ready)
+_POSE_HEAD = struct.Struct("<QdH")
+
+
+@dataclass
+class RobotSpec:
+    name: str
+    servo_map: str
+    control_hz: int = 30
+    behaviors_path: str = "behaviors.json"
+    telemetry_hz: float = 30.0
+
+
+def _robot_main(spec, cmd_name, telem_name):
+    """Robot process: build the stack, execute commands, stream pose frames and goal events."""
+    from behavior_manager import BehaviorManager
+    from motion_engine import MotionEngine, MotionGoal, TERMINAL_STATES
+    from servo_controller import ServoController
+
+    cmd = ShmRing(cmd_name)
+    telem = ShmRing(telem_name)
+
+    # ShmRing has a single producer: only this (main) thread puts to telem
+    def event(kind, **fields):
+        data = json.dumps(dict(fields, kind=kind)).encode()
+        telem.put(b"E" + data)
+
+    # terminal statuses from the feedback thread, sent by the main loop
+    feedback_events = collections.deque()
+
+    def flush_feedback():
+        while feedback_events:
+            event("status", **feedback_events.popleft())
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        servo = ServoController(spec.servo_map, simulate_if_no_hw=True)
+    engine = MotionEngine(servo, control_hz=spec.control_hz)
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = BehaviorManager(engine, behaviors_path=spec.behaviors_path)
+    # behaviors get engine-side goal ids; the coordinator only ever sees its own
+    to_engine, from_engine = {}, {}
+    alias_lock = threading.Lock()
+
+    def on_feedback(fb):
+        if fb["status"] in TERMINAL_STATES:
+            with alias_lock:
+                goal_id = from_engine.pop(fb["goal_id"], fb["goal_id"])
+                to_engine.pop(goal_id, None)
+            feedback_events.append({"goal_id": goal_id, "status": fb["status"], "message": fb["message"]})
+    engine.subscribe(on_feedback)
+    names = servo.servo_names
+    frame = struct.Struct(f"<{len(names)}d")
+    event("ready", names=names)
+
+    period = 1.0 / spec.telemetry_hz
+    next_frame = time.monotonic()
+    tick = 0
+    running = True
+    while running:
+        flush_feedback()
+        for data in cmd.drain():
+            msg = json.loads(data)
+            op = msg.pop("op")
+            try:
+                if op == "goal":
+                    engine.push_goal(MotionGoal(**msg))
+                elif op == "behavior":
+                    # hold the alias lock so the terminal status can't be reported under the engine id
+                    with alias_lock, contextlib.redirect_stdout(io.StringIO()):
+                        goal_id = manager.execute_task(msg["name"], priority=msg.get("priority", 5))
+                        if goal_id is not None:
+                            to_engine[msg["goal_id"]] = goal_id
+                            from_engine[goal_id] = msg["goal_id"]
+                    if goal_id is None:
+                        event("status", goal_id=msg["goal_id"], status="FAILED", message="unknown behavior")
+                elif op == "cancel":
+                    engine.cancel_goal(to_engine.get(msg["goal_id"], msg["goal_id"]))
+                elif op == "stats":
+                    event("stats", timing=engine.get_timing_stats(), queue_depth=engine.queue_depth())
+                elif op == "stop":
+                    running = False
+            except Exception as e:
+                event("error", op=op, message=str(e))
+        now = time.monotonic()
+        if now >= next_frame:
+            pose = servo._current_pose
+            telem.put(b"P" + _POSE_HEAD.pack(tick, now, len(names)) + frame.pack(*(pose[nm] for nm in names)))
+            tick += 1
+            next_frame = max(next_frame + period, now - period)
+        time.sleep(min(0.002, max(0.0, next_frame - time.monotonic())))
+    event("stats", timing=engine.get_timing_stats(), queue_depth=engine.queue_depth())
+    engine.stop()
+    flush_feedback()  # statuses delivered while the engine stopped
+    cmd.close()
+    telem.close()
+
+
+class RobotHandle:
+    """Coordinator-side state of one robot process."""
+    def __init__(self, spec, ctx, cmd_slots, telem_slots):
+        self.spec = spec
+        self.cmd = ShmRing.create(slots=cmd_slots, slot_size=4096)
+        self.telem = ShmRing.create(slots=telem_slots, slot_size=1024)
+        self.process = ctx.Process(target=_robot_main, args=(spec, self.cmd.name, self.telem.name),
+                                   name=f"robot-{spec.name}", daemon=True)
+        self.names = None
+        self.pose = None       # latest {name: angle}
+        self.pose_tick = -1
+        self.pose_time = 0.0
+        self.statuses = {}     # goal_id -> terminal status
+        self.stats = None
+        self.errors = []
+
+
+class Fleet:
+    """
+    Runs each RobotSpec in its own process, so every control loop has its
+    own interpreter (and GIL) and a stalled robot can't delay the others.
+    Commands go out as JSON over a per-robot command ring; pose frames and
+    goal events come back over a per-robot telemetry ring. Neither side
+    ever blocks on the other: a full ring drops (telemetry) or refuses
+    (send returns False) the message.
+    """
+    def __init__(self, specs, cmd_slots=64, telem_slots=1024, start_method="spawn"):
+        self._ctx = multiprocessing.get_context(start_method)
+        self.robots = {}
+        for spec in specs:
+            if spec.name in self.robots:
+                raise ValueError(f"duplicate robot name: {spec.name}")
+            self.robots[spec.name] = RobotHandle(spec, self._ctx, cmd_slots, telem_slots)
+        self._counter = 0
+
+    def start(self, timeout=10.0):
+        for robot in self.robots.values():
+            robot.process.start()
+        end = time.monotonic() + timeout
+        while any(r.names is None for r in self.robots.values()):
+            if time.monotonic() > end:
+                raise TimeoutError("robots did not report ready")
+            self.poll()
+            time.sleep(0.005)
+
+    # --- commands ---
+    def send(self, robot, op, **fields):
+        """Queue a raw command; False if the robot's command ring is full."""
+        return self.robots[robot].cmd.put(json.dumps(dict(fields, op=op)).encode())
+
+    def _goal_id(self, robot, prefix):
+        self._counter += 1
+        return f"{robot}:{prefix}:{self._counter}"
+
+    def push_goal(self, robot, action, poses, goal_id=None, **fields):
+        """MotionGoal fields as keywords (priority, timeout, profile, ...); returns the goal_id."""
+        goal_id = goal_id or self._goal_id(robot, action)
+        if not self.send(robot, "goal", goal_id=goal_id, action=action, poses=poses, **fields):
+            raise BufferError(f"command ring of {robot} is full")
+        return goal_id
+
+    def perform(self, robot, behavior, priority=5):
+        goal_id = self._goal_id(robot, behavior)
+        if not self.send(robot, "behavior", goal_id=goal_id, name=behavior, priority=priority):
+            raise BufferError(f"command ring of {robot} is full")
+        return goal_id
+
+    def cancel(self, robot, goal_id):
+        return self.send(robot, "cancel", goal_id=goal_id)
+
+    # --- telemetry ---
+    def poll(self):
+        """Drain every telemetry ring; returns the events received."""
+        events = []
+        for robot in self.robots.values():
+            for data in robot.telem.drain():
+                if data[:1] == b"P":
+                    tick, t, n = _POSE_HEAD.unpack_from(data, 1)
+                    if robot.names is not None:
+                        angles = struct.unpack_from(f"<{n}d", data, 1 + _POSE_HEAD.size)
+                        robot.pose = dict(zip(robot.names, angles))
+                        robot.pose_tick, robot.pose_time = tick, t
+                    continue
+                ev = json.loads(data[1:])
+                ev["robot"] = robot.spec.name
+                kind = ev["kind"]
+                if kind == "ready":
+                    robot.names = ev["names"]
+                elif kind == "status":
+                    robot.statuses[ev["goal_id"]] = ev["status"]
+                elif kind == "stats":
+                    robot.stats = ev
+                elif kind == "error":
+                    robot.errors.append(ev)
+                events.append(ev)
+        return events
+
+    def status(self, robot, goal_id):
+        """Terminal status seen so far, or None."""
+        return self.robots[robot].statuses.get(goal_id)
+
+    def wait(self, robot, goal_id, timeout=None):
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self.poll()
+            status = self.status(robot, goal_id)
+            if status is not None or (end is not None and time.monotonic() > end):
+                return status
+            if not self.robots[robot].process.is_alive():
+                return None
+            time.sleep(0.005)
+
+    def get_pose(self, robot):
+        self.poll()
+        return self.robots[robot].pose
+
+    def stop(self, timeout=5.0):
+        """Stop every robot; returns {robot: final timing stats}."""
+        for name in self.robots:
+            self.send(name, "stop")
+        end = time.monotonic() + timeout
+        for robot in self.robots.values():
+            while robot.process.is_alive() and time.monotonic() < end:
+                self.poll()
+                robot.process.join(0.01)
+            if robot.process.is_alive():
+                robot.process.terminate()
+                robot.process.join(1.0)
+        self.poll()
+        stats = {name: r.stats["timing"] if r.stats else None for name, r in self.robots.items()}
+        for robot in self.robots.values():
+            robot.cmd.close()
+            robot.telem.close()
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run N simulated dogs, one process each")
+    parser.add_argument("--robots", type=int, default=4)
+    parser.add_argument("--hz", type=int, default=100, help="control_hz per robot")
+    parser.add_argument("--servo-map", default="servo_map_dog.json")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    specs = [RobotSpec(f"dog{i}", args.servo_map, control_hz=args.hz) for i in range(args.robots)]
+    fleet = Fleet(specs)
+    start = time.monotonic()
+    fleet.start()
+    print(f"{args.robots} robots ready in {time.monotonic() - start:.2f}s")
+    for _ in range(args.rounds):
+        for behavior in ("sit", "stand"):
+            goals = [(spec.name, fleet.perform(spec.name, behavior)) for spec in specs]
+            for name, goal_id in goals:
+                fleet.wait(name, goal_id, timeout=30.0)
+    for name, timing in fleet.stop().items():
+        if timing:
+            print(f"{name}: ticks {timing['ticks']:5d} overruns {timing['overruns']:3d}"
+                  f" jitter mean {timing['jitter_mean'] * 1e3:6.3f} ms max {timing['jitter_max'] * 1e3:6.3f} ms")
+        else:
+            print(f"{name}: no stats (stopped before reporting)")
+
+
+if __name__ == "__main__":
+    main()
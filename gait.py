@@ -0,0 +1,156 @@
+# gait.py
+import math
+import threading
+from dataclasses import dataclass, fields, replace
+
+from kinematics import LEGS, KinematicsError
+
+# per-leg phase offsets (LEGS order: fl, fr, bl, br) and duty factor (stance share of a cycle)
+GAITS = {
+    "trot": ((0.0, 0.5, 0.5, 0.0), 0.5),    # diagonal pairs
+    "pace": ((0.0, 0.5, 0.0, 0.5), 0.5),    # same-side pairs
+    "walk": ((0.0, 0.5, 0.75, 0.25), 0.75),  # one foot in the air at a time
+}
+
+
+@dataclass
+class GaitParams:
+    gait: str = "trot"
+    stride: float = 0.06      # foot travel per cycle, metres (0 = step in place)
+    height: float = 0.03      # swing foot lift, metres
+    frequency: float = 1.5    # cycles per second
+    heading: float = 0.0      # direction of travel in the body frame, radians (0 = forward, +pi/2 = left)
+    body_height: float = None  # hip -> ground, metres; None = LegGeometry.stand_height
+    duration: float = None    # seconds; None walks until cancelled or preempted
+
+_FIELDS = {f.name for f in fields(GaitParams)}
+
+
+def _wrap(x):
+    """Phase difference wrapped to [-0.5, 0.5)."""
+    return (x + 0.5) % 1.0 - 0.5
+
+
+class GaitGenerator:
+    """
+    Phase-oscillator gait: one cycle phase advanced by frequency * dt each tick,
+    per-leg phase offsets, and a stance/swing foot path per leg solved through
+    LegKinematics. Nothing is precomputed; step() makes one frame.
+
+    set_params() may be called from any thread while walking. Phase is never
+    reset; stride, height, heading, body height, duty and leg offsets move
+    toward the new values over ~blend_time, so feet don't jump.
+    """
+    def __init__(self, kinematics, params=None, blend_time=0.3):
+        self.kinematics = kinematics
+        self.names = kinematics.names
+        self.blend_time = blend_time
+        self._lock = threading.Lock()
+        self.params = GaitParams()
+        self.set_params(params)
+        self.phase = 0.0
+        self.cycles = 0
+        self.unreachable = 0
+        # start at rest on the stance; stride and lift blend in
+        self._state = dict(self._target, stride_x=0.0, stride_y=0.0, height=0.0)
+        self._last = None
+
+    def set_params(self, params=None, **changes):
+        """Update gait parameters (a GaitParams, a dict, and/or keyword fields); takes effect smoothly."""
+        if isinstance(params, dict):
+            changes = dict(params, **changes)
+            params = None
+        unknown = set(changes) - _FIELDS
+        if unknown:
+            raise ValueError(f"unknown gait parameters: {sorted(unknown)}")
+        with self._lock:
+            new = replace(params or self.params, **changes)
+            if new.gait not in GAITS:
+                raise ValueError(f"unknown gait: {new.gait}")
+            if new.frequency < 0.0:
+                raise ValueError("gait frequency must be >= 0")
+            self.params = new
+            self._target = self._targets()
+
+    def _targets(self):
+        p = self.params
+        offsets, duty = GAITS[p.gait]
+        body = self.kinematics.geometry.stand_height if p.body_height is None else p.body_height
+        return {"stride_x": p.stride * math.cos(p.heading), "stride_y": p.stride * math.sin(p.heading),
+                "height": p.height, "body_height": body, "duty": duty, "offsets": list(offsets)}
+
+    def stop_stepping(self):
+        """Blend stride and lift to zero (feet settle on the stance); see settled()."""
+        self.set_params(stride=0.0, height=0.0)
+
+    def settled(self, tol=1e-3):
+        s = self._state
+        return abs(s["stride_x"]) + abs(s["stride_y"]) + abs(s["height"]) < tol
+
+    def _blend(self, dt):
+        k = 1.0 if self.blend_time <= 0.0 else min(1.0, dt / self.blend_time)
+        s, t = self._state, self._target
+        for key in ("stride_x", "stride_y", "height", "body_height", "duty"):
+            s[key] += (t[key] - s[key]) * k
+        s["offsets"] = [(o + _wrap(to - o) * k) % 1.0 for o, to in zip(s["offsets"], t["offsets"])]
+
+    def feet(self):
+        """Body-frame foot targets (LEGS order) at the current phase."""
+        s = self._state
+        duty = s["duty"]
+        sx, sy, lift = s["stride_x"], s["stride_y"], s["height"]
+        out = []
+        for (bx, by, bz), off in zip(self.kinematics.stance(s["body_height"]), s["offsets"]):
+            p = (self.phase + off) % 1.0
+            if p < duty:
+                # stance: foot slides back under the body
+                along = 0.5 - p / duty
+                z = bz
+            else:
+                # swing: eased forward, lifted on a half sine
+                u = (p - duty) / (1.0 - duty)
+                along = -0.5 + (1.0 - math.cos(math.pi * u)) / 2.0
+                z = bz + lift * math.sin(math.pi * u)
+            out.append((bx + sx * along, by + sy * along, z))
+        return out
+
+    def step(self, dt):
+        """Advance dt seconds; joint angles (kinematics.names order) for the new phase."""
+        with self._lock:
+            freq = self.params.frequency
+            self._blend(dt)
+        phase = self.phase + freq * dt
+        self.cycles += int(phase)
+        self.phase = phase % 1.0
+        angles, ok = self.kinematics.solve(self.feet())
+        values = []
+        for leg_i in range(len(LEGS)):
+            row = angles[leg_i]
+            if ok[leg_i]:
+                values.extend(float(a) for a in row)
+            elif self._last is None:
+                raise KinematicsError(f"gait starts with foot {LEGS[leg_i]} out of reach")
+            else:
+                # out of reach: hold the leg where it was
+                self.unreachable += 1
+                values.extend(self._last[3 * leg_i:3 * leg_i + 3])
+        self._last = values
+        return values
+
+    def state(self):
+        with self._lock:
+            p = self.params
+        return {"gait": p.gait, "phase": self.phase, "cycles": self.cycles,
+                "frequency": p.frequency, "unreachable": self.unreachable}
+
+
+def gait_params(value):
+    """GaitParams from a GaitParams, a dict of its fields, or None (defaults)."""
+    if value is None:
+        return GaitParams()
+    if isinstance(value, GaitParams):
+        return value
+    unknown = set(value) - _FIELDS
+    if unknown:
+        raise ValueError(f"unknown gait parameters: {sorted(unknown)}")
+    return GaitParams(**value)
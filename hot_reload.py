@@ -0,0 +1,128 @@
+# hot_reload.py
+# Watch the behaviors file and the servo map and apply edits to a running
+# engine, without rebuilding ServoController / MotionEngine / BehaviorManager:
+#
+#   reloader = HotReloader(manager, servo_map_path="servo_map_dog.json")
+#   reloader.start()
+import os
+import threading
+
+from servo_controller import ServoConfigError
+
+
+class FileWatcher:
+    """
+    Polls files for changes (mtime / size) on one background thread.
+    A change is reported once the file has looked the same for one more poll,
+    so an editor that is still writing it doesn't trigger a reload of half a file.
+    """
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self._watches = {}  # path -> [callback, last reported stat, pending stat]
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def watch(self, path, callback):
+        """callback(path) runs on the watcher thread after each settled change."""
+        self._watches[path] = [callback, self._stat(path), None]
+
+    def poll(self):
+        """Check every watched file once; returns the paths whose callbacks ran."""
+        fired = []
+        for path, entry in list(self._watches.items()):
+            callback, seen, pending = entry
+            st = self._stat(path)
+            if st is None or st == seen:
+                entry[2] = None
+                continue
+            if st != pending:
+                entry[2] = st  # changed since the last poll: wait for it to settle
+                continue
+            entry[1], entry[2] = st, None
+            try:
+                callback(path)
+            except Exception as e:
+                print(f"[HotReload] {path}: {e}")
+            fired.append(path)
+        return fired
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2 * self.interval + 1.0)
+            self._thread = None
+
+
+class HotReloader:
+    """
+    Applies edits to a BehaviorManager's behaviors file and (optionally) the servo
+    map. Files are parsed and checked on the watcher thread; the swap itself is a
+    reference assignment (behaviors) or runs on the control thread at a tick
+    boundary (calibration, see MotionEngine.reload_calibration). Only changed
+    behaviors are recompiled and the PCA9685s are never re-initialized. A file
+    that fails to parse or validate is reported and the running state is kept.
+    """
+    def __init__(self, manager, servo_map_path=None, behaviors_path=None, interval=0.5, apply_timeout=1.0):
+        self.manager = manager
+        self.apply_timeout = apply_timeout
+        self.engine = manager.motion_engine
+        self.watcher = FileWatcher(interval)
+        self.reloads = 0
+        self.errors = 0
+        self.last_error = None
+        self.watcher.watch(behaviors_path or manager.behaviors_path, self._on_behaviors)
+        if servo_map_path:
+            self.watcher.watch(servo_map_path, self._on_servo_map)
+
+    def _on_behaviors(self, path):
+        changed = self.manager.reload_behaviors(path)
+        if changed is None:
+            self._failed(f"behaviors not reloaded from {path}")
+            return
+        self.reloads += 1
+        print(f"[HotReload] {path}: {len(changed)} behavior(s) changed {changed}")
+
+    def _on_servo_map(self, path):
+        try:
+            applied = self.engine.reload_calibration(path)
+        except (ServoConfigError, ValueError, KeyError, OSError) as e:
+            self._failed(f"calibration not reloaded from {path}: {e}")
+            return
+        if not applied.wait(self.apply_timeout):
+            # still queued for the control thread (stuck or stopped); it applies if the thread resumes
+            self._failed(f"calibration from {path} not applied within {self.apply_timeout}s")
+            return
+        self.reloads += 1
+        print(f"[HotReload] {path}: calibration swapped")
+
+    def _failed(self, message):
+        self.errors += 1
+        self.last_error = message
+        print(f"[HotReload] {message}")
+
+    def start(self):
+        self.watcher.start()
+        return self
+
+    def stop(self):
+        self.watcher.stop()
+
+    def stats(self):
+        return {"reloads": self.reloads, "errors": self.errors, "last_error": self.last_error}
@@ -0,0 +1,356 @@
+# i2c_sim.py
+# Bus-level stand-in for busio.I2C + adafruit_pca9685.PCA9685, for testing the
+# real (non-simulate) ServoController path without hardware:
+#
+#   bus = SimI2C(frequency=400_000, boards=(0x40,))
+#   servo = ServoController("servo_map_dog.json", i2c=bus, pca_driver=PCA9685)
+#   ...
+#   print(bus.report())
+import argparse
+import threading
+import time
+
+# PCA9685 registers
+MODE1 = 0x00
+MODE2 = 0x01
+LED0_ON_L = 0x06
+ALL_LED_ON_L = 0xFA
+PRE_SCALE = 0xFE
+_MODE1_RESTART = 0x80
+_MODE1_AI = 0x20
+_MODE1_SLEEP = 0x10
+_CHANNELS = 16
+_OSC_HZ = 25_000_000
+_OSC_RESTART_S = 0.005  # adafruit_pca9685 waits this long after waking the oscillator
+
+# I2C framing: 9 clocks per byte (8 data + ACK), plus start and stop
+_BITS_PER_BYTE = 9
+_START_STOP_BITS = 2
+BAUD_RATES = (100_000, 400_000, 1_000_000)
+
+
+def transaction_time(n_bytes, baudrate):
+    """Seconds on the wire for one transaction of n_bytes, address byte included."""
+    return (_BITS_PER_BYTE * n_bytes + _START_STOP_BITS) / baudrate
+
+
+class SimPCA9685Chip:
+    """
+    Register model of one PCA9685: 256-byte register file, register pointer with
+    MODE1.AI auto-increment, PRE_SCALE writable only while asleep, ALL_LED
+    broadcast, and power-on defaults.
+    """
+    def __init__(self, address):
+        self.address = address
+        self.regs = bytearray(256)
+        self.regs[MODE1] = 0x11       # SLEEP | ALLCALL
+        self.regs[MODE2] = 0x04       # OUTDRV
+        self.regs[PRE_SCALE] = 0x1E   # ~200 Hz
+        for ch in range(_CHANNELS):
+            self.regs[LED0_ON_L + 4 * ch + 3] = 0x10  # full off
+        self._ptr = 0
+
+    def _advance(self):
+        if self.regs[MODE1] & _MODE1_AI:
+            self._ptr = (self._ptr + 1) & 0xFF
+
+    def write(self, data):
+        """One write transaction: register pointer, then data bytes."""
+        if not data:
+            return
+        self._ptr = data[0]
+        for b in data[1:]:
+            self._store(self._ptr, b)
+            self._advance()
+
+    def _store(self, reg, value):
+        if reg == PRE_SCALE and not self.regs[MODE1] & _MODE1_SLEEP:
+            return  # datasheet: PRE_SCALE can only be set while SLEEP is 1
+        if ALL_LED_ON_L <= reg < ALL_LED_ON_L + 4:
+            for ch in range(_CHANNELS):
+                self.regs[LED0_ON_L + 4 * ch + reg - ALL_LED_ON_L] = value
+        if reg == MODE1:
+            value &= ~_MODE1_RESTART & 0xFF  # RESTART self-clears
+        self.regs[reg] = value
+
+    def read(self, n):
+        out = bytearray(n)
+        for i in range(n):
+            out[i] = self.regs[self._ptr]
+            self._advance()
+        return out
+
+    @property
+    def frequency(self):
+        return _OSC_HZ / 4096.0 / (self.regs[PRE_SCALE] + 1)
+
+    def channel(self, ch):
+        """(on, off) 12-bit counts of a channel; full-on / full-off bits resolved."""
+        o = LED0_ON_L + 4 * ch
+        on = self.regs[o] | self.regs[o + 1] << 8
+        off = self.regs[o + 2] | self.regs[o + 3] << 8
+        if off & 0x1000:
+            return 0, 0
+        if on & 0x1000:
+            return 0, 4096
+        return on & 0xFFF, off & 0xFFF
+
+    def pulse_us(self, ch):
+        """High time of a channel's output in microseconds (0 while asleep)."""
+        if self.regs[MODE1] & _MODE1_SLEEP:
+            return 0.0
+        on, off = self.channel(ch)
+        return ((off - on) % 4096 if off != 4096 else 4096) * 1e6 / (4096.0 * self.frequency)
+
+
+class SimI2C:
+    """
+    busio.I2C look-alike with PCA9685 chips at `boards`. Every transaction is
+    charged (9 * bytes + 2) / frequency seconds of bus time. With realtime=True
+    the caller also waits for it, as it would on a real bus, so control loops
+    see the true cost of their writes.
+    """
+    def __init__(self, scl=None, sda=None, *, frequency=400_000, boards=(0x40,), realtime=False):
+        self.frequency = frequency
+        self.realtime = realtime
+        self.devices = {addr: SimPCA9685Chip(addr) for addr in boards}
+        self._lock = threading.Lock()
+        self._owner = None
+        self._free_at = 0.0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.transactions = 0
+        self.bytes = 0
+        self.busy_s = 0.0
+        self.device_wait_s = 0.0
+        self._t0 = time.monotonic()
+
+    # --- busio.I2C API ---
+    def try_lock(self):
+        if self._lock.acquire(blocking=False):
+            self._owner = threading.get_ident()
+            return True
+        return False
+
+    def unlock(self):
+        self._owner = None
+        self._lock.release()
+
+    def scan(self):
+        return sorted(self.devices)
+
+    def deinit(self):
+        pass
+
+    def _device(self, address):
+        dev = self.devices.get(address)
+        if dev is None:
+            raise OSError(f"[Errno 121] no ACK from I2C address 0x{address:02x}")
+        return dev
+
+    def _charge(self, n_bytes):
+        dt = transaction_time(n_bytes, self.frequency)
+        self.transactions += 1
+        self.bytes += n_bytes
+        self.busy_s += dt
+        if self.realtime:
+            now = time.monotonic()
+            self._free_at = max(now, self._free_at) + dt
+            # sleep in chunks; the debt carries over so short transactions still add up
+            if self._free_at - now > 0.0005:
+                time.sleep(self._free_at - now)
+
+    def device_wait(self, seconds):
+        """A driver waiting on a chip with the bus free (e.g. oscillator restart)."""
+        self.device_wait_s += seconds
+        if self.realtime:
+            time.sleep(seconds)
+
+    def writeto(self, address, buffer, *, start=0, end=None):
+        data = bytes(buffer[start:end])
+        self._device(address).write(data)
+        self._charge(1 + len(data))
+
+    def readfrom_into(self, address, buffer, *, start=0, end=None):
+        end = len(buffer) if end is None else end
+        buffer[start:end] = self._device(address).read(end - start)
+        self._charge(1 + end - start)
+
+    def writeto_then_readfrom(self, address, buffer_out, buffer_in, *, out_start=0, out_end=None,
+                              in_start=0, in_end=None):
+        dev = self._device(address)
+        out = bytes(buffer_out[out_start:out_end])
+        in_end = len(buffer_in) if in_end is None else in_end
+        dev.write(out)
+        buffer_in[in_start:in_end] = dev.read(in_end - in_start)
+        # repeated start: two address bytes, one transaction
+        self._charge(2 + len(out) + in_end - in_start)
+
+    # --- reporting ---
+    def report(self, frames=None):
+        """
+        Bus totals since reset_stats(); frames (e.g. control ticks) adds the achieved
+        frame rate. Without realtime, occupancy above 1.0 means a real bus would
+        not have kept up.
+        """
+        elapsed = time.monotonic() - self._t0
+        out = {
+            "baudrate": self.frequency,
+            "transactions": self.transactions,
+            "bytes": self.bytes,
+            "busy_s": self.busy_s,
+            "device_wait_s": self.device_wait_s,
+            "elapsed_s": elapsed,
+            "occupancy": self.busy_s / elapsed if elapsed > 0 else 0.0,
+        }
+        if frames is not None:
+            out["frames"] = frames
+            out["frame_rate"] = frames / elapsed if elapsed > 0 else 0.0
+            out["bus_time_per_frame_s"] = self.busy_s / frames if frames else 0.0
+        return out
+
+
+class _SimI2CDevice:
+    """adafruit_bus_device.i2c_device.I2CDevice subset used by PCA9685 / ServoController."""
+    def __init__(self, i2c, address):
+        self.i2c = i2c
+        self.device_address = address
+        i2c._device(address)  # probe, like I2CDevice does
+
+    def write(self, buf, *, start=0, end=None):
+        self.i2c.writeto(self.device_address, buf, start=start, end=end)
+
+    def readinto(self, buf, *, start=0, end=None):
+        self.i2c.readfrom_into(self.device_address, buf, start=start, end=end)
+
+    def write_then_readinto(self, out_buffer, in_buffer, *, out_start=0, out_end=None, in_start=0, in_end=None):
+        self.i2c.writeto_then_readfrom(self.device_address, out_buffer, in_buffer, out_start=out_start,
+                                       out_end=out_end, in_start=in_start, in_end=in_end)
+
+    def __enter__(self):
+        while not self.i2c.try_lock():
+            time.sleep(0)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.i2c.unlock()
+        return False
+
+
+class PCA9685:
+    """Same constructor, reset and frequency behaviour (register transactions included) as adafruit_pca9685.PCA9685."""
+    def __init__(self, i2c_bus, *, address=0x40, reference_clock_speed=_OSC_HZ):
+        self.i2c_device = _SimI2CDevice(i2c_bus, address)
+        self.reference_clock_speed = reference_clock_speed
+        self.reset()
+
+    def _write_reg(self, reg, value):
+        with self.i2c_device as dev:
+            dev.write(bytes([reg, value]))
+
+    def _read_reg(self, reg):
+        buf = bytearray(1)
+        with self.i2c_device as dev:
+            dev.write_then_readinto(bytes([reg]), buf)
+        return buf[0]
+
+    def reset(self):
+        self._write_reg(MODE1, 0x00)
+
+    @property
+    def frequency(self):
+        prescale = self._read_reg(PRE_SCALE)
+        if prescale < 3:
+            raise ValueError("The device pre_scale register (0xFE) was not read or returned a value < 3")
+        return self.reference_clock_speed / 4096 / (prescale + 1)
+
+    @frequency.setter
+    def frequency(self, freq):
+        prescale = int(self.reference_clock_speed / 4096.0 / freq + 0.5) - 1
+        if prescale < 3:
+            raise ValueError("PCA9685 cannot output at the given frequency")
+        old_mode = self._read_reg(MODE1)
+        self._write_reg(MODE1, (old_mode & 0x7F) | _MODE1_SLEEP)
+        self._write_reg(PRE_SCALE, prescale)
+        self._write_reg(MODE1, old_mode)
+        self.i2c_device.i2c.device_wait(_OSC_RESTART_S)
+        self._write_reg(MODE1, old_mode | 0xA0)
+
+    def deinit(self):
+        self.reset()
+
+
+# --- capacity planning ---
+def frame_bus_time(n_servos, n_boards, baudrate):
+    """
+    Worst-case bus seconds per control frame: every channel changed, servos on
+    adjacent channels (one burst per board; each gap in the wiring adds a transaction).
+    """
+    per_board = [n_servos // n_boards + (1 if b < n_servos % n_boards else 0) for b in range(n_boards)]
+    # address + register pointer + 4 bytes per channel
+    return sum(transaction_time(2 + 4 * n, baudrate) for n in per_board if n)
+
+
+def max_control_hz(n_servos, n_boards, baudrate, max_occupancy=0.8):
+    """Highest control rate whose worst-case frames keep bus occupancy under max_occupancy."""
+    return max_occupancy / frame_bus_time(n_servos, n_boards, baudrate)
+
+
+def max_servos(control_hz, baudrate, max_occupancy=0.8, channels_per_board=_CHANNELS):
+    """Most servos a control rate can drive (boards filled to channels_per_board)."""
+    n = 0
+    while True:
+        boards = (n + 1 + channels_per_board - 1) // channels_per_board
+        if frame_bus_time(n + 1, boards, baudrate) * control_hz > max_occupancy or n >= 62 * channels_per_board:
+            return n
+        n += 1
+
+
+def _measure(servo_map, baudrate, control_hz, seconds):
+    """Run a sweep through MotionEngine on a realtime SimI2C; (bus report, engine timing stats)."""
+    import contextlib
+    import io
+    import json
+    from motion_engine import MotionEngine, MotionGoal
+    from servo_controller import ServoController
+
+    with open(servo_map, "r") as f:
+        boards = sorted({int(s["board_addr"], 16) for s in json.load(f)["servos"]})
+    bus = SimI2C(frequency=baudrate, boards=boards, realtime=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        servo = ServoController(servo_map, i2c=bus, pca_driver=PCA9685)
+    engine = MotionEngine(servo, control_hz=control_hz, limit_velocity=False)
+    lo = {nm: cfg["angle_min"] + 5 for nm, cfg in servo.servos.items()}
+    hi = {nm: cfg["angle_max"] - 5 for nm, cfg in servo.servos.items()}
+    poses = [{"duration": seconds / 2, "pose": hi}, {"duration": seconds / 2, "pose": lo}]
+    bus.reset_stats()
+    engine._ticker.reset_stats()
+    goal = engine.push_goal(MotionGoal("sweep", "sequence", poses))
+    while engine.get_status(goal) not in ("SUCCEEDED", "FAILED", "ABORTED", "PREEMPTED"):
+        time.sleep(0.05)
+    timing = engine.get_timing_stats()
+    engine.stop()
+    return bus.report(frames=timing["ticks"]), timing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PCA9685 bus capacity: prediction and simulated run")
+    parser.add_argument("--servo-map", default="servo_map_dog.json")
+    parser.add_argument("--hz", type=int, default=50, help="control_hz")
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f"--- predicted (worst case, 80% bus occupancy) at {args.hz} Hz ---")
+    for baud in BAUD_RATES:
+        print(f"{baud // 1000:5d} kHz: up to {max_servos(args.hz, baud):4d} servos;"
+              f" 12 servos/1 board up to {max_control_hz(12, 1, baud):6.0f} Hz")
+    print(f"--- simulated run: {args.servo_map} at {args.hz} Hz ---")
+    for baud in BAUD_RATES:
+        bus, timing = _measure(args.servo_map, baud, args.hz, args.seconds)
+        print(f"{baud // 1000:5d} kHz: {bus['frame_rate']:6.1f} frames/s, occupancy {bus['occupancy']:6.1%},"
+              f" {bus['bus_time_per_frame_s'] * 1e3:6.2f} ms bus/frame, overruns {timing['overruns']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# kinematics.py
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# legs in solve() order; servo names are <leg>_hip / <leg>_thigh / <leg>_knee
+LEGS = ("fl", "fr", "bl", "br")
+JOINTS = ("hip", "thigh", "knee")
+# +1 for left legs (body +y), -1 for right legs
+_SIDE = {"fl": 1.0, "fr": -1.0, "bl": 1.0, "br": -1.0}
+_FRONT = {"fl": 1.0, "fr": 1.0, "bl": -1.0, "br": -1.0}
+
+
+class KinematicsError(Exception):
+    pass
+
+
+@dataclass
+class LegGeometry:
+    """Link lengths and hip placement in metres. Body frame: x forward, y left, z up."""
+    hip_offset: float = 0.045   # hip axis -> thigh plane, lateral
+    thigh: float = 0.110
+    shank: float = 0.120
+    body_length: float = 0.200  # front hip axis to back hip axis
+    body_width: float = 0.090   # left hip axis to right hip axis
+    stand_height: float = 0.160  # hip axis -> foot at the servo map's neutral pose
+
+
+class LegKinematics:
+    """
+    Closed-form 3-DOF inverse kinematics (hip abduction, thigh and knee pitch)
+    for the four legs, mapping body-frame foot positions to servo angles.
+
+    Geometric joint angles are 0 with the leg straight down; the thigh is
+    positive swinging forward, the knee positive bending (foot moves back).
+    Servo command = zero + direction * joint angle (deg). By default zero is
+    chosen so the servo map neutral pose puts every foot straight below its
+    hip at stand_height. Reachability covers both the leg geometry and
+    each servo's angle_min/angle_max.
+
+    solve() works on whole batches (frames x 4 legs x xyz) with NumPy when it
+    is installed; without it, each leg goes through a cached scalar solution.
+    """
+    def __init__(self, servo, geometry=None, joint_zero=None, joint_direction=None, cache_size=4096):
+        self.servo = servo
+        self.geometry = geometry or LegGeometry()
+        g = self.geometry
+        self.names = [f"{leg}_{joint}" for leg in LEGS for joint in JOINTS]
+        for name in self.names:
+            if name not in servo.servos:
+                raise KinematicsError(f"servo map has no {name}")
+        direction = joint_direction or {}
+        self._dir = [float(direction.get(nm, 1.0)) for nm in self.names]
+        self._joint_zero = dict(joint_zero or {})
+        self._stand = self._solve_leg(0, 0.0, g.hip_offset, -g.stand_height)
+        if self._stand is None:
+            raise KinematicsError("stand_height is out of reach for the leg geometry")
+        self.refresh_calibration()
+        self._origin = [(_FRONT[leg] * g.body_length / 2.0, _SIDE[leg] * g.body_width / 2.0, 0.0) for leg in LEGS]
+        self._solve_leg_cached = lru_cache(maxsize=cache_size)(self._solve_leg)
+
+    def refresh_calibration(self):
+        """Re-derive zero angles and limits from the servo's calibration (after a hot reload)."""
+        cfg = self.servo.servos
+        zero = []
+        for i, nm in enumerate(self.names):
+            if nm in self._joint_zero:
+                zero.append(float(self._joint_zero[nm]))
+            else:
+                neutral = cfg[nm].get("neutral", (cfg[nm]["angle_min"] + cfg[nm]["angle_max"]) / 2.0)
+                zero.append(neutral - self._dir[i] * math.degrees(self._stand[i % 3]))
+        idx = [self.servo._servo_index[nm] for nm in self.names]
+        self._zero = zero
+        self._lo = [self.servo._cal_lo[i] for i in idx]
+        self._hi = [self.servo._cal_hi[i] for i in idx]
+
+    def stance(self, height=None):
+        """Body-frame foot positions (LEGS order) straight below each hip; neutral pose at stand_height."""
+        g = self.geometry
+        h = g.stand_height if height is None else height
+        return [(ox, oy + _SIDE[leg] * g.hip_offset, oz - h) for leg, (ox, oy, oz) in zip(LEGS, self._origin)]
+
+    # --- scalar closed form (one leg, leg frame) ---
+    def _solve_leg(self, leg_i, x, y, z):
+        """Geometric (hip, thigh, knee) radians for a foot at (x, y, z) from the hip axis, or None."""
+        g = self.geometry
+        y = _SIDE[LEGS[leg_i]] * y  # outward positive
+        d2 = y * y + z * z
+        if d2 < g.hip_offset * g.hip_offset:
+            return None
+        r = math.sqrt(d2 - g.hip_offset * g.hip_offset)
+        hip = math.atan2(y, -z) - math.atan2(g.hip_offset, r)
+        c = (x * x + r * r - g.thigh * g.thigh - g.shank * g.shank) / (2.0 * g.thigh * g.shank)
+        if c < -1.0 or c > 1.0:
+            return None
+        knee = math.acos(c)
+        thigh = math.atan2(x, r) + math.atan2(g.shank * math.sin(knee), g.thigh + g.shank * math.cos(knee))
+        return hip, thigh, knee
+
+    def forward(self, leg_i, hip, thigh, knee):
+        """Body-frame foot position for geometric joint angles (radians); inverse of _solve_leg."""
+        g = self.geometry
+        x = g.thigh * math.sin(thigh) + g.shank * math.sin(thigh - knee)
+        r = g.thigh * math.cos(thigh) + g.shank * math.cos(thigh - knee)
+        # rotate (hip_offset, -r) in the y/z plane by the abduction angle
+        y = g.hip_offset * math.cos(hip) + r * math.sin(hip)
+        z = g.hip_offset * math.sin(hip) - r * math.cos(hip)
+        ox, oy, oz = self._origin[leg_i]
+        return x + ox, _SIDE[LEGS[leg_i]] * y + oy, z + oz
+
+    # --- batches ---
+    def solve(self, feet):
+        """
+        feet: frames x 4 x 3 body-frame foot positions (legs in LEGS order), or a
+        single 4 x 3 stance. Returns (angles, reachable): servo angles with the
+        same shape and a frames x 4 (or 4) boolean mask; unreachable legs get nan.
+        """
+        if np is not None:
+            return self._solve_np(feet)
+        single = len(feet) == 4 and not hasattr(feet[0][0], "__len__")
+        frames = [feet] if single else feet
+        angles, reachable = [], []
+        for frame in frames:
+            row, ok = [], []
+            for leg_i, (fx, fy, fz) in enumerate(frame):
+                ox, oy, oz = self._origin[leg_i]
+                sol = self._solve_leg_cached(leg_i, round(fx - ox, 5), round(fy - oy, 5), round(fz - oz, 5))
+                row.append(self._to_servo(leg_i, sol))
+                ok.append(sol is not None and self._in_limits(leg_i, row[-1]))
+            angles.append(row)
+            reachable.append(ok)
+        return (angles[0], reachable[0]) if single else (angles, reachable)
+
+    def _to_servo(self, leg_i, sol):
+        if sol is None:
+            return [math.nan] * 3
+        base = 3 * leg_i
+        return [self._zero[base + j] + self._dir[base + j] * math.degrees(sol[j]) for j in range(3)]
+
+    def _in_limits(self, leg_i, servo_angles):
+        base = 3 * leg_i
+        return all(self._lo[base + j] <= servo_angles[j] <= self._hi[base + j] for j in range(3))
+
+    def _solve_np(self, feet):
+        g = self.geometry
+        p = np.asarray(feet, dtype=float)
+        single = p.ndim == 2
+        if single:
+            p = p[None]
+        p = p - np.array(self._origin)
+        side = np.array([_SIDE[leg] for leg in LEGS])
+        x, y, z = p[..., 0], side * p[..., 1], p[..., 2]
+        with np.errstate(invalid="ignore"):
+            r = np.sqrt(y * y + z * z - g.hip_offset ** 2)
+            hip = np.arctan2(y, -z) - np.arctan2(g.hip_offset, r)
+            c = (x * x + r * r - g.thigh ** 2 - g.shank ** 2) / (2.0 * g.thigh * g.shank)
+            knee = np.arccos(c)
+            thigh = np.arctan2(x, r) + np.arctan2(g.shank * np.sin(knee), g.thigh + g.shank * np.cos(knee))
+        geo = np.degrees(np.stack([hip, thigh, knee], axis=-1))
+        # out of reach for the knee still leaves a hip angle: the whole leg is nan, as in solve()'s scalar path
+        geo[np.isnan(geo).any(axis=-1)] = np.nan
+        angles = np.array(self._zero).reshape(4, 3) + np.array(self._dir).reshape(4, 3) * geo
+        with np.errstate(invalid="ignore"):
+            ok = (np.all(angles >= np.array(self._lo).reshape(4, 3), axis=-1)
+                  & np.all(angles <= np.array(self._hi).reshape(4, 3), axis=-1))
+        return (angles[0], ok[0]) if single else (angles, ok)
+
+    # --- goal keyframes ---
+    def solve_pose(self, feet):
+        """{leg: (x, y, z)} for some legs -> {servo_name: angle}; raises KinematicsError if unreachable."""
+        return self.compile_keyframes([{"duration": 0.0, "feet": feet}])[0]["pose"]
+
+    def compile_keyframes(self, poses):
+        """
+        Replace "feet" ({leg: (x, y, z)}, body frame) in keyframes with joint angles,
+        solving every foot-space keyframe in one batch. Legs a keyframe leaves out
+        keep their previous foot target (stance() before the first one);
+        joints given in "pose" override the solution. Returns a new keyframe list.
+        """
+        frames, owners = [], []
+        feet_now = dict(zip(LEGS, self.stance()))
+        for k, kf in enumerate(poses):
+            if "feet" not in kf:
+                continue
+            given = kf["feet"]
+            unknown = set(given) - set(LEGS)
+            if unknown:
+                raise KinematicsError(f"keyframe {k + 1}: unknown legs {sorted(unknown)}")
+            feet_now.update({leg: tuple(float(v) for v in given[leg]) for leg in given})
+            frames.append([feet_now[leg] for leg in LEGS])
+            owners.append((k, set(given)))
+        if not frames:
+            return list(poses)
+
+        angles, ok = self.solve(frames)
+        out = list(poses)
+        for f, (k, legs) in enumerate(owners):
+            pose = {}
+            for leg_i, leg in enumerate(LEGS):
+                if leg not in legs:
+                    continue
+                if not ok[f][leg_i]:
+                    raise KinematicsError(f"keyframe {k + 1}: foot {leg} at {frames[f][leg_i]} is unreachable")
+                for j, joint in enumerate(JOINTS):
+                    pose[f"{leg}_{joint}"] = float(angles[f][leg_i][j])
+            pose.update(poses[k].get("pose", {}))
+            out[k] = {key: val for key, val in poses[k].items() if key != "feet"}
+            out[k]["pose"] = pose
+        return out
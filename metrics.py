@@ -0,0 +1,167 @@
+# metrics.py
+import json
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+# default histogram bucket upper edges, seconds (one overflow bucket above the last)
+LATENCY_BOUNDS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1)
+
+
+class Histogram:
+    """Fixed-bucket histogram: counts[i] holds values <= bounds[i]; the last bucket is overflow."""
+    __slots__ = ("bounds", "counts", "n", "total", "max")
+
+    def __init__(self, bounds=LATENCY_BOUNDS):
+        self.bounds = tuple(bounds)
+        self.counts = array("Q", bytes(8 * (len(self.bounds) + 1)))
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.n += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self):
+        return {"bounds": list(self.bounds), "counts": list(self.counts), "count": self.n,
+                "mean": self.total / self.n if self.n else 0.0, "max": self.max}
+
+
+class Instrumentation:
+    """
+    Shared hot-path counters for ServoController, MotionEngine and DogHAL.
+
+    Instrumented code checks `enabled` before taking any timestamp, so a
+    disabled instance costs one attribute read per call site. Stages are
+    (count, total, max) triples, histograms have fixed buckets; nothing grows
+    with run time. Updates are not locked: each metric has one writer thread
+    in practice, and a lost increment under contention is acceptable here.
+
+    Gauges and sources are callables read only when snapshot() is taken.
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._gauges = {}
+        self._sources = {}
+        self.reset()
+
+    def reset(self):
+        self._stages = {}
+        self._counters = {}
+        self._hists = {}
+        self._t0 = time.monotonic()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    # --- recording (call only when enabled) ---
+    def stage(self, name, dt):
+        s = self._stages.get(name)
+        if s is None:
+            s = self._stages[name] = [0, 0.0, 0.0]
+        s[0] += 1
+        s[1] += dt
+        if dt > s[2]:
+            s[2] = dt
+
+    def count(self, name, n=1):
+        self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe(self, name, value, bounds=LATENCY_BOUNDS):
+        h = self._hists.get(name)
+        if h is None:
+            h = self._hists[name] = Histogram(bounds)
+        h.observe(value)
+
+    # --- read-side ---
+    def gauge(self, name, fn):
+        """Register fn() -> number, sampled at snapshot time (e.g. queue depth)."""
+        self._gauges[name] = fn
+
+    def source(self, name, fn):
+        """Register fn() -> dict included under `name` in snapshots (component stats)."""
+        self._sources[name] = fn
+
+    def snapshot(self):
+        out = {
+            "enabled": self.enabled,
+            "uptime_s": time.monotonic() - self._t0,
+            "stages": {name: {"count": n, "mean": total / n if n else 0.0, "max": mx}
+                       for name, (n, total, mx) in list(self._stages.items())},
+            "counters": dict(self._counters),
+            "histograms": {name: h.snapshot() for name, h in list(self._hists.items())},
+            "gauges": {},
+        }
+        for name, fn in list(self._gauges.items()):
+            try:
+                out["gauges"][name] = fn()
+            except Exception as e:
+                out["gauges"][name] = f"error: {e}"
+        for name, fn in list(self._sources.items()):
+            try:
+                out[name] = fn()
+            except Exception as e:
+                out[name] = {"error": str(e)}
+        return out
+
+    def serve(self, path):
+        """Start a MetricsServer on a Unix socket at `path`; returns it (close() to stop)."""
+        server = MetricsServer(self, path)
+        server.start()
+        return server
+
+
+def _send_snapshot(request, client_address, server):
+    # socketserver request handler (any callable taking these three arguments)
+    data = json.dumps(server.instrumentation.snapshot(), default=str)
+    request.sendall(data.encode() + b"\n")
+
+
+class MetricsServer:
+    """
+    Local Unix-socket endpoint: every connection receives one JSON snapshot
+    line and is closed, e.g.  socat - UNIX-CONNECT:/tmp/robodog.metrics
+    """
+    def __init__(self, instrumentation, path):
+        # imported here so that importing metrics (every ServoController does) stays cheap
+        import socketserver
+        self.path = path
+        if os.path.exists(path):
+            os.unlink(path)
+        self._server = socketserver.ThreadingUnixStreamServer(path, _send_snapshot)
+        self._server.daemon_threads = True
+        self._server.instrumentation = instrumentation
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def read_snapshot(path, timeout=1.0):
+    """Client side of MetricsServer: fetch one snapshot dict."""
+    import socket
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return json.loads(b"".join(chunks))
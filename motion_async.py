@@ -0,0 +1,153 @@
+# motion_async.py
+# asyncio front-end for MotionEngine / BehaviorManager:
+#
+#   aengine = AsyncMotionEngine(engine)
+#   status = await aengine.run_goal(goal)
+#   status = await AsyncBehaviorManager(manager, aengine).perform("bow")
+#   async for fb in aengine.feedback(goal_id): ...
+import asyncio
+import collections
+
+from motion_engine import TERMINAL_STATES
+
+
+class FeedbackStream:
+    """
+    Async iterator over feedback dicts (all goals, or one goal_id until its
+    terminal status). Bounded: when the consumer falls behind, the oldest
+    message is dropped and counted.
+    """
+    def __init__(self, owner, goal_id=None, maxsize=256):
+        self._owner = owner
+        self.goal_id = goal_id
+        self._items = collections.deque(maxlen=maxsize)
+        self._waiter = None
+        self._done = False
+        self.dropped = 0
+
+    def _put(self, fb):
+        if self._done:
+            return
+        if len(self._items) == self._items.maxlen:
+            self.dropped += 1
+        self._items.append(fb)
+        if self.goal_id is not None and fb["status"] in TERMINAL_STATES:
+            self._done = True
+            self._owner._streams.discard(self)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def close(self):
+        self._done = True
+        self._owner._streams.discard(self)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._items:
+            if self._done:
+                raise StopAsyncIteration
+            self._waiter = asyncio.get_running_loop().create_future()
+            await self._waiter
+            self._waiter = None
+        return self._items.popleft()
+
+
+class AsyncMotionEngine:
+    """
+    Awaitable goals on top of a MotionEngine, bound to one event loop.
+
+    A single feedback subscription is shared by everything on the loop; its
+    delivery thread hands each message over with call_soon_threadsafe, and
+    futures / streams are only touched on the loop. Any number of goals can
+    be awaited concurrently without further threads. Cancelling a task that
+    awaits run_goal() cancels the goal.
+    """
+    def __init__(self, engine):
+        self.engine = engine
+        self._loop = None
+        self._subscription = None
+        self._waiters = {}   # goal_id -> [futures]
+        self._streams = set()
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+            self._subscription = self.engine.subscribe(self._from_engine, maxlen=1024)
+        elif loop is not self._loop:
+            raise RuntimeError("AsyncMotionEngine is bound to a different event loop")
+
+    def _from_engine(self, fb):
+        # feedback thread -> event loop
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._dispatch, fb)
+
+    def _dispatch(self, fb):
+        for stream in list(self._streams):
+            if stream.goal_id is None or stream.goal_id == fb["goal_id"]:
+                stream._put(fb)
+        if fb["status"] in TERMINAL_STATES:
+            for fut in self._waiters.pop(fb["goal_id"], ()):
+                if not fut.done():
+                    fut.set_result(fb["status"])
+
+    def wait_goal(self, goal_id):
+        """Future resolving to the terminal status of an already pushed goal_id (call before yielding)."""
+        self._bind()
+        fut = self._loop.create_future()
+        status = self.engine.get_status(goal_id)
+        if status in TERMINAL_STATES:
+            fut.set_result(status)
+        else:
+            self._waiters.setdefault(goal_id, []).append(fut)
+        return fut
+
+    async def wait(self, goal_id):
+        """Terminal status of goal_id; cancelling the wait cancels the goal."""
+        fut = self.wait_goal(goal_id)
+        try:
+            return await fut
+        except asyncio.CancelledError:
+            self.engine.cancel_goal(goal_id)
+            raise
+
+    async def run_goal(self, goal):
+        """Push a MotionGoal and return its terminal status (SUCCEEDED / PREEMPTED / ABORTED / FAILED)."""
+        self._bind()
+        # feedback reaches the loop only after this coroutine yields, so waiting after push can't miss it
+        goal_id = self.engine.push_goal(goal)
+        return await self.wait(goal_id)
+
+    def feedback(self, goal_id=None, maxsize=256):
+        """Async iterator over feedback (for one goal_id it ends after the terminal status)."""
+        self._bind()
+        stream = FeedbackStream(self, goal_id, maxsize)
+        self._streams.add(stream)
+        return stream
+
+    def close(self):
+        if self._subscription is not None:
+            self.engine.unsubscribe(self._subscription)
+            self._subscription = None
+        for stream in list(self._streams):
+            stream.close()
+
+
+class AsyncBehaviorManager:
+    """`await perform(name)` for BehaviorManager behaviors and simple tasks."""
+    def __init__(self, manager, async_engine=None):
+        self.manager = manager
+        self.aengine = async_engine or AsyncMotionEngine(manager.motion_engine)
+
+    async def perform(self, name, priority=5):
+        """Run a behavior (or simple task) to completion; returns its terminal status."""
+        self.aengine._bind()
+        goal_id = self.manager.execute_task(name, priority=priority)
+        if goal_id is None:
+            raise KeyError(f"unknown or empty behavior: {name}")
+        return await self.aengine.wait(goal_id)
@@ -3,9 +3,17 @@ import time
 import threading
 import heapq
 import uuid
-from dataclasses import dataclass, field
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, field
 from typing import Dict, Any, Callable, List
 
+from feedback import FeedbackDispatcher
+from gait import GaitGenerator, gait_params
+from metrics import Instrumentation
+from scheduler import CATCH_UP, SKIP, TickScheduler
+from trajectory import (LINEAR, MIN_JERK, SPLINE, KeyframeCurve, TrajectoryCache,
+                        compile_sequence, limit_durations, sequence_joints)
+
 # states
 PENDING = "PENDING"
 ACTIVE = "ACTIVE"
@@ -13,44 +21,144 @@ SUCCEEDED = "SUCCEEDED"
 PREEMPTED = "PREEMPTED"
 ABORTED = "ABORTED"
 FAILED = "FAILED"
+TERMINAL_STATES = (SUCCEEDED, PREEMPTED, ABORTED, FAILED)
 
 def lerp(a, b, t): return a + (b - a) * t
 
+class StageTimes:
+    """Accumulated per-stage durations (seconds) of the control tick."""
+    def __init__(self, stages):
+        self.stages = stages
+        self.reset()
+
+    def reset(self):
+        self.ticks = 0
+        self._total = dict.fromkeys(self.stages, 0.0)
+        self._max = dict.fromkeys(self.stages, 0.0)
+
+    def add(self, stage, dt):
+        self._total[stage] += dt
+        if dt > self._max[stage]:
+            self._max[stage] = dt
+
+    def stats(self, period):
+        n = self.ticks
+        out = {}
+        total_mean = 0.0
+        for stage in self.stages:
+            mean = self._total[stage] / n if n else 0.0
+            total_mean += mean
+            out[stage] = {"mean": mean, "max": self._max[stage]}
+        out["tick_mean"] = total_mean
+        out["budget_fraction"] = total_mean / period
+        return out
+
 @dataclass(order=True)
 class PrioritizedItem:
     priority: int
     count: int
     goal: Any=field(compare=False)
+    cancelled: bool=field(default=False, compare=False)  # tombstone; skipped when popped
 
 @dataclass
 class MotionGoal:
     goal_id: str
     action: str
-    poses: List[Dict]  # for 'sequence' : list of {duration, pose}
+    poses: List[Dict]  # for 'sequence' : list of {duration, pose} and/or {duration, feet: {leg: (x, y, z)}}
     priority: int = 5
     preemptable: bool = True
     timeout: float = None
     metadata: Dict = None
+    cache_key: str = None  # if set, the sequence is compiled once per start pose/rate and cached
+    min_time: bool = False  # ignore keyframe durations, run as fast as the joint speed limits allow
+    profile: str = LINEAR  # LINEAR / MIN_JERK / SPLINE (trajectory.py)
+    gait: Any = None  # for 'gait': GaitParams or a dict of its fields (gait.py); poses unused
 
 class MotionEngine:
-    def __init__(self, servo_controller, feedback_cb: Callable[[Dict], None]=None, control_hz: int=30):
+    def __init__(self, servo_controller, feedback_cb: Callable[[Dict], None]=None, control_hz: int=30,
+                 overrun_policy: str=SKIP, status_history: int=1024, trajectory_cache_size: int=64,
+                 vectorized: bool=False, limit_velocity: bool=True, stabilizer=None, kinematics=None,
+                 instrumentation=None, telemetry=None):
         self.servo = servo_controller
+        # shared with the servo controller unless given (metrics.py); feedback time, tick lateness
+        self.instrumentation = (instrumentation or getattr(servo_controller, "instrumentation", None)
+                                or Instrumentation())
         self.control_hz = control_hz
+        # interpolate/convert whole fixed-order pose arrays instead of per-joint dicts
+        self.vectorized = vectorized
+        # stretch keyframes that would exceed the servo map's default_speed_dps
+        self.limit_velocity = limit_velocity
+        # optional per-tick correction between interpolation and the servo write (balance.py)
+        self.stabilizer = stabilizer
+        self._stage_times = StageTimes(("interpolate", "stabilize", "write"))
+        # solves foot-space ("feet") keyframes once per goal (kinematics.LegKinematics)
+        self.kinematics = kinematics
+        self._solved_feet = {}  # cache_key -> joint-space keyframes
+        self._gait = None  # GaitGenerator of the active 'gait' goal
+        # live pose segment for other processes (pose_telemetry.PoseTelemetry), one record per written frame
+        self.telemetry = telemetry
+        self._frames = 0
+        self._ticker = TickScheduler(control_hz, overrun_policy, self.instrumentation)
+        self.trajectory_cache = TrajectoryCache(trajectory_cache_size)
         self._queue = []
         self._counter = 0
-        self._queue_lock = threading.Lock()
+        # goal registry: pending goal_id -> heap entry; cancelled entries stay in the
+        # heap as tombstones until popped (or compacted once they outnumber live ones)
+        self._pending = {}
+        self._tombstones = 0
+        # earliest timeout among pending goals (may be stale-early; a sweep recomputes it)
+        self._next_deadline = None
+        # bounded LRU of terminal statuses, goal_id -> status
+        self._finished = OrderedDict()
+        self._status_history = status_history
+        # push_goal/stop notify this, so an idle worker sleeps until there is work
+        self._queue_lock = threading.Condition()
+        self._latency_n = 0
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+        self._latency_last = 0.0
         self._active_goal = None
+        # (monotonic time, {joint: deg/s}) left by a preempted goal for the next goal's first segment
+        self._handoff = None
         self._active_lock = threading.Lock()
         self._stop_event = threading.Event()
-        self._feedback_cb = feedback_cb
+        # (fn, done event) run by the control thread at the next tick boundary (or when idle)
+        self._tick_calls = deque()
+        # feedback is delivered by per-subscriber threads, never on the control thread
+        self._feedback = FeedbackDispatcher(servo_controller.get_current_pose, self.instrumentation)
+        if feedback_cb:
+            self._feedback.subscribe(feedback_cb)
+        # keep the last known pose on disk for ServoController(pose_snapshot=...) after a restart
+        if getattr(servo_controller, "pose_snapshot", None):
+            self._feedback.subscribe(self._save_pose_snapshot, maxlen=8)
+        self.instrumentation.gauge("queue_depth", self.queue_depth)
+        self.instrumentation.source("engine", self.get_timing_stats)
+        self.instrumentation.gauge("feedback_dropped", self._feedback.dropped)
         self._worker = threading.Thread(target=self._loop, daemon=True)
         self._worker.start()
 
     def push_goal(self, goal: MotionGoal):
+        goal._pushed_at = time.monotonic()
+        goal._cancel_requested = False
+        goal._preempt_requested = False
+        # timeout counts from push, so it covers time spent waiting in the queue
+        goal._deadline = goal._pushed_at + goal.timeout if goal.timeout else None
         with self._queue_lock:
             self._counter += 1
             item = PrioritizedItem(priority=-goal.priority, count=self._counter, goal=goal)
+            old = self._pending.get(goal.goal_id)
+            if old is not None:
+                self._tombstone(old)
+            self._pending[goal.goal_id] = item
+            self._finished.pop(goal.goal_id, None)
             heapq.heappush(self._queue, item)
+            if goal._deadline is not None and (self._next_deadline is None or goal._deadline < self._next_deadline):
+                self._next_deadline = goal._deadline
+            # interrupt a lower-priority preemptable goal; the worker notices on its next tick
+            active = self._active_goal
+            if active is not None and active.preemptable and goal.priority > active.priority:
+                active._preempt_requested = True
+            self._queue_lock.notify()
         return goal.goal_id
 
     def cancel_goal(self, goal_id: str):
@@ -58,93 +166,517 @@ class MotionEngine:
             if self._active_goal and self._active_goal.goal_id == goal_id:
                 self._active_goal._cancel_requested = True
                 return True
-        # remove from queue
+        # drop from the registry; the heap entry becomes a tombstone
         with self._queue_lock:
-            newq = [itm for itm in self._queue if itm.goal.goal_id != goal_id]
-            if len(newq) != len(self._queue):
-                heapq.heapify(newq)
-                self._queue = newq
-                return True
-        return False
+            item = self._pending.pop(goal_id, None)
+            if item is None:
+                return False
+            self._tombstone(item)
+        self._publish_feedback(goal_id, PREEMPTED, 0.0, "cancelled before start")
+        return True
+
+    def _tombstone(self, item):
+        # caller holds _queue_lock
+        item.cancelled = True
+        self._tombstones += 1
+        if self._tombstones > 32 and self._tombstones * 2 > len(self._queue):
+            self._queue = [itm for itm in self._queue if not itm.cancelled]
+            heapq.heapify(self._queue)
+            self._tombstones = 0
+
+    def _expire_pending(self):
+        """ABORT queued goals whose timeout passed while they waited (worker thread)."""
+        now = time.monotonic()
+        expired = []
+        with self._queue_lock:
+            earliest = None
+            for goal_id, item in list(self._pending.items()):
+                deadline = item.goal._deadline
+                if deadline is None:
+                    continue
+                if now > deadline:
+                    del self._pending[goal_id]
+                    self._tombstone(item)
+                    expired.append(goal_id)
+                elif earliest is None or deadline < earliest:
+                    earliest = deadline
+            self._next_deadline = earliest
+        for goal_id in expired:
+            self._publish_feedback(goal_id, ABORTED, 0.0, "timed out before start")
 
     def _pop_next_goal(self):
+        """Block until a goal is queued or stop() is called (then returns None)."""
         with self._queue_lock:
-            if not self._queue: return None
-            item = heapq.heappop(self._queue)
-            return item.goal
+            while True:
+                while not self._queue:
+                    if self._stop_event.is_set() or self._tick_calls:
+                        return None
+                    self._queue_lock.wait()
+                item = heapq.heappop(self._queue)
+                if item.cancelled:
+                    self._tombstones -= 1
+                    continue
+                del self._pending[item.goal.goal_id]
+                # becomes active before leaving the registry lock, so get_status never sees a gap
+                with self._active_lock:
+                    self._active_goal = item.goal
+                return item.goal
+
+    def update_gait(self, goal_id: str=None, **params):
+        """
+        Change the parameters (GaitParams fields) of the walking gait goal, or of a
+        queued one. The phase keeps running, so teleop updates don't restart the
+        stride. Returns False if goal_id is not a gait goal.
+        """
+        with self._active_lock:
+            gen, active = self._gait, self._active_goal
+        if gen is not None and (goal_id is None or active.goal_id == goal_id):
+            gen.set_params(**params)
+            return True
+        with self._queue_lock:
+            item = self._pending.get(goal_id)
+            if item is None or item.goal.action != "gait":
+                return False
+            item.goal.gait = gait_params(dict(asdict(gait_params(item.goal.gait)), **params))
+        return True
+
+    def get_status(self, goal_id: str):
+        """PENDING / ACTIVE / a terminal state, or None if unknown (or evicted from history)."""
+        with self._queue_lock:
+            if goal_id in self._pending:
+                return PENDING
+            status = self._finished.get(goal_id)
+        if status is not None:
+            return status
+        active = self._active_goal
+        if active is not None and active.goal_id == goal_id:
+            return ACTIVE
+        return None
+
+    def queue_depth(self):
+        """Number of goals waiting to run (excludes the active goal)."""
+        return len(self._pending)
+
+    def _record_terminal(self, goal_id, status):
+        with self._queue_lock:
+            self._finished[goal_id] = status
+            self._finished.move_to_end(goal_id)
+            while len(self._finished) > self._status_history:
+                self._finished.popitem(last=False)
+
+    def run_at_tick(self, fn):
+        """
+        Run fn() on the control thread at the next tick boundary (between ticks of the
+        active goal, or right away when idle). Returns an Event set once it has run.
+        """
+        done = threading.Event()
+        with self._queue_lock:
+            self._tick_calls.append((fn, done))
+            self._queue_lock.notify()
+        return done
+
+    def _run_tick_calls(self):
+        while self._tick_calls:
+            fn, done = self._tick_calls.popleft()
+            try:
+                fn()
+            except Exception as e:
+                print(f"[MotionEngine] tick call failed: {e}")
+            done.set()
+
+    def reload_calibration(self, servo_map_path):
+        """
+        Parse / check servo_map_path on the calling thread, then swap the servo
+        calibration in at a tick boundary and drop compiled trajectories (their PWM
+        tables used the old one); the kinematics re-derive their zero angles and
+        limits, and foot-space keyframes are solved again. A goal already streaming
+        a compiled table finishes on it; live interpolation uses the new calibration
+        from the next tick. Raises ServoConfigError before anything changes; returns
+        the swap's Event.
+        """
+        cal = self.servo.load_calibration(servo_map_path)
+
+        def swap():
+            self.servo.apply_calibration(cal)
+            self.trajectory_cache.invalidate()
+            if self.kinematics is not None:
+                # zero angles follow `neutral`, reachability the limits; solved feet used both
+                self.kinematics.refresh_calibration()
+                self._solved_feet.clear()
+        return self.run_at_tick(swap)
+
+    def invalidate_cache_key(self, cache_key):
+        """Forget compiled trajectories / solved feet for cache_key (applied at a tick boundary)."""
+        def drop():
+            self.trajectory_cache.invalidate(cache_key)
+            self._solved_feet.pop(cache_key, None)
+        return self.run_at_tick(drop)
 
     def _loop(self):
         while not self._stop_event.is_set():
+            if self._next_deadline is not None and time.monotonic() > self._next_deadline:
+                self._expire_pending()
             goal = self._pop_next_goal()
+            if self._tick_calls:
+                self._run_tick_calls()
             if goal is None:
-                time.sleep(0.05)
                 continue
-            with self._active_lock:
-                self._active_goal = goal
-                goal._cancel_requested = False
             try:
-                if goal.action == "pose":
+                if goal._deadline is not None and time.monotonic() > goal._deadline:
+                    self._publish_feedback(goal.goal_id, ABORTED, 0.0, "timed out before start")
+                elif goal.action == "pose":
                     self._execute_pose(goal)
                 elif goal.action == "sequence":
                     self._execute_sequence(goal)
+                elif goal.action == "gait":
+                    self._execute_gait(goal)
                 else:
                     self._publish_feedback(goal.goal_id, FAILED, 0.0, "unsupported action")
+            except Exception as e:
+                self._publish_feedback(goal.goal_id, FAILED, 0.0, f"error: {e}")
             finally:
                 with self._active_lock:
                     self._active_goal = None
 
-    def _publish_feedback(self, goal_id, status, progress, message=None):
-        fb = {
-            "goal_id": goal_id,
-            "status": status,
-            "progress": progress,
-            "current_pose": self.servo.get_current_pose(),
-            "message": message,
-            "timestamp": time.time()
-        }
-        if self._feedback_cb:
-            try:
-                self._feedback_cb(fb)
-            except Exception:
-                pass
+    def _check_interrupt(self, goal: MotionGoal):
+        """(status, message) if the active goal must stop this tick, else None."""
+        if self._stop_event.is_set():
+            return ABORTED, "engine stopped"
+        next_deadline = self._next_deadline
+        if next_deadline is not None and time.monotonic() > next_deadline:
+            # goals queued behind this one time out now, not when they would have started
+            self._expire_pending()
+        if goal._cancel_requested:
+            return PREEMPTED, "preempted"
+        if goal._preempt_requested:
+            return PREEMPTED, "preempted by higher priority goal"
+        if goal._deadline is not None and time.monotonic() > goal._deadline:
+            return ABORTED, "timeout"
+        return None
+
+    def _set_handoff(self, velocity):
+        self._handoff = (time.monotonic(), velocity)
+
+    def _handoff_pending(self):
+        # only valid if the next goal starts right away; otherwise the joints have stopped
+        return self._handoff is not None and time.monotonic() - self._handoff[0] < 2 * self._ticker.period
+
+    def _take_handoff(self, names):
+        """Start velocities for `names` left by a just-preempted goal (None if at rest)."""
+        fresh = self._handoff_pending()
+        handoff, self._handoff = self._handoff, None
+        if not fresh:
+            return None
+        return [handoff[1].get(nm, 0.0) for nm in names]
+
+    def subscribe(self, callback: Callable[[Dict], None], max_hz: float=None, maxlen: int=64, coalesce: bool=True):
+        """
+        Add a feedback subscriber (feedback.Subscription). It gets its own thread and
+        bounded queue; max_hz rate-limits progress messages, coalesce keeps only the
+        latest progress per goal under backpressure. Terminal statuses always arrive.
+        """
+        return self._feedback.subscribe(callback, max_hz=max_hz, maxlen=maxlen, coalesce=coalesce)
+
+    def unsubscribe(self, subscription):
+        self._feedback.unsubscribe(subscription)
+
+    def feedback_stats(self):
+        """Per-subscriber delivered / coalesced / dropped / errors / pending, and total dropped."""
+        return {"subscribers": self._feedback.stats(), "dropped": self._feedback.dropped()}
+
+    def _publish_feedback(self, goal_id, status, progress, message=None, extra=None):
+        if status in TERMINAL_STATES:
+            self._record_terminal(goal_id, status)
+        self._feedback.publish(goal_id, status, progress, message, extra)
 
     def _execute_pose(self, goal: MotionGoal):
         pose = goal.poses[0]["pose"]
         duration = goal.poses[0].get("duration", 0.5)
-        # reuse sequence executor
-        seq_goal = MotionGoal(goal_id=goal.goal_id, action="sequence", poses=[{"duration": duration, "pose": pose}], priority=goal.priority)
-        self._execute_sequence(seq_goal)
-
-    def _execute_sequence(self, goal: MotionGoal):
-        current = self.servo.get_current_pose()
-        total_k = len(goal.poses)
-        if total_k == 0:
+        # reuse sequence executor (same goal object so cancel requests still apply)
+        self._execute_sequence(goal, poses=[{"duration": duration, "pose": pose}])
+
+    def _record_first_write(self, goal: MotionGoal):
+        pushed = getattr(goal, "_pushed_at", None)
+        if pushed is None:
+            return
+        goal._pushed_at = None
+        latency = time.monotonic() - pushed
+        self._latency_n += 1
+        self._latency_sum += latency
+        self._latency_last = latency
+        if latency > self._latency_max:
+            self._latency_max = latency
+
+    def _save_pose_snapshot(self, fb):
+        # feedback thread: once per finished goal, never on the control thread
+        if fb["status"] in TERMINAL_STATES:
+            self.servo.save_pose_snapshot()
+
+    def _publish_frame(self, goal: MotionGoal):
+        self._frames += 1
+        self.telemetry.publish_servo(self.servo, self._frames, goal.goal_id)
+
+    def _execute_sequence(self, goal: MotionGoal, poses=None, compiled=True):
+        if poses is None:
+            poses = goal.poses
+        if len(poses) == 0:
             self._publish_feedback(goal.goal_id, SUCCEEDED, 1.0, "empty sequence")
             return
+        if any("feet" in kf for kf in poses):
+            poses = self._solve_feet(goal, poses)
+        if compiled and goal.cache_key is not None:
+            self._execute_compiled(goal, poses)
+            return
+        servo = self.servo
+        if self.limit_velocity:
+            start = {nm: servo.get_current_value(nm) or 0.0 for nm in sequence_joints(servo, poses)}
+            poses, requested, adjusted = limit_durations(servo, poses, start, goal.min_time, goal.profile)
+            self._report_duration(goal, requested, adjusted)
+        stab = self.stabilizer
+        if self.vectorized:
+            # every servo, held where the keyframes don't move it
+            names = servo.servo_names
+            write = servo.set_pose_array
+        else:
+            names = sequence_joints(servo, poses)
+            if stab is not None:
+                # keep the correction joints in the frame even if the goal doesn't move them
+                names = [nm for nm in servo.servo_names if nm in stab.joints or nm in names]
+            write = lambda values: servo.set_pose(dict(zip(names, values)))
+        start = [servo.get_current_value(nm) or 0.0 for nm in names]
+        if stab is not None:
+            # plan from the uncorrected pose so corrections don't pile up across goals
+            start = [stab.nominal(nm, v) for nm, v in zip(names, start)]
+            stab_cols = stab.columns(names)
+        curve = KeyframeCurve(names, poses, start, goal.profile, vectorized=self.vectorized,
+                              start_velocity=self._take_handoff(names))
+        times = self._stage_times
+        clock = time.perf_counter
 
-        for k_index, kf in enumerate(goal.poses, start=1):
-            dur = max(0.0, float(kf.get("duration", 0.5)))
-            target = kf["pose"]
-            steps = max(1, int(self.control_hz * max(0.001, dur)))
-            for step in range(1, steps + 1):
-                if getattr(goal, "_cancel_requested", False):
-                    self._publish_feedback(goal.goal_id, PREEMPTED, 0.0, "preempted")
+        ticker = self._ticker
+        fb_every = max(1, int(self.control_hz/5))
+        duration = curve.duration
+        total_k = curve.n_keyframes
+        tick = 0
+        tau = 0.0
+        origin = ticker.restart()
+        while True:
+            # tau follows the clock, not the step count, so late ticks don't stretch the motion
+            deadline = ticker.wait()
+            if self._tick_calls:
+                self._run_tick_calls()
+            interrupt = self._check_interrupt(goal)
+            if interrupt:
+                if goal._preempt_requested:
+                    self._set_handoff(dict(zip(names, curve.velocity(tau))))
+                self._publish_feedback(goal.goal_id, interrupt[0], tau / duration if duration else 0.0, interrupt[1])
+                return
+            tau = min(duration, deadline - origin)
+            t0 = clock()
+            values = curve.sample(tau)
+            t1 = clock()
+            if stab is not None:
+                stab.update()
+                values = stab.apply(values, stab_cols)
+            t2 = clock()
+            write(values)
+            t3 = clock()
+            if self.telemetry is not None:
+                self._publish_frame(goal)
+            times.add("interpolate", t1 - t0)
+            times.add("stabilize", t2 - t1)
+            times.add("write", t3 - t2)
+            times.ticks += 1
+            tick += 1
+            if tick == 1:
+                self._record_first_write(goal)
+            if tau >= duration:
+                break
+            # feedback at ~5Hz
+            if tick % fb_every == 0:
+                self._publish_feedback(goal.goal_id, ACTIVE, tau / duration,
+                                       f"keyframe {curve.keyframe_at(tau)}/{total_k}")
+        self._publish_feedback(goal.goal_id, SUCCEEDED, 1.0, "sequence complete")
+
+    def _execute_gait(self, goal: MotionGoal):
+        """Walk: one GaitGenerator frame per tick until the duration ends (then settle) or an interrupt."""
+        if self.kinematics is None:
+            raise RuntimeError("gait goals need a kinematics solver")
+        params = gait_params(goal.gait)
+        gen = GaitGenerator(self.kinematics, params)
+        servo = self.servo
+        names = gen.names
+        stab = self.stabilizer
+        start = [servo.get_current_value(nm) or 0.0 for nm in names]
+        if stab is not None:
+            start = [stab.nominal(nm, v) for nm, v in zip(names, start)]
+            stab_cols = stab.columns(names)
+        self._take_handoff(names)
+        # ease from wherever the joints are into the gait's stance over the blend time
+        lead_in = gen.blend_time
+        times = self._stage_times
+        clock = time.perf_counter
+        ticker = self._ticker
+        fb_every = max(1, int(self.control_hz/5))
+        duration = params.duration
+        with self._active_lock:
+            self._gait = gen
+        try:
+            tick = 0
+            t = 0.0
+            stopping = False
+            values = prev = None
+            origin = last = ticker.restart()
+            while True:
+                deadline = ticker.wait()
+                if self._tick_calls:
+                    self._run_tick_calls()
+                interrupt = self._check_interrupt(goal)
+                if interrupt:
+                    if goal._preempt_requested and prev is not None:
+                        self._set_handoff({nm: (b - a) / ticker.period for nm, a, b in zip(names, prev, values)})
+                    self._publish_feedback(goal.goal_id, interrupt[0],
+                                           min(1.0, t / duration) if duration else 0.0, interrupt[1])
                     return
-                t = step / steps
-                interp = {}
-                for joint, tgt in target.items():
-                    start_val = current.get(joint, self.servo.get_current_value(joint) or 0.0)
-                    interp[joint] = lerp(start_val, tgt, t)
-                self.servo.set_pose(interp)
-                # feedback at ~5Hz
-                if step % max(1, int(self.control_hz/5)) == 0:
-                    progress = ((k_index - 1) + (step / steps)) / total_k
-                    self._publish_feedback(goal.goal_id, ACTIVE, progress, f"keyframe {k_index}/{total_k}")
-                time.sleep(1.0 / self.control_hz)
-            # reached keyframe
-            current.update(target)
+                t = deadline - origin
+                dt, last = deadline - last, deadline
+                if duration is not None and t >= duration and not stopping:
+                    gen.stop_stepping()
+                    stopping = True
+                t0 = clock()
+                prev, values = values, gen.step(dt)
+                if t < lead_in:
+                    x = t / lead_in
+                    w = x * x * x * (10.0 - 15.0 * x + 6.0 * x * x)
+                    values = [a + (b - a) * w for a, b in zip(start, values)]
+                t1 = clock()
+                out = values
+                if stab is not None:
+                    stab.update()
+                    out = stab.apply(values, stab_cols)
+                t2 = clock()
+                servo.set_pose(dict(zip(names, out)))
+                t3 = clock()
+                if self.telemetry is not None:
+                    self._publish_frame(goal)
+                times.add("interpolate", t1 - t0)
+                times.add("stabilize", t2 - t1)
+                times.add("write", t3 - t2)
+                times.ticks += 1
+                tick += 1
+                if tick == 1:
+                    self._record_first_write(goal)
+                if stopping and gen.settled():
+                    break
+                if tick % fb_every == 0:
+                    state = gen.state()
+                    self._publish_feedback(goal.goal_id, ACTIVE, min(1.0, t / duration) if duration else 0.0,
+                                           f"{state['gait']} cycle {state['cycles']}", extra={"gait": state})
+        finally:
+            with self._active_lock:
+                self._gait = None
+        self._publish_feedback(goal.goal_id, SUCCEEDED, 1.0, "gait complete")
+
+    def _solve_feet(self, goal: MotionGoal, poses):
+        """Foot-space keyframes -> joint angles, batch-solved once (and kept per cache_key)."""
+        if self.kinematics is None:
+            raise RuntimeError("goal has foot-space keyframes but no kinematics is configured")
+        if goal.cache_key is None:
+            return self.kinematics.compile_keyframes(poses)
+        solved = self._solved_feet.get(goal.cache_key)
+        if solved is None or solved[0] is not poses:
+            solved = (poses, self.kinematics.compile_keyframes(poses))
+            self._solved_feet[goal.cache_key] = solved
+        return solved[1]
+
+    def _report_duration(self, goal: MotionGoal, requested, adjusted):
+        if abs(adjusted - requested) < 1e-6:
+            return
+        self._publish_feedback(goal.goal_id, ACTIVE, 0.0,
+                               f"duration adjusted {requested:.2f}s -> {adjusted:.2f}s (joint speed limits)",
+                               extra={"requested_duration": requested, "duration": adjusted})
+
+    def _compile(self, goal: MotionGoal, poses):
+        joints = sequence_joints(self.servo, poses)
+        start = {nm: self.servo.get_current_value(nm) or 0.0 for nm in joints}
+        limit = self.limit_velocity
+        key = (goal.cache_key, self.control_hz, tuple(round(start[nm], 3) for nm in joints),
+               goal.profile, limit, limit and goal.min_time)
+
+        def compile_fn():
+            limited = limit_durations(self.servo, poses, start, goal.min_time, goal.profile)[0] if limit else poses
+            return compile_sequence(self.servo, limited, start, self.control_hz, goal.profile)
+
+        traj = self.trajectory_cache.get_or_compile(key, compile_fn, poses)
+        if limit:
+            self._report_duration(goal, sum(max(0.0, float(kf.get("duration", 0.5))) for kf in poses), traj.duration)
+        return traj
+
+    def _execute_compiled(self, goal: MotionGoal, poses):
+        """Stream a cached CompiledTrajectory: one table row per tick, no interpolation."""
+        if self._handoff_pending() or self.stabilizer is not None:
+            # still moving from a preempted goal (the cache assumes a start at rest), or
+            # corrections must be added per tick: run live
+            self._execute_sequence(goal, poses, compiled=False)
+            return
+        traj = self._compile(goal, poses)
+        write_frame = self.servo.write_frame
+        groups, names, pwm, angles = traj.groups, traj.names, traj.pwm, traj.angles
+        n_frames, n_joints = traj.n_frames, traj.n_joints
+        total_k = len(traj.keyframe_ends)
+        ticker = self._ticker
+        period = ticker.period
+        fb_every = max(1, int(self.control_hz/5))
+        tick = 0
+        frame = 0
+        origin = ticker.restart()
+        while frame < n_frames:
+            deadline = ticker.wait()
+            if self._tick_calls:
+                self._run_tick_calls()
+            interrupt = self._check_interrupt(goal)
+            if interrupt:
+                if goal._preempt_requested and frame > 1:
+                    a, b = (frame - 2) * n_joints, (frame - 1) * n_joints
+                    self._set_handoff({nm: (angles[b + c] - angles[a + c]) / period
+                                       for c, nm in enumerate(names)})
+                self._publish_feedback(goal.goal_id, interrupt[0], frame / n_frames, interrupt[1])
+                return
+            # frame follows the clock, so skipped ticks skip frames rather than stretch the motion
+            frame = min(n_frames, int(round((deadline - origin) / period)))
+            write_frame(groups, names, pwm, angles, (frame - 1) * n_joints)
+            if self.telemetry is not None:
+                self._publish_frame(goal)
+            tick += 1
+            if tick == 1:
+                self._record_first_write(goal)
+            if tick % fb_every == 0:
+                k_index = traj.keyframe_at(frame)
+                self._publish_feedback(goal.goal_id, ACTIVE, frame / n_frames, f"keyframe {k_index}/{total_k}")
         self._publish_feedback(goal.goal_id, SUCCEEDED, 1.0, "sequence complete")
 
+    def get_timing_stats(self):
+        """
+        Control loop tick timing: overruns, skipped frames, jitter (seconds late vs deadline),
+        per-stage time of the live tick (interpolate / stabilize / write, and their share
+        of the control period), and push-to-first-write latency (push_goal -> first set_pose; includes queue wait
+        behind other goals, so check it with an idle engine).
+        """
+        stats = self._ticker.stats()
+        stats["stages"] = self._stage_times.stats(self._ticker.period)
+        n = self._latency_n
+        stats.update({
+            "first_write_count": n,
+            "first_write_latency_last": self._latency_last,
+            "first_write_latency_mean": self._latency_sum / n if n else 0.0,
+            "first_write_latency_max": self._latency_max,
+        })
+        return stats
+
     def stop(self):
+        """Stop the worker; an active goal ends ABORTED at its next tick and that status is delivered."""
         self._stop_event.set()
+        with self._queue_lock:
+            self._queue_lock.notify_all()
         self._worker.join(timeout=1.0)
+        self._feedback.close()
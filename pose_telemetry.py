@@ -0,0 +1,145 @@
+# pose_telemetry.py
+import json
+import struct
+import time
+from collections import namedtuple
+from multiprocessing import resource_tracker, shared_memory
+
+# segment layout (little endian, fixed for a given joint count n):
+#   0   magic "RDPT", version u16, n u16, 8 pad
+#   16  seq u64 (seqlock: odd while the writer is updating)
+#   24  tick u64, t f64 (monotonic), goal_id 64 bytes utf-8 (nul padded)
+#   104 angles n * f64, pwm n * u16 (LEDn_OFF register value, 0x1000 = full off)
+#   ..  names: u32 length + JSON list (written once at creation)
+_MAGIC = b"RDPT"
+_VERSION = 1
+_HEAD = struct.Struct("<4sHH8x")
+_SEQ_OFF = 16
+_PAYLOAD_OFF = 24
+GOAL_ID_BYTES = 64
+
+PoseSnapshot = namedtuple("PoseSnapshot", "seq tick t goal_id angles pwm")
+
+
+_created = set()  # segments written by this process
+
+
+def _attach(name):
+    # Before 3.13 attaching registers the segment with this process's resource
+    # tracker, which unlinks it when an unrelated reader exits; only the writer
+    # owns it. (Children of the writer share its tracker and should not use this.)
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if name not in _created:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _layout(n):
+    payload = struct.Struct(f"<Qd{GOAL_ID_BYTES}s{n}d{n}H")
+    names_off = _PAYLOAD_OFF + payload.size
+    return payload, names_off
+
+
+class PoseTelemetry:
+    """
+    Writer side of a live pose segment in multiprocessing.shared_memory.
+
+    Every publish() rewrites one fixed-layout record (tick, time, active goal
+    id, commanded angles and PWM per servo) under a seqlock: the sequence
+    counter is odd while the record is being written. Readers in other
+    processes copy the record and retry if the counter moved, so the control
+    loop never waits on a reader and takes no lock of its own.
+
+    Single writer. The ordering relies on aligned 8-byte stores, which holds
+    on x86; CPython has no memory barriers, so on weakly ordered CPUs a torn
+    read is possible but unlikely.
+    """
+    def __init__(self, names, name=None):
+        self.names = list(names)
+        n = len(self.names)
+        self._payload, names_off = _layout(n)
+        names_json = json.dumps(self.names).encode()
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=names_off + 4 + len(names_json))
+        self.name = self._shm.name
+        _created.add(self.name)
+        buf = self._shm.buf
+        _HEAD.pack_into(buf, 0, _MAGIC, _VERSION, n)
+        struct.pack_into(f"<I{len(names_json)}s", buf, names_off, len(names_json), names_json)
+        self._seq = buf[_SEQ_OFF:_SEQ_OFF + 8].cast("Q")
+        self._seq[0] = 0
+        self._pwm_src = None
+        self.publishes = 0
+
+    def publish(self, tick, angles, pwm, goal_id=None):
+        """Write one frame: angles / pwm in `names` order."""
+        gid = (goal_id or "").encode()[:GOAL_ID_BYTES]
+        seq = self._seq[0]
+        self._seq[0] = seq + 1
+        self._payload.pack_into(self._shm.buf, _PAYLOAD_OFF, tick, time.monotonic(), gid, *angles, *pwm)
+        self._seq[0] = seq + 2
+        self.publishes += 1
+
+    def publish_servo(self, servo, tick, goal_id=None):
+        """Publish the servo controller's commanded pose and the PWM in its shadow registers."""
+        if self._pwm_src is None:
+            if servo.servo_names != self.names:
+                raise ValueError("telemetry segment was created for a different servo map")
+            self._pwm_src = [(servo._shadow[servo._cal_board[i]], 4 * servo._cal_channel[i] + 2)
+                             for i in range(len(self.names))]
+        pose = servo._current_pose
+        angles = [pose[nm] for nm in self.names]
+        pwm = [image[o] | image[o + 1] << 8 for image, o in self._pwm_src]
+        self.publish(tick, angles, pwm, goal_id)
+
+    def close(self):
+        self._seq.release()
+        self._shm.close()
+        self._shm.unlink()
+        _created.discard(self.name)
+
+
+class PoseTelemetryReader:
+    """Reader side: attach by segment name and take consistent snapshots."""
+    def __init__(self, name):
+        self._shm = _attach(name)
+        buf = self._shm.buf
+        magic, version, n = _HEAD.unpack_from(buf, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{name} is not a pose telemetry segment")
+        self._payload, names_off = _layout(n)
+        length = struct.unpack_from("<I", buf, names_off)[0]
+        self.names = json.loads(bytes(buf[names_off + 4:names_off + 4 + length]))
+        self._n = n
+        self._seq = buf[_SEQ_OFF:_SEQ_OFF + 8].cast("Q")
+        self.retries = 0
+
+    def read(self, timeout=0.1):
+        """PoseSnapshot of the latest frame (seq 0 = nothing published yet); None if the writer stays busy."""
+        buf = self._shm.buf
+        end = time.monotonic() + timeout
+        while True:
+            seq = self._seq[0]
+            if not seq & 1:
+                data = bytes(buf[_PAYLOAD_OFF:_PAYLOAD_OFF + self._payload.size])
+                if self._seq[0] == seq:
+                    break
+            self.retries += 1
+            if time.monotonic() > end:
+                return None
+        values = self._payload.unpack(data)
+        n = self._n
+        tick, t, gid = values[0], values[1], values[2]
+        return PoseSnapshot(seq // 2, tick, t, gid.rstrip(b"\0").decode(errors="replace"),
+                            values[3:3 + n], values[3 + n:])
+
+    def read_pose(self):
+        """{name: angle} of the latest frame, or None."""
+        snap = self.read()
+        return None if snap is None else dict(zip(self.names, snap.angles))
+
+    def close(self):
+        self._seq.release()
+        self._shm.close()
@@ -0,0 +1,86 @@
+# scheduler.py
+import time
+
+# overrun policies for TickScheduler
+SKIP = "skip"        # drop missed deadlines, realign to the tick grid
+CATCH_UP = "catch_up"  # run missed ticks back-to-back until on schedule
+
+
+class TickScheduler:
+    """
+    Absolute-deadline ticker on the monotonic clock.
+    Deadlines are origin + n * period, so compute time spent between wait()
+    calls doesn't accumulate as drift. A tick that starts more than one period
+    late counts as an overrun and is handled according to `policy`.
+    With an enabled metrics.Instrumentation, lateness also goes into the
+    "<name>_lateness" histogram and overruns into "<name>_overruns".
+    """
+    def __init__(self, hz, policy=SKIP, instrumentation=None, name="tick"):
+        if policy not in (SKIP, CATCH_UP):
+            raise ValueError(f"unknown overrun policy: {policy}")
+        self.period = 1.0 / hz
+        self.policy = policy
+        self.instrumentation = instrumentation
+        self._lateness_name = f"{name}_lateness"
+        self._overruns_name = f"{name}_overruns"
+        self.origin = time.monotonic()
+        self._tick = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self._jitter_sum = 0.0
+        self._jitter_sq = 0.0
+        self._jitter_max = 0.0
+
+    def restart(self):
+        """Start a new tick grid whose first deadline is now; returns the origin (one period back)."""
+        self.origin = time.monotonic() - self.period
+        self._tick = 0
+        return self.origin
+
+    def wait(self):
+        """Sleep until the next deadline; returns that deadline (monotonic seconds)."""
+        self._tick += 1
+        deadline = self.origin + self._tick * self.period
+        now = time.monotonic()
+        if now < deadline:
+            time.sleep(deadline - now)
+            now = time.monotonic()
+        late = now - deadline
+        inst = self.instrumentation
+        if inst is not None and inst.enabled:
+            inst.observe(self._lateness_name, late)
+            if late > self.period:
+                inst.count(self._overruns_name)
+        if late > self.period:
+            self.overruns += 1
+            if self.policy == SKIP:
+                missed = int(late / self.period)
+                self._tick += missed
+                self.skipped += missed
+                deadline += missed * self.period
+                late = now - deadline
+        self.ticks += 1
+        self._jitter_sum += late
+        self._jitter_sq += late * late
+        if late > self._jitter_max:
+            self._jitter_max = late
+        return deadline
+
+    def stats(self):
+        n = self.ticks
+        mean = self._jitter_sum / n if n else 0.0
+        var = max(0.0, self._jitter_sq / n - mean * mean) if n else 0.0
+        return {
+            "period": self.period,
+            "policy": self.policy,
+            "ticks": n,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "jitter_mean": mean,
+            "jitter_std": var ** 0.5,
+            "jitter_max": self._jitter_max,
+        }
@@ -1,59 +1,200 @@
 # servo_controller.py
-import json
 import time
+_import_start = time.perf_counter()  # module import is the first startup phase (see startup_times)
+import json
+import os
+from array import array
 from collections import defaultdict
 
-# If running on Raspberry Pi with adafruit-circuitpython-pca9685:
-try:
-    import busio
-    import board
-    from adafruit_pca9685 import PCA9685
-    _HAS_HW = True
-except Exception:
-    # fallback to simulation/no-hardware mode
-    _HAS_HW = False
+from metrics import Instrumentation
+from servo_trace import TraceRecorder
+
+# optional: whole-array pose conversion (pure Python fallback otherwise); imported on
+# first vectorized use (see load_numpy), as it would dominate the import time of this module
+_np = None
+
+# Raspberry Pi with adafruit-circuitpython-pca9685: imported on first use (see _load_hw),
+# since board / busio take a noticeable part of startup and simulation never needs them
+_hw = None
+
+# PCA9685 register layout: 16 channels x (ON_L, ON_H, OFF_L, OFF_H) from LED0_ON_L
+_LED0_ON_L = 0x06
+_PCA_CHANNELS = 16
+# bytes on the wire for a single-channel write: addr + reg + 4 data bytes
+_SINGLE_WRITE_BYTES = 6
+# LEDn_OFF full-off bit, as written by adafruit duty_cycle = 0 (ON == OFF is not allowed)
+_FULL_OFF = 0x1000
 
 class ServoConfigError(Exception):
     pass
 
+def load_numpy():
+    """The numpy module if installed, else None (cached)."""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:
+            _np = False
+    return _np or None
+
+def _load_hw():
+    """(busio, board, PCA9685) if the hardware libraries import, else None (cached)."""
+    global _hw
+    if _hw is None:
+        try:
+            import busio
+            import board
+            from adafruit_pca9685 import PCA9685
+            _hw = (busio, board, PCA9685)
+        except Exception:
+            # fallback to simulation/no-hardware mode
+            _hw = False
+    return _hw or None
+
+def startup_report(times):
+    """One line per startup phase ({phase: seconds, "total": seconds}) with its share of the total."""
+    total = times.get("total", 0.0) or 1e-12
+    lines = [f"{name:22s} {dt * 1e3:8.2f} ms {100 * dt / total:5.1f}%"
+             for name, dt in times.items() if name != "total"]
+    lines.append(f"{'total':22s} {times.get('total', 0.0) * 1e3:8.2f} ms")
+    return "\n".join(lines)
+
 class ServoController:
-    def __init__(self, servo_map_path, i2c=None, freq=50, simulate_if_no_hw=True):
+    def __init__(self, servo_map_path, i2c=None, freq=50, simulate_if_no_hw=True, trace=None,
+                 instrumentation=None, pose_snapshot=None, pca_driver=None):
         """
         servo_map_path: path to JSON map
-        i2c: optional busio.I2C instance; if None we'll create one when hw present
+        i2c: optional busio.I2C instance; if None we'll create one when hw present.
+             A bus simulator (i2c_sim.SimI2C) runs the hardware path without hardware.
         freq: PWM frequency in Hz (default 50)
-        simulate_if_no_hw: True -> allow running without hardware (logs only)
+        simulate_if_no_hw: True -> allow running without hardware (writes go to the trace)
+        trace: TraceRecorder or file path recording every register write (servo_trace.py);
+               simulation records into an in-memory ring by default, False disables
+        instrumentation: shared metrics.Instrumentation (convert/write stage times, I2C
+               transactions and latency); a disabled one is created if None
+        pose_snapshot: JSON file with the last known pose (save_pose_snapshot); when it
+               exists startup restores that pose instead of forcing neutral
+        pca_driver: PCA9685 driver class, called as pca_driver(i2c, address=...); default
+               adafruit_pca9685.PCA9685. Pass i2c_sim.PCA9685 together with a SimI2C bus.
+        Phase durations of the startup are in startup_times (see startup_report).
         """
+        start = time.perf_counter()
+        global _import_time
+        self.startup_times = {}
+        if _import_time is not None:
+            # once per process, by the first controller
+            self.startup_times["module_import"] = _import_time
+            _import_time = None
         self.freq = freq
-        self.simulate = simulate_if_no_hw and not _HAS_HW
+        hw = _load_hw() if i2c is None else None
+        self.simulate = simulate_if_no_hw and i2c is None and hw is None
+        self._startup_phase("hw_import", start)
         if(self.simulate):
             print("simulation mode")
+        if trace is None and self.simulate:
+            trace = TraceRecorder()
+        elif isinstance(trace, str):
+            trace = TraceRecorder(trace)
+        self.trace = trace or None
+        self.instrumentation = instrumentation or Instrumentation()
     
+        t = time.perf_counter()
         self._load_map(servo_map_path)
+        self._startup_phase("map", t)
         # setup PCA devices (one per board address)
+        t = time.perf_counter()
         self._pca_devices = {}
         if not self.simulate:
+            driver = pca_driver
+            if driver is None or i2c is None:
+                hw = hw or _load_hw()
+                if hw is None:
+                    raise RuntimeError("PCA9685 libraries (busio, board, adafruit_pca9685) are not available")
+                driver = driver or hw[2]
             if i2c is None:
-                i2c = busio.I2C(board.SCL, board.SDA)
+                i2c = hw[0].I2C(hw[1].SCL, hw[1].SDA)
             # create PCA9685 objects for each address
-            for addr in self._addresses:
-                pca = PCA9685(i2c, address=int(addr, 16))
+
+            def open_board(addr):
+                pca = driver(i2c, address=int(addr, 16))
+                # setting frequency also turns on register auto-increment (MODE1.AI)
                 pca.frequency = freq
-                self._pca_devices[addr] = pca
+                return pca
+            # boards come up in parallel: transactions still take turns on the bus lock,
+            # but the oscillator restart delay after each prescale write overlaps
+            if len(self._addresses) > 1:
+                from concurrent.futures import ThreadPoolExecutor
+                with ThreadPoolExecutor(max_workers=len(self._addresses)) as pool:
+                    self._pca_devices = dict(zip(self._addresses, pool.map(open_board, self._addresses)))
+            else:
+                self._pca_devices = {addr: open_board(addr) for addr in self._addresses}
+        self._startup_phase("pca_init", t)
+        t = time.perf_counter()
+        self._init_shadow()
+        self._startup_phase("shadow_readback", t)
+        self.instrumentation.source("bus", self.get_bus_stats)
         # runtime caches
+        t = time.perf_counter()
         self._current_pose = {}
         for nm, cfg in self.servos.items():
             self._current_pose[nm] = cfg.get("neutral", (cfg["angle_min"] + cfg["angle_max"]) / 2.0)
-        
-        print(self._current_pose)
+        self.pose_snapshot = pose_snapshot
+        restored = self._read_pose_snapshot(pose_snapshot) if pose_snapshot else None
+        if restored:
+            self._current_pose.update(restored)
 
         self._enabled = True  # used by emergency_stop
 
-        neutral_pose = {nm: ang for nm, ang in self._current_pose.items()}
-        self.set_pose(neutral_pose)
-        print("[INFO] Robot dog initialized to neutral pose ✅")
+        # channels whose read-back PWM already matches (e.g. a restart without power loss) aren't rewritten
+        self.set_pose(dict(self._current_pose))
+        self._startup_phase("initial_pose", t)
+        self.startup_times["total"] = time.perf_counter() - start + self.startup_times.get("module_import", 0.0)
+        if restored:
+            print(f"[INFO] Robot dog restored to the last known pose ({len(restored)} servos) ✅")
+        else:
+            print("[INFO] Robot dog initialized to neutral pose ✅")
+
+    def _startup_phase(self, name, t0):
+        self.startup_times[name] = time.perf_counter() - t0
+
+    def startup_report(self):
+        return startup_report(self.startup_times)
+
+    # --- last known pose ---
+    def _read_pose_snapshot(self, path):
+        """{servo: angle} from a snapshot file, or None if missing / unreadable (neutral is used then)."""
+        try:
+            with open(path, "r") as f:
+                pose = json.load(f)["pose"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[WARN] ignoring pose snapshot {path}: {e}")
+            return None
+        restored = {}
+        for nm, angle in pose.items():
+            if nm in self._servo_index and isinstance(angle, (int, float)):
+                restored[nm] = angle
+        return restored
+
+    def save_pose_snapshot(self, path=None):
+        """Persist the current commanded pose (atomically) for pose_snapshot= on the next start."""
+        path = path or self.pose_snapshot
+        if not path:
+            raise ValueError("no pose snapshot path")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"time": time.time(), "pose": self.get_current_pose()}, f)
+        os.replace(tmp, path)
 
     def _load_map(self, path):
+        self.servos, addresses = self._parse_map(path)
+        self._addresses = sorted(addresses)
+        self._compile_calibration()
+
+    def _parse_map(self, path):
         with open(path, "r") as f:
             data = json.load(f)
         servos = {}
@@ -78,10 +219,126 @@ class ServoController:
             if key in used:
                 raise ServoConfigError(f"duplicate channel {ch} on board {board_addr}")
             used.add(key)
-        self.servos = servos
-        self._addresses = sorted(addresses)
+        return servos, addresses
+
+    def _compile_calibration(self):
+        """
+        Precompile the servo map into flat per-servo arrays indexed by integer.
+
+        Every servo's angle -> PWM mapping is affine between two clamp limits,
+        so _angle_to_pwm12's offset/reversal/clamp chain folds into:
+            pwm12 = round(clamp(gain * clamp(angle, lo, hi) + bias, 0, 4095))
+        The clamp on the input angle is the same for reversed and normal servos
+        (angle + offset must stay within angle_min..angle_max); reversal only
+        flips the sign of the gain.
+        """
+        self.servo_names = list(self.servos.keys())
+        self._servo_index = {nm: i for i, nm in enumerate(self.servo_names)}
+        board_index = {addr: i for i, addr in enumerate(self._addresses)}
+        n = len(self.servo_names)
+        self._cal_board = array("B", [0] * n)
+        self._cal_channel = array("B", [0] * n)
+        for i, nm in enumerate(self.servo_names):
+            self._cal_board[i] = board_index[self.servos[nm]["board_addr"]]
+            self._cal_channel[i] = self.servos[nm]["channel"]
+        self._set_calibration(self._calibration_arrays(self.servos))
+        self._all_groups = self.board_groups(range(n))
+
+    def _calibration_arrays(self, servos):
+        """Per-servo angle clamp, gain / bias and motion limits for `servos` (in servo_names order)."""
+        period_us = 1_000_000.0 / self.freq
+        n = len(self.servo_names)
+        cal = {
+            "_cal_lo": array("d", [0.0] * n),
+            "_cal_hi": array("d", [0.0] * n),
+            "_cal_gain": array("d", [0.0] * n),
+            "_cal_bias": array("d", [0.0] * n),
+            # motion limits (deg/s, deg/s^2); 0 = unlimited
+            "_cal_speed": array("d", [0.0] * n),
+            "_cal_accel": array("d", [0.0] * n),
+        }
+        for i, nm in enumerate(self.servo_names):
+            cfg = servos[nm]
+            amin, amax = cfg["angle_min"], cfg["angle_max"]
+            offset = cfg.get("offset", 0)
+            min_us = cfg.get("min_pulse_us", 500)
+            max_us = cfg.get("max_pulse_us", 2500)
+            # pwm per degree of *mechanical* angle (after offset/reversal)
+            k = (max_us - min_us) / 180.0 * 4096.0 / period_us
+            c = min_us * 4096.0 / period_us
+            if cfg.get("reversed", False):
+                # mech = 180 - (angle + offset)
+                cal["_cal_gain"][i] = -k
+                cal["_cal_bias"][i] = c + k * (180 - offset)
+            else:
+                # mech = angle + offset
+                cal["_cal_gain"][i] = k
+                cal["_cal_bias"][i] = c + k * offset
+            cal["_cal_lo"][i] = amin - offset
+            cal["_cal_hi"][i] = amax - offset
+            cal["_cal_speed"][i] = cfg.get("default_speed_dps", 0) or 0
+            cal["_cal_accel"][i] = cfg.get("default_accel_dps2", 0) or 0
+        # NumPy copies for pwm12_array, built on first use (_np_calibration)
+        cal["_np_cal"] = None
+        cal["servos"] = servos
+        return cal
+
+    def _np_calibration(self):
+        cal = self._np_cal
+        if cal is None:
+            np = load_numpy()
+            cal = self._np_cal = tuple(np.array(a) for a in (self._cal_lo, self._cal_hi, self._cal_gain, self._cal_bias))
+        return cal
+
+    def _set_calibration(self, cal):
+        for key, value in cal.items():
+            setattr(self, key, value)
+
+    # --- calibration reload (hot_reload.py) ---
+    def load_calibration(self, path):
+        """
+        Parse and check a servo map for apply_calibration(); safe off the control thread.
+        Only calibration may differ (offset, neutral, limits, pulse range, reversal,
+        speeds): a changed servo set or board / channel wiring raises ServoConfigError.
+        """
+        servos, addresses = self._parse_map(path)
+        if list(servos) != self.servo_names:
+            raise ServoConfigError("servo names or order changed; restart to apply")
+        for nm, cfg in servos.items():
+            old = self.servos[nm]
+            if cfg["board_addr"] != old["board_addr"] or cfg["channel"] != old["channel"]:
+                raise ServoConfigError(f"wiring of {nm} changed; restart to apply")
+        return self._calibration_arrays(servos)
+
+    def apply_calibration(self, cal):
+        """
+        Swap in a load_calibration() result and rewrite the current pose with it
+        (only channels whose PWM changed go out). Call from the thread that
+        writes poses (MotionEngine.reload_calibration does) so no write sees a
+        half-swapped calibration. The PCA9685s are not touched otherwise.
+        """
+        self._set_calibration(cal)
+        self.set_pose(dict(self._current_pose))
 
     # --- angle -> PCA 12-bit conversion ---
+    def _pwm12_at(self, idx, angle_deg):
+        """
+        Convert desired servo angle to 12-bit PWM value using the compiled
+        calibration arrays (see _compile_calibration). idx is the servo index.
+        """
+        lo = self._cal_lo[idx]
+        hi = self._cal_hi[idx]
+        if angle_deg < lo:
+            angle_deg = lo
+        elif angle_deg > hi:
+            angle_deg = hi
+        v = self._cal_gain[idx] * angle_deg + self._cal_bias[idx]
+        if v < 0.0:
+            return 0
+        if v > 4095.0:
+            return 4095
+        return int(round(v))
+
     def _angle_to_pwm12(self, angle_deg, cfg):
         """
         Convert desired servo angle to 12-bit PWM value for PCA9685.
@@ -94,69 +351,149 @@ class ServoController:
             0° → 180°
             135° → 45°
             90° → 90°  (neutral remains the same)
-        """
-
-        amin, amax = cfg["angle_min"], cfg["angle_max"]
-        offset = cfg.get("offset", 0)
-        reversed_ = cfg.get("reversed", False)
 
-        # --- 1️⃣ Apply offset ---
-        angle = angle_deg + offset
+        Kept for callers holding a servo config dict; the math lives in the
+        precompiled calibration arrays.
+        """
+        return self._pwm12_at(self._servo_index[cfg["name"]], angle_deg)
 
-        # --- 2️⃣ Apply reversal ---
-        # Mirroring around 180° so 0 → 180, 135 → 45, 90 → 90
-        if reversed_:
-            angle = 180 - angle
+    # --- shadow registers + batched writes ---
+    def _init_shadow(self):
+        """
+        One 64-byte LED register image per board mirroring LED0_ON_L..LED15_OFF_H,
+        plus a per-channel "known" flag. Channels whose value is unchanged are
+        skipped; changed channels on a board go out as one auto-increment burst.
+        Unknown channels (unreadable, not yet written) are never re-sent from the
+        image, so a burst is split around them.
+        """
+        self._shadow = []
+        self._shadow_known = []
+        self._board_bytes = [int(addr, 16) for addr in self._addresses]
+        for addr in self._addresses:
+            image = bytearray(4 * _PCA_CHANNELS)
+            known = bytearray(_PCA_CHANNELS)
+            if self.simulate:
+                known[:] = b"\x01" * _PCA_CHANNELS
+            else:
+                try:
+                    with self._pca_devices[addr].i2c_device as dev:
+                        dev.write_then_readinto(bytes([_LED0_ON_L]), image)
+                    known[:] = b"\x01" * _PCA_CHANNELS
+                except Exception:
+                    pass
+            self._shadow.append(image)
+            self._shadow_known.append(known)
+        self.reset_bus_stats()
 
-        # --- 3️⃣ Clamp to physical movement limits ---
-        if reversed_:
-            logical_min = 180 - amax
-            logical_max = 180 - amin
-        else:
-            logical_min = amin
-            logical_max = amax
+    def reset_bus_stats(self):
+        self._bus_stats = {
+            "transactions": 0,
+            "bytes": 0,
+            "channels_written": 0,
+            "channels_skipped": 0,
+            "transactions_saved": 0,
+            "bytes_saved": 0,
+        }
 
-        angle = max(logical_min, min(logical_max, angle))
+    def get_bus_stats(self):
+        """
+        I2C write accounting. *_saved is relative to one 6-byte transaction per
+        requested channel write (the old per-channel duty_cycle path).
+        """
+        return dict(self._bus_stats)
 
-        # --- 4️⃣ Map angle → pulse width using full 0–180° range ---
-        min_us = cfg.get("min_pulse_us", 500)
-        max_us = cfg.get("max_pulse_us", 2500)
-        us = min_us + (angle / 180.0) * (max_us - min_us)
+    def _write_board(self, board_i, items, force=False):
+        """
+        items: iterable of (channel, on, off) register values for one board.
+        Updates the shadow image and emits the changed channels as auto-increment
+        bursts. force=True rewrites channels even if the shadow already matches.
+        """
+        image = self._shadow[board_i]
+        known = self._shadow_known[board_i]
+        changed = []
+        requested = 0
+        for ch, on, off in items:
+            requested += 1
+            o = 4 * ch
+            regs = (on & 0xFF, on >> 8, off & 0xFF, off >> 8)
+            if not force and known[ch] and image[o] == regs[0] and image[o + 1] == regs[1] \
+                    and image[o + 2] == regs[2] and image[o + 3] == regs[3]:
+                continue
+            image[o:o + 4] = bytes(regs)
+            known[ch] = 1
+            changed.append(ch)
 
-        # --- 5️⃣ Convert pulse width → 12-bit PWM value ---
-        period_us = 1_000_000.0 / self.freq  # e.g., 20,000 µs for 50 Hz
-        duty_fraction = us / period_us
-        pwm12 = int(round(max(0, min(4095, duty_fraction * 4096))))
+        stats = self._bus_stats
+        stats["channels_skipped"] += requested - len(changed)
+        if not changed:
+            stats["transactions_saved"] += requested
+            stats["bytes_saved"] += requested * _SINGLE_WRITE_BYTES
+            return
 
-        return pwm12
+        # one burst per run of adjacent changed channels: re-sending an unchanged channel
+        # to bridge a gap costs 4 bytes, more than a new transaction's address + register
+        # bytes and start/stop, so gaps are never bridged
+        changed.sort()
+        runs = []
+        first = last = changed[0]
+        for ch in changed[1:]:
+            if ch == last + 1:
+                last = ch
+            else:
+                runs.append((first, last))
+                first = last = ch
+        runs.append((first, last))
 
+        sent_bytes = 0
+        for first, last in runs:
+            buf = bytes([_LED0_ON_L + 4 * first]) + bytes(image[4 * first:4 * (last + 1)])
+            self._send_burst(board_i, first, last, buf)
+            sent_bytes += len(buf) + 1  # + address byte
 
+        stats["transactions"] += len(runs)
+        stats["bytes"] += sent_bytes
+        stats["channels_written"] += len(changed)
+        stats["transactions_saved"] += requested - len(runs)
+        stats["bytes_saved"] += requested * _SINGLE_WRITE_BYTES - sent_bytes
 
-    # low-level write to PCA device
-    def _write_pwm(self, board_addr, channel, pwm12):
-        if not self._enabled:
-            return
+    def _send_burst(self, board_i, first, last, buf):
+        if self.trace is not None:
+            self.trace.record_burst(time.monotonic(), self._board_bytes[board_i], first, memoryview(buf)[1:])
+        inst = self.instrumentation
+        if inst.enabled:
+            inst.count("i2c_transactions")
+            inst.count("i2c_bytes", len(buf) + 1)
         if self.simulate:
-            print(f"[SIM] write {board_addr} ch{channel} pwm={pwm12}")
             return
+        board_addr = self._addresses[board_i]
         pca = self._pca_devices.get(board_addr)
         if pca is None:
             raise RuntimeError(f"PCA device for {board_addr} not initialized")
-        # adafruit channel expects 16-bit duty cycle (0..65535) but adafruit lib exposes channels[].duty_cycle (0..65535)
-        # convert 0..4095 -> 0..65535
-        value16 = int((pwm12 / 4095.0) * 65535.0)
-        pca.channels[channel].duty_cycle = value16
+        if inst.enabled:
+            t0 = time.perf_counter()
+            with pca.i2c_device as dev:
+                dev.write(buf)
+            inst.observe("i2c_write", time.perf_counter() - t0)
+            return
+        with pca.i2c_device as dev:
+            dev.write(buf)
+
+    # low-level write to PCA device
+    def _write_pwm(self, board_addr, channel, pwm12):
+        if not self._enabled:
+            return
+        self._write_board(self._addresses.index(board_addr), ((channel, 0, pwm12 or _FULL_OFF),))
 
     # public API
     def set_servo_angle(self, name, angle_deg):
         """
         Immediately set a servo to angle (degrees). Clamps to angle_min/angle_max.
         """
-        if name not in self.servos:
+        idx = self._servo_index.get(name)
+        if idx is None:
             raise KeyError(f"unknown servo: {name}")
-        cfg = self.servos[name]
-        pwm12 = self._angle_to_pwm12(angle_deg, cfg)
-        self._write_pwm(cfg["board_addr"], cfg["channel"], pwm12)
+        pwm12 = self._pwm12_at(idx, angle_deg)
+        self._write_pwm(self._addresses[self._cal_board[idx]], self._cal_channel[idx], pwm12)
         self._current_pose[name] = angle_deg
         return True
 
@@ -165,19 +502,98 @@ class ServoController:
         pose_dict: {servo_name: angle, ...}
         Writes all specified servos. This function tries to write them quickly in a loop.
         """
+        inst = self.instrumentation
+        if inst.enabled:
+            t0 = time.perf_counter()
         # group writes by board to maybe optimize (not necessary but clean)
+        index = self._servo_index
+        pwm12_at = self._pwm12_at
+        boards = self._cal_board
+        channels = self._cal_channel
         grouped = {}
         for name, angle in pose_dict.items():
-            if name not in self.servos:
+            idx = index.get(name)
+            if idx is None:
                 raise KeyError(f"unknown servo in pose: {name}")
-            cfg = self.servos[name]
-            pwm12 = self._angle_to_pwm12(angle, cfg)
-            grouped.setdefault(cfg["board_addr"], []).append((cfg["channel"], pwm12, name, angle))
+            grouped.setdefault(boards[idx], []).append((channels[idx], pwm12_at(idx, angle), name, angle))
+        if inst.enabled:
+            t1 = time.perf_counter()
 
-        for board_addr, items in grouped.items():
+        for board_i, items in grouped.items():
+            if self._enabled:
+                self._write_board(board_i, [(channel, 0, pwm12 or _FULL_OFF) for channel, pwm12, _, _ in items])
             for channel, pwm12, name, angle in items:
-                self._write_pwm(board_addr, channel, pwm12)
                 self._current_pose[name] = angle
+        if inst.enabled:
+            inst.stage("convert", t1 - t0)
+            inst.stage("write", time.perf_counter() - t1)
+
+    def board_groups(self, indices):
+        """
+        Group servo indices by board for write_frame:
+        [(board_i, ((column, channel), ...)), ...] where column is the position in `indices`.
+        """
+        grouped = {}
+        for col, idx in enumerate(indices):
+            grouped.setdefault(self._cal_board[idx], []).append((col, self._cal_channel[idx]))
+        return [(board_i, tuple(cols)) for board_i, cols in sorted(grouped.items())]
+
+    def write_frame(self, groups, names, pwm, angles, base=0):
+        """
+        Write one precompiled frame (see trajectory.compile_sequence).
+        groups: from board_groups(); names: joint per column;
+        pwm / angles: flat rows, this frame's columns start at `base`.
+        """
+        inst = self.instrumentation
+        if inst.enabled:
+            t0 = time.perf_counter()
+        if self._enabled:
+            for board_i, cols in groups:
+                self._write_board(board_i, [(ch, 0, pwm[base + col] or _FULL_OFF) for col, ch in cols])
+        pose = self._current_pose
+        for col, name in enumerate(names):
+            pose[name] = angles[base + col]
+        if inst.enabled:
+            inst.stage("write", time.perf_counter() - t0)
+
+    # --- fixed-order pose arrays (servo map order, see servo_names) ---
+    def pose_array(self, pose=None, base=None):
+        """
+        Pose as a float array in servo map order: numpy.ndarray when NumPy is
+        installed, array('d') otherwise. Starts from `base` (or the current pose)
+        and overrides the joints named in `pose`.
+        """
+        if base is None:
+            values = [self._current_pose[nm] for nm in self.servo_names]
+        else:
+            values = list(base)
+        if pose:
+            for name, angle in pose.items():
+                idx = self._servo_index.get(name)
+                if idx is None:
+                    raise KeyError(f"unknown servo in pose: {name}")
+                values[idx] = angle
+        np = load_numpy()
+        if np is not None:
+            return np.array(values, dtype=float)
+        return array("d", values)
+
+    def pwm12_array(self, angles):
+        """Convert a full pose array to a list of 12-bit PWM values (vectorized with NumPy)."""
+        np = load_numpy()
+        if np is not None:
+            lo, hi, gain, bias = self._np_calibration()
+            v = np.clip(angles, lo, hi) * gain + bias
+            return np.rint(np.clip(v, 0.0, 4095.0)).astype(np.int32).tolist()
+        pwm12_at = self._pwm12_at
+        return [pwm12_at(i, a) for i, a in enumerate(angles)]
+
+    def set_pose_array(self, angles):
+        """Write a full pose array (every servo, servo map order)."""
+        pwm = self.pwm12_array(angles)
+        if load_numpy() is not None:
+            angles = angles.tolist()
+        self.write_frame(self._all_groups, self.servo_names, pwm, angles)
 
     def get_current_pose(self):
         return dict(self._current_pose)
@@ -190,33 +606,35 @@ class ServoController:
         self._enabled = False
         if set_neutral:
             # attempt to set neutrals (best-effort)
-            for nm, cfg in self.servos.items():
+            grouped = {}
+            for i, nm in enumerate(self.servo_names):
+                cfg = self.servos[nm]
+                neutral = cfg.get("neutral", (cfg["angle_min"] + cfg["angle_max"]) / 2.0)
+                grouped.setdefault(self._cal_board[i], []).append((self._cal_channel[i], 0, self._pwm12_at(i, neutral) or _FULL_OFF))
+                self._current_pose[nm] = neutral
+            for board_i, items in grouped.items():
                 try:
-                    neutral = cfg.get("neutral", (cfg["angle_min"] + cfg["angle_max"]) / 2.0)
-                    pwm12 = self._angle_to_pwm12(neutral, cfg)
-                    if not self.simulate:
-                        pca = self._pca_devices[cfg["board_addr"]]
-                        value16 = int((pwm12 / 4095.0) * 65535.0)
-                        pca.channels[cfg["channel"]].duty_cycle = value16
-                    else:
-                        print(f"[SIM] set neutral {nm} -> pwm {pwm12}")
-                    self._current_pose[nm] = neutral
+                    self._write_board(board_i, items, force=True)
                 except Exception:
                     pass
         else:
-            # set all duty cycles to 0 (if hardware supports)
-            if not self.simulate:
-                for pca in self._pca_devices.values():
-                    # adafruit lib supports pca.deinit() to release resources; but here set channels to 0
-                    for ch in range(16):
-                        pca.channels[ch].duty_cycle = 0
-            else:
+            # set all duty cycles to 0 (full off) in one burst per board
+            for board_i in range(len(self._addresses)):
+                try:
+                    self._write_board(board_i, [(ch, 0, _FULL_OFF) for ch in range(_PCA_CHANNELS)], force=True)
+                except Exception:
+                    pass
+            if self.simulate:
                 print("[SIM] emergency stop: outputs disabled")
 
     def enable_outputs(self):
         self._enabled = True
 
+# import time of this module and its dependencies (see ServoController startup_times)
+_import_time = time.perf_counter() - _import_start
+
 if __name__ == "__main__":
     print("====== robo dog initialization ======")
     Dog = ServoController("servo_map_dog.json", simulate_if_no_hw=True)
+    print(Dog.startup_report())
     # print(Dog.get_current_pose())
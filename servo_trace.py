@@ -0,0 +1,184 @@
+# servo_trace.py
+import mmap
+import struct
+import threading
+import time
+
+
+# file: 16-byte header, then fixed-size little-endian records
+#   header: magic, format version, record size, reserved
+#   record: monotonic timestamp (s), I2C board address, channel, pwm12 (LEDn_OFF, 0x1000 = full off)
+_MAGIC = b"RDTR"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHH8x")
+_RECORD = struct.Struct("<dBBH")
+RECORD_SIZE = _RECORD.size  # 12 bytes
+TRACE_DTYPE = [("t", "<f8"), ("board", "u1"), ("channel", "u1"), ("pwm", "<u2")]
+
+
+class TraceRecorder:
+    """
+    Binary recorder for the servo command stream (see ServoController trace=).
+
+    Records are packed into one preallocated buffer of `capacity` records.
+    With a path, a full buffer is appended to the file in one write and
+    reused. Without one, the buffer is a ring that keeps the last `capacity`
+    records (`dropped` counts the overwritten ones).
+    """
+    def __init__(self, path=None, capacity=65536):
+        self.path = path
+        self.capacity = capacity
+        self._buf = bytearray(capacity * RECORD_SIZE)
+        self._n = 0          # records in the buffer
+        self._head = 0       # ring mode: next slot
+        self.count = 0       # records written in total
+        self.dropped = 0
+        self.flushes = 0
+        self._lock = threading.Lock()
+        self._file = None
+        if path is not None:
+            self._file = open(path, "wb")
+            self._file.write(_HEADER.pack(_MAGIC, _VERSION, RECORD_SIZE))
+
+    def record(self, t, board, channel, pwm):
+        with self._lock:
+            self._append(t, board, channel, pwm)
+
+    def record_burst(self, t, board, first, regs):
+        """One record per channel of an auto-increment burst; regs = LEDn register bytes from channel `first`."""
+        with self._lock:
+            for c in range(len(regs) // 4):
+                o = 4 * c
+                self._append(t, board, first + c, regs[o + 2] | (regs[o + 3] << 8))
+
+    def _append(self, t, board, channel, pwm):
+        # caller holds _lock
+        if self._file is None:
+            _RECORD.pack_into(self._buf, self._head * RECORD_SIZE, t, board, channel, pwm)
+            self._head = (self._head + 1) % self.capacity
+            if self._n == self.capacity:
+                self.dropped += 1
+            else:
+                self._n += 1
+        else:
+            _RECORD.pack_into(self._buf, self._n * RECORD_SIZE, t, board, channel, pwm)
+            self._n += 1
+            if self._n == self.capacity:
+                self._flush()
+        self.count += 1
+
+    def _flush(self):
+        if self._file is not None and self._n:
+            self._file.write(memoryview(self._buf)[:self._n * RECORD_SIZE])
+            self._n = 0
+            self.flushes += 1
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def snapshot(self):
+        """Buffered records (oldest first) as bytes; with a path, only those not yet flushed."""
+        with self._lock:
+            if self._file is None and self._n == self.capacity:
+                split = self._head * RECORD_SIZE
+                return bytes(self._buf[split:]) + bytes(self._buf[:split])
+            return bytes(self._buf[:self._n * RECORD_SIZE])
+
+    def save(self, path):
+        """Write the buffered records to a trace file (ring mode)."""
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, RECORD_SIZE))
+            f.write(self.snapshot())
+
+    def stats(self):
+        return {"records": self.count, "buffered": self._n, "dropped": self.dropped,
+                "flushes": self.flushes, "capacity": self.capacity}
+
+
+def _check_header(data):
+    magic, version, size = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC or version != _VERSION or size != RECORD_SIZE:
+        raise ValueError("not a servo trace file (or unsupported version)")
+
+
+def load_trace(path):
+    """
+    Memory-map a trace file for offline analysis: a numpy.memmap structured
+    array (fields t, board, channel, pwm) when NumPy is installed, otherwise a
+    read-only memoryview of the record bytes (iterate with iter_records).
+    """
+    with open(path, "rb") as f:
+        _check_header(f.read(_HEADER.size))
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    n = (len(mm) - _HEADER.size) // RECORD_SIZE
+    try:
+        import numpy as np  # only needed here; kept out of module import (ServoController imports this module)
+    except ImportError:
+        np = None
+    if np is not None:
+        return np.memmap(path, dtype=np.dtype(TRACE_DTYPE), mode="r", offset=_HEADER.size, shape=(n,))
+    return memoryview(mm)[_HEADER.size:_HEADER.size + n * RECORD_SIZE]
+
+
+def iter_records(data):
+    """(t, board, channel, pwm) tuples from raw record bytes (e.g. TraceRecorder.snapshot())."""
+    return _RECORD.iter_unpack(data)
+
+
+class TraceReplayer:
+    """
+    Feeds a recorded trace back through a ServoController. Records sharing a
+    timestamp and board (one burst) are replayed as one _write_board call.
+    speed: 1.0 = original timing, 4.0 = four times faster, None = no waiting.
+    """
+    def __init__(self, source):
+        """source: trace file path, or raw record bytes (TraceRecorder.snapshot())."""
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._data = bytes(source)
+        else:
+            with open(source, "rb") as f:
+                data = f.read()
+            _check_header(data)
+            self._data = data[_HEADER.size:]
+        self.n_records = len(self._data) // RECORD_SIZE
+
+    def bursts(self):
+        """Yield (t, board_addr, [(channel, pwm), ...]) in recorded order."""
+        key, items = None, []
+        for t, board, ch, pwm in iter_records(self._data[:self.n_records * RECORD_SIZE]):
+            if (t, board) != key:
+                if items:
+                    yield key[0], key[1], items
+                key, items = (t, board), []
+            items.append((ch, pwm))
+        if items:
+            yield key[0], key[1], items
+
+    def replay(self, servo, speed=1.0):
+        """Send every burst to `servo`; returns the number of bursts skipped (board not in its map)."""
+        boards = {int(addr, 16): i for i, addr in enumerate(servo._addresses)}
+        skipped = 0
+        start = t0 = None
+        for t, board, items in self.bursts():
+            if t0 is None:
+                t0, start = t, time.monotonic()
+            if speed:
+                delay = start + (t - t0) / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            board_i = boards.get(board)
+            if board_i is None:
+                skipped += 1
+                continue
+            servo._write_board(board_i, [(ch, 0, pwm) for ch, pwm in items], force=True)
+        return skipped
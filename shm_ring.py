@@ -0,0 +1,95 @@
+# shm_ring.py
+import struct
+import time
+from multiprocessing import shared_memory
+
+# header: head (messages written), tail (messages read), slot size, slot count; 8 bytes each
+_HEADER = struct.Struct("<QQQQ")
+_LEN = struct.Struct("<I")
+
+
+class ShmRing:
+    """
+    Single-producer / single-consumer ring of fixed-size slots in a
+    multiprocessing.shared_memory block, for passing messages between
+    processes without pickling or a lock.
+
+    The producer only writes head and the consumer only writes tail, each
+    an aligned 8-byte counter that is bumped after the slot is written
+    (or read). That ordering is enough on x86; CPython gives no memory
+    barriers, so on weakly ordered CPUs treat this as best effort.
+
+    A message is up to slot_size - 4 bytes. put() never blocks: it returns
+    False when the ring is full, so a stalled consumer can't stall the
+    producer.
+    """
+    def __init__(self, name=None, slots=256, slot_size=1024, create=False):
+        if create:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=_HEADER.size + slots * slot_size)
+            _HEADER.pack_into(self._shm.buf, 0, 0, 0, slot_size, slots)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.name = self._shm.name
+        self._buf = self._shm.buf
+        _, _, self.slot_size, self.slots = _HEADER.unpack_from(self._buf, 0)
+        self._counters = self._buf[:16].cast("Q")  # [head, tail]
+        self._owner = create
+        self.dropped = 0
+
+    @classmethod
+    def create(cls, slots=256, slot_size=1024, name=None):
+        return cls(name=name, slots=slots, slot_size=slot_size, create=True)
+
+    def put(self, data):
+        """Append one message (bytes-like); False if the ring is full."""
+        n = len(data)
+        if n > self.slot_size - _LEN.size:
+            raise ValueError(f"message of {n} bytes exceeds slot size {self.slot_size - _LEN.size}")
+        head = self._counters[0]
+        if head - self._counters[1] >= self.slots:
+            self.dropped += 1
+            return False
+        o = _HEADER.size + (head % self.slots) * self.slot_size
+        _LEN.pack_into(self._buf, o, n)
+        self._buf[o + _LEN.size:o + _LEN.size + n] = data
+        self._counters[0] = head + 1
+        return True
+
+    def get(self):
+        """Next message as bytes, or None if the ring is empty."""
+        tail = self._counters[1]
+        if tail == self._counters[0]:
+            return None
+        o = _HEADER.size + (tail % self.slots) * self.slot_size
+        n = _LEN.unpack_from(self._buf, o)[0]
+        data = bytes(self._buf[o + _LEN.size:o + _LEN.size + n])
+        self._counters[1] = tail + 1
+        return data
+
+    def get_wait(self, timeout=None, poll=0.001):
+        """get(), sleeping `poll` seconds between checks, up to `timeout` (None = forever)."""
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            data = self.get()
+            if data is not None or (end is not None and time.monotonic() >= end):
+                return data
+            time.sleep(poll)
+
+    def drain(self):
+        """All queued messages."""
+        out = []
+        while True:
+            data = self.get()
+            if data is None:
+                return out
+            out.append(data)
+
+    def __len__(self):
+        return self._counters[0] - self._counters[1]
+
+    def close(self):
+        self._counters.release()
+        self._buf = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
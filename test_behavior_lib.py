@@ -0,0 +1,103 @@
+# test_behavior_lib.py
+# behaviors.json / dog_sequences.py -> .rdbl -> keyframes round trip.
+#   python -m pytest -q test_behavior_lib.py
+import json
+import math
+
+import pytest
+
+import dog_sequences
+from behavior_lib import (BehaviorLibrary, BehaviorLibraryError, behaviors_from_json, behaviors_from_module,
+                          convert, write_library)
+from behavior_manager import BehaviorManager
+
+SERVO_MAP_PATH = "servo_map_dog.json"
+BEHAVIORS_PATH = "behaviors.json"
+
+
+def assert_keyframes_equal(decoded, source, where):
+    assert len(decoded) == len(source), where
+    for k, (got, want) in enumerate(zip(decoded, source)):
+        assert got["duration"] == pytest.approx(want["duration"], abs=1e-4), (where, k)
+        assert set(got["pose"]) == set(want["pose"]), (where, k)
+        for joint, angle in want["pose"].items():
+            assert got["pose"][joint] == pytest.approx(angle, abs=1e-4), (where, k, joint)
+
+
+@pytest.fixture
+def library(tmp_path):
+    path = str(tmp_path / "behaviors.rdbl")
+    result = convert(path, SERVO_MAP_PATH, BEHAVIORS_PATH, "dog_sequences")
+    lib = BehaviorLibrary(path)
+    yield lib, result
+    lib.close()
+
+
+def test_round_trip_matches_sources(library):
+    lib, result = library
+    from_json = behaviors_from_json(BEHAVIORS_PATH)
+    from_module = behaviors_from_module(dog_sequences)
+    expected = dict(from_module, **from_json)  # behaviors.json wins on duplicate names
+    assert sorted(lib) == sorted(expected)
+    assert result["behaviors"] == len(expected)
+    assert result["keyframes"] == sum(len(k) for k in expected.values())
+    assert sorted(result["skipped"]) == sorted(set(from_json) & set(from_module))
+    for name, keyframes in expected.items():
+        assert_keyframes_equal(lib[name], keyframes, name)
+
+
+def test_library_matches_json_behavior_manager(library):
+    lib, _ = library
+    from_json = BehaviorManager(None, behaviors_path=BEHAVIORS_PATH)
+    from_lib = BehaviorManager(None, behaviors_path=lib.path)
+    for name in from_json.behaviors:
+        assert_keyframes_equal(from_lib._compile_behavior(name), from_json._compile_behavior(name), name)
+    from_lib.behaviors.close()
+
+
+def test_unset_joints_and_edge_values(tmp_path):
+    path = str(tmp_path / "edge.rdbl")
+    names = ["a", "b", "c"]
+    behaviors = {
+        "sparse": [{"duration": 0.25, "pose": {"b": -12.5}}, {"duration": 0.0, "pose": {}}],
+        "full": [{"duration": 1.0, "pose": {"a": 0, "b": 179.9999, "c": 0.1}}],
+        "empty": [],
+        "ünïcode": [{"duration": 2.5, "pose": {"c": 45}}],
+    }
+    write_library(path, behaviors, names)
+    lib = BehaviorLibrary(path)
+    try:
+        assert lib.joints == names
+        assert len(lib) == 4
+        for name, keyframes in behaviors.items():
+            assert_keyframes_equal(lib[name], keyframes, name)
+        assert lib["sparse"][1]["pose"] == {}
+        assert "missing" not in lib
+        with pytest.raises(KeyError):
+            lib["missing"]
+        assert lib.raw("sparse") != lib.raw("full")
+    finally:
+        lib.close()
+
+
+def test_invalid_behaviors_are_rejected(tmp_path):
+    src = tmp_path / "bad.json"
+    src.write_text(json.dumps({"bad": {"sequence": [
+        {"target_positions": {"no_such_servo": 10}, "duration": 0.5},
+        {"target_positions": {"fl_hip": math.inf}, "duration": -1},
+    ]}}))
+    out = tmp_path / "bad.rdbl"
+    with pytest.raises(BehaviorLibraryError) as exc:
+        convert(str(out), SERVO_MAP_PATH, str(src))
+    message = str(exc.value)
+    assert "unknown servo no_such_servo" in message
+    assert "bad duration" in message
+    assert "bad angle" in message
+    assert not out.exists()
+
+
+def test_not_a_library(tmp_path):
+    path = tmp_path / "junk.rdbl"
+    path.write_bytes(b"JUNK" + bytes(64))
+    with pytest.raises(BehaviorLibraryError):
+        BehaviorLibrary(str(path))
@@ -0,0 +1,123 @@
+# test_feedback.py
+# Subscriber queues: coalescing, drop counting, terminal messages kept.
+#   python -m pytest -q test_feedback.py
+import threading
+
+import pytest
+
+from feedback import FeedbackDispatcher
+
+
+class Gate:
+    """Callback that blocks in its first call until opened, so messages pile up behind it."""
+    def __init__(self):
+        self.entered = threading.Event()
+        self.opened = threading.Event()
+        self.messages = []
+
+    def __call__(self, fb):
+        self.entered.set()
+        self.opened.wait(5.0)
+        self.messages.append(fb)
+
+
+@pytest.fixture
+def pose():
+    return {"fl_hip": 0.0}
+
+
+@pytest.fixture
+def dispatcher(pose):
+    d = FeedbackDispatcher(lambda: dict(pose))
+    yield d
+    d.close()
+
+
+def blocked(dispatcher, gate, **kw):
+    """Subscribe `gate` and park its thread inside the callback on a first message."""
+    sub = dispatcher.subscribe(gate, **kw)
+    dispatcher.publish("first", "ACTIVE", 0.0)
+    assert gate.entered.wait(5.0)
+    return sub
+
+
+def test_full_queue_drops_and_counts(dispatcher):
+    gate = Gate()
+    sub = blocked(dispatcher, gate, maxlen=3, coalesce=False)
+    for i in range(10):
+        dispatcher.publish("g", "ACTIVE", i / 10)
+    assert sub.dropped == 7
+    assert dispatcher.dropped() == 7
+    gate.opened.set()
+    sub.close()
+    assert [fb["progress"] for fb in gate.messages] == [0.0, 0.7, 0.8, 0.9]
+    stats = sub.stats()
+    assert stats["delivered"] == 4
+    assert stats["dropped"] == 7
+    assert stats["pending"] == 0
+
+
+def test_terminal_messages_survive_drops(dispatcher):
+    gate = Gate()
+    sub = blocked(dispatcher, gate, maxlen=2, coalesce=False)
+    dispatcher.publish("a", "SUCCEEDED", 1.0)
+    for i in range(5):
+        dispatcher.publish("b", "ACTIVE", i / 10)
+    dispatcher.publish("b", "ABORTED", 0.5)
+    assert sub.dropped == 5
+    gate.opened.set()
+    sub.close()
+    assert [(fb["goal_id"], fb["status"]) for fb in gate.messages[1:]] == [("a", "SUCCEEDED"), ("b", "ABORTED")]
+
+
+def test_only_terminal_queue_drops_oldest(dispatcher):
+    gate = Gate()
+    sub = blocked(dispatcher, gate, maxlen=2)
+    for goal_id in ("a", "b", "c"):
+        dispatcher.publish(goal_id, "SUCCEEDED", 1.0)
+    assert sub.dropped == 1
+    gate.opened.set()
+    sub.close()
+    assert [fb["goal_id"] for fb in gate.messages[1:]] == ["b", "c"]
+
+
+def test_progress_is_coalesced_not_dropped(dispatcher):
+    gate = Gate()
+    sub = blocked(dispatcher, gate, maxlen=2)
+    for i in range(10):
+        dispatcher.publish("g", "ACTIVE", i / 10)
+    dispatcher.publish("g", "SUCCEEDED", 1.0)
+    assert sub.dropped == 0
+    assert sub.coalesced == 9
+    gate.opened.set()
+    sub.close()
+    assert [(fb["status"], fb["progress"]) for fb in gate.messages[1:]] == [("ACTIVE", 0.9), ("SUCCEEDED", 1.0)]
+
+
+def test_slow_subscriber_does_not_affect_others(dispatcher):
+    gate = Gate()
+    slow = blocked(dispatcher, gate, maxlen=1, coalesce=False)
+    fast_msgs = []
+    fast = dispatcher.subscribe(fast_msgs.append, coalesce=False)
+    for i in range(5):
+        dispatcher.publish("g", "ACTIVE", i / 10)
+    fast.close()
+    assert len(fast_msgs) == 5
+    assert fast.dropped == 0
+    assert slow.dropped == 4
+    assert dispatcher.dropped() == 4
+    gate.opened.set()
+
+
+def test_terminal_pose_is_taken_at_publish(dispatcher, pose):
+    gate = Gate()
+    sub = blocked(dispatcher, gate)
+    pose["fl_hip"] = 10.0
+    dispatcher.publish("g", "SUCCEEDED", 1.0)
+    pose["fl_hip"] = 99.0
+    gate.opened.set()
+    sub.close()
+    done = gate.messages[-1]
+    assert done["current_pose"] == {"fl_hip": 10.0}
+    assert "pose_at_delivery" not in done
+    assert gate.messages[0]["pose_at_delivery"] is True
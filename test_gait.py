@@ -0,0 +1,126 @@
+# test_gait.py
+# Gait generator and 'gait' goals: live parameter changes keep the phase running.
+#   python -m pytest -q test_gait.py
+import contextlib
+import io
+import threading
+
+import pytest
+
+from gait import GaitGenerator, GaitParams
+from kinematics import LegKinematics
+from motion_engine import MotionEngine, MotionGoal, ACTIVE, SUCCEEDED, PREEMPTED
+from servo_controller import ServoController
+
+SERVO_MAP_PATH = "servo_map_dog.json"
+DT = 0.01
+
+
+@pytest.fixture
+def servo():
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ServoController(SERVO_MAP_PATH, simulate_if_no_hw=True, trace=False)
+
+
+def test_phase_is_continuous_across_set_params(servo):
+    gen = GaitGenerator(LegKinematics(servo), GaitParams(frequency=1.5))
+    for _ in range(37):
+        gen.step(DT)
+    phase, cycles = gen.phase, gen.cycles
+    assert phase == pytest.approx((37 * DT * 1.5) % 1.0)
+    gen.set_params(frequency=3.0, gait="walk", stride=0.08, heading=0.5)
+    assert (gen.phase, gen.cycles) == (phase, cycles)
+    gen.step(DT)
+    assert gen.phase == pytest.approx((phase + 3.0 * DT) % 1.0)
+    gen.set_params(GaitParams(frequency=0.0))
+    phase = gen.phase
+    gen.step(DT)
+    assert gen.phase == phase
+
+
+def test_changing_gait_does_not_jump_the_joints(servo):
+    gen = GaitGenerator(LegKinematics(servo), GaitParams(gait="trot", frequency=1.0), blend_time=0.3)
+    prev = gen.step(DT)
+    before = 0.0
+    for _ in range(150):
+        values = gen.step(DT)
+        before = max(before, max(abs(a - b) for a, b in zip(values, prev)))
+        prev = values
+    gen.set_params(gait="walk", stride=0.09, heading=1.0)
+    after = 0.0
+    for _ in range(30):
+        values = gen.step(DT)
+        after = max(after, max(abs(a - b) for a, b in zip(values, prev)))
+        prev = values
+    # the new gait blends in over blend_time: per-tick motion stays of the same order
+    assert after < 2.0 * before
+    assert gen.unreachable == 0
+
+
+def test_set_params_rejects_bad_values(servo):
+    gen = GaitGenerator(LegKinematics(servo))
+    with pytest.raises(ValueError):
+        gen.set_params(gait="gallop")
+    with pytest.raises(ValueError):
+        gen.set_params(frequency=-1.0)
+    with pytest.raises(ValueError):
+        gen.set_params(speed=1.0)
+    assert gen.params == GaitParams()
+
+
+# --- 'gait' goals on the engine ---
+class Feedback:
+    def __init__(self):
+        self.messages = []
+        self._cond = threading.Condition()
+
+    def __call__(self, fb):
+        with self._cond:
+            self.messages.append(fb)
+            self._cond.notify_all()
+
+    def wait(self, predicate, timeout=5.0):
+        with self._cond:
+            assert self._cond.wait_for(lambda: any(predicate(fb) for fb in self.messages), timeout)
+            return [fb for fb in self.messages if predicate(fb)][-1]
+
+
+@pytest.fixture
+def engine(servo):
+    feedback = Feedback()
+    eng = MotionEngine(servo, control_hz=100, kinematics=LegKinematics(servo))
+    eng.subscribe(feedback, coalesce=False, maxlen=4096)
+    eng.feedback = feedback
+    yield eng
+    eng.stop()
+
+
+def test_update_gait_keeps_the_stride_running(engine):
+    engine.push_goal(MotionGoal("walk", "gait", [], gait={"frequency": 1.0}))
+    before = engine.feedback.wait(lambda fb: fb["goal_id"] == "walk" and "gait" in fb)["gait"]
+    gen = engine._gait
+    assert engine.update_gait(frequency=2.0, stride=0.04) is True
+    after = engine.feedback.wait(lambda fb: fb["goal_id"] == "walk" and "gait" in fb
+                                 and fb["gait"]["frequency"] == 2.0)["gait"]
+    # the running generator took the change: no new goal, cycle count and phase carry on
+    assert engine._gait is gen
+    assert gen.params.stride == 0.04
+    assert after["cycles"] + after["phase"] > before["cycles"] + before["phase"]
+    assert engine.get_status("walk") == ACTIVE
+    assert engine.update_gait("other", frequency=1.0) is False
+    engine.cancel_goal("walk")
+    assert engine.feedback.wait(lambda fb: fb["goal_id"] == "walk" and fb["status"] == PREEMPTED)
+
+
+def test_duration_gait_settles_and_succeeds(engine):
+    engine.push_goal(MotionGoal("walk", "gait", [], gait={"frequency": 2.0, "duration": 0.3}))
+    engine.feedback.wait(lambda fb: fb["goal_id"] == "walk" and fb["status"] == ACTIVE)
+    gen = engine._gait
+    done = engine.feedback.wait(lambda fb: fb["goal_id"] == "walk" and fb["status"] == SUCCEEDED)
+    assert done["message"] == "gait complete"
+    assert gen.settled()
+    assert engine.get_status("walk") == SUCCEEDED
+    assert engine._gait is None
+    # feet back on the stance: the neutral pose
+    for nm in gen.names:
+        assert engine.servo.get_current_value(nm) == pytest.approx(engine.servo.servos[nm]["neutral"], abs=0.5)
@@ -0,0 +1,210 @@
+# test_hot_reload.py
+# Behavior / calibration reloads on a running engine.
+#   python -m pytest -q test_hot_reload.py
+import contextlib
+import io
+import json
+import threading
+
+import pytest
+
+from servo_controller import ServoController
+from motion_engine import MotionEngine, MotionGoal, ACTIVE, TERMINAL_STATES
+from behavior_manager import BehaviorManager
+
+SERVO_MAP_PATH = "servo_map_dog.json"
+
+
+def behavior(**pose):
+    return {"sequence": [{"target_positions": pose, "duration": 0.05}]}
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+class Statuses:
+    """Feedback subscriber recording the latest status per goal; wait() blocks for one."""
+    def __init__(self):
+        self.status = {}
+        self._cond = threading.Condition()
+
+    def __call__(self, fb):
+        with self._cond:
+            self.status[fb["goal_id"]] = fb["status"]
+            self._cond.notify_all()
+
+    def wait(self, goal_id, states=TERMINAL_STATES, timeout=5.0):
+        with self._cond:
+            assert self._cond.wait_for(lambda: self.status.get(goal_id) in states, timeout), goal_id
+            return self.status[goal_id]
+
+
+def run(engine, goal):
+    """Push a goal (or call a function returning a goal id) and block until it ends."""
+    goal_id = engine.push_goal(goal) if isinstance(goal, MotionGoal) else goal()
+    return engine.statuses.wait(goal_id)
+
+
+def pose_goal(goal_id, duration, **pose):
+    return MotionGoal(goal_id, "pose", [{"duration": duration, "pose": pose}])
+
+
+@pytest.fixture
+def engine():
+    with contextlib.redirect_stdout(io.StringIO()):
+        servo = ServoController(SERVO_MAP_PATH, simulate_if_no_hw=True, trace=False)
+    eng = MotionEngine(servo, control_hz=100, limit_velocity=False)
+    eng.statuses = Statuses()
+    eng.subscribe(eng.statuses, coalesce=False, maxlen=1024)
+    yield eng
+    eng.stop()
+
+
+@pytest.fixture
+def manager(engine, tmp_path):
+    path = write_json(tmp_path / "behaviors.json", {"move": behavior(fl_hip=40), "other": behavior(fl_knee=60)})
+    return BehaviorManager(engine, behaviors_path=path)
+
+
+def test_goal_queued_before_reload_does_not_restore_old_trajectory(engine, manager, tmp_path):
+    servo = engine.servo
+    assert run(engine, pose_goal("start", 0.02, fl_hip=90)) == "SUCCEEDED"
+    engine.push_goal(pose_goal("hold", 5.0, fl_hip=90))
+    engine.statuses.wait("hold", (ACTIVE,))
+    old_goal = manager.execute_behavior("move")
+    assert engine.get_status(old_goal) == "PENDING"
+    write_json(tmp_path / "behaviors.json", {"move": behavior(fl_hip=120), "other": behavior(fl_knee=60)})
+    assert manager.reload_behaviors() == ["move"]
+    # the queued goal keeps the keyframes it was pushed with, and compiles them after the invalidation
+    engine.cancel_goal("hold")
+    assert engine.statuses.wait(old_goal) == "SUCCEEDED"
+    assert servo.get_current_value("fl_hip") == pytest.approx(40)
+    # same start pose as the old goal: must compile the new keyframes, not hit the old entry
+    assert run(engine, pose_goal("back", 0.02, fl_hip=90)) == "SUCCEEDED"
+    assert run(engine, lambda: manager.execute_behavior("move")) == "SUCCEEDED"
+    assert servo.get_current_value("fl_hip") == pytest.approx(120)
+    assert engine.trajectory_cache.stats()["stale"] == 1
+
+
+def test_only_changed_behaviors_are_recompiled(engine, manager, tmp_path):
+    # run each twice, so the second compile starts from the pose the first one left
+    for _ in range(2):
+        assert run(engine, lambda: manager.execute_behavior("other")) == "SUCCEEDED"
+    assert run(engine, lambda: manager.execute_behavior("move")) == "SUCCEEDED"
+    other = manager._compiled["other"]
+    keys = {k[0] for k in engine.trajectory_cache._items}
+    assert keys == {"behavior:move", "behavior:other"}
+
+    write_json(tmp_path / "behaviors.json", {"move": behavior(fl_hip=70), "other": behavior(fl_knee=60)})
+    assert manager.reload_behaviors() == ["move"]
+    assert "move" not in manager._compiled
+    assert manager._compiled["other"] is other
+    assert engine.run_at_tick(lambda: None).wait(1.0)
+    assert {k[0] for k in engine.trajectory_cache._items} == {"behavior:other"}
+
+    before = engine.trajectory_cache.stats()
+    assert run(engine, lambda: manager.execute_behavior("other")) == "SUCCEEDED"
+    after = engine.trajectory_cache.stats()
+    assert (after["hits"], after["misses"]) == (before["hits"] + 1, before["misses"])
+    assert run(engine, lambda: manager.execute_behavior("move")) == "SUCCEEDED"
+    assert engine.servo.get_current_value("fl_hip") == pytest.approx(70)
+
+
+@pytest.mark.parametrize("content", [
+    "{not json",
+    json.dumps({"move": behavior(no_such_servo=10)}),
+])
+def test_bad_behaviors_file_keeps_old_state(engine, manager, tmp_path, content):
+    from hot_reload import HotReloader
+    assert run(engine, lambda: manager.execute_behavior("move")) == "SUCCEEDED"
+    behaviors, compiled = manager.behaviors, dict(manager._compiled)
+    reloader = HotReloader(manager)
+    (tmp_path / "behaviors.json").write_text(content)
+    with contextlib.redirect_stdout(io.StringIO()):
+        # a change is applied once the file looks the same on two polls
+        assert reloader.watcher.poll() == []
+        assert reloader.watcher.poll() == [manager.behaviors_path]
+    assert reloader.stats()["errors"] == 1
+    assert reloader.stats()["reloads"] == 0
+    assert manager.behaviors is behaviors
+    assert manager._compiled == compiled
+    assert run(engine, lambda: manager.execute_behavior("move")) == "SUCCEEDED"
+    assert engine.servo.get_current_value("fl_hip") == pytest.approx(40)
+
+
+# --- calibration ---
+@pytest.fixture
+def sim_engine():
+    from i2c_sim import SimI2C, PCA9685
+    bus = SimI2C(boards=(0x40,))
+    with contextlib.redirect_stdout(io.StringIO()):
+        servo = ServoController(SERVO_MAP_PATH, i2c=bus, pca_driver=PCA9685, trace=False)
+    eng = MotionEngine(servo, control_hz=100, limit_velocity=False)
+    eng.statuses = Statuses()
+    eng.subscribe(eng.statuses, coalesce=False, maxlen=1024)
+    eng.bus = bus
+    yield eng
+    eng.stop()
+
+
+def edited_servo_map(tmp_path, **changes):
+    """servo_map_dog.json with {servo name: {field: value}} applied."""
+    with open(SERVO_MAP_PATH) as f:
+        data = json.load(f)
+    for cfg in data["servos"]:
+        cfg.update(changes.get(cfg["name"], {}))
+    return write_json(tmp_path / "servo_map.json", data)
+
+
+def test_calibration_swap_without_pca_init(sim_engine, tmp_path, monkeypatch):
+    import i2c_sim
+    from hot_reload import HotReloader
+    engine, bus = sim_engine, sim_engine.bus
+    servo = engine.servo
+    chip = bus.devices[0x40]
+    assert run(engine, pose_goal("p", 0.02, fl_hip=20, fl_knee=120)) == "SUCCEEDED"
+    devices = dict(servo._pca_devices)
+    hip, knee = servo._servo_index["fl_hip"], servo._servo_index["fl_knee"]
+    assert servo._cal_lo[hip] == 0
+    knee_pwm = chip.channel(3)[1]
+
+    # the init path (driver construction, prescale + oscillator restart) must not run again
+    def no_init(*args, **kwargs):
+        raise AssertionError("PCA9685 re-initialized")
+    monkeypatch.setattr(i2c_sim.PCA9685, "__init__", no_init)
+    monkeypatch.setattr(bus, "device_wait", no_init)
+    servo.reset_bus_stats()
+    bus.reset_stats()
+
+    path = edited_servo_map(tmp_path, fl_hip={"angle_min": 30}, fl_knee={"offset": 10})
+    reloader = HotReloader(BehaviorManager(engine, behaviors_path=str(tmp_path / "none.json")),
+                           servo_map_path=path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        reloader._on_servo_map(path)
+    assert reloader.stats() == {"reloads": 1, "errors": 0, "last_error": None}
+
+    assert servo._cal_lo[hip] == 30
+    assert servo._pca_devices == devices
+    # the current pose is rewritten with the new calibration: hip clamped to 30, knee shifted by the offset
+    assert chip.channel(1)[1] == servo._pwm12_at(hip, 30)
+    assert chip.channel(3)[1] == servo._pwm12_at(knee, 120) != knee_pwm
+    # only LED register bursts went out: no reads, no MODE1 / PRE_SCALE writes
+    assert bus.transactions == servo.get_bus_stats()["transactions"] == 2
+    assert chip.frequency == pytest.approx(servo.freq, rel=0.05)
+
+
+def test_bad_servo_map_keeps_calibration(sim_engine, tmp_path):
+    from hot_reload import HotReloader
+    engine = sim_engine
+    servo = engine.servo
+    lo = list(servo._cal_lo)
+    path = edited_servo_map(tmp_path, fl_hip={"channel": 0})
+    reloader = HotReloader(BehaviorManager(engine, behaviors_path=str(tmp_path / "none.json")),
+                           servo_map_path=path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        reloader._on_servo_map(path)
+    assert reloader.stats()["errors"] == 1
+    assert "wiring of fl_hip changed" in reloader.stats()["last_error"]
+    assert list(servo._cal_lo) == lo
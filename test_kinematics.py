@@ -0,0 +1,117 @@
+# test_kinematics.py
+# Closed-form leg IK: forward/inverse agreement, neutral stance, reachability.
+#   python -m pytest -q test_kinematics.py
+import contextlib
+import io
+import json
+import math
+
+import pytest
+
+import kinematics
+from kinematics import LEGS, JOINTS, KinematicsError, LegKinematics
+from servo_controller import ServoController
+
+SERVO_MAP_PATH = "servo_map_dog.json"
+
+
+def make_servo(path=SERVO_MAP_PATH):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ServoController(path, simulate_if_no_hw=True, trace=False)
+
+
+@pytest.fixture
+def kin():
+    return LegKinematics(make_servo())
+
+
+def workspace(step=0.02):
+    """Leg-frame foot offsets from the hip axis (y outward), around the standing foot."""
+    n = int(round(0.12 / step))
+    for i in range(-n, n + 1):
+        for j in range(0, n + 1):
+            for k in range(1, 2 * n + 1):
+                yield i * step, j * step, -k * step
+
+
+def test_forward_inverts_solve(kin):
+    g = kin.geometry
+    solved = 0
+    for leg_i, leg in enumerate(LEGS):
+        side = 1.0 if leg in ("fl", "bl") else -1.0
+        ox, oy, oz = kin._origin[leg_i]
+        for x, y_out, z in workspace():
+            sol = kin._solve_leg(leg_i, x, side * y_out, z)
+            if sol is None or y_out * y_out + z * z - g.hip_offset ** 2 <= 1e-9:
+                continue
+            solved += 1
+            fx, fy, fz = kin.forward(leg_i, *sol)
+            assert (fx - ox, fy - oy, fz - oz) == pytest.approx((x, side * y_out, z), abs=1e-9), (leg, x, y_out, z)
+    assert solved > 1000
+
+
+def test_unreachable_geometry_returns_none(kin):
+    g = kin.geometry
+    assert kin._solve_leg(0, 0.0, 0.0, -(g.thigh + g.shank + g.hip_offset + 0.01)) is None
+    # inside the hip offset circle
+    assert kin._solve_leg(0, 0.0, 0.0, -g.hip_offset / 2) is None
+
+
+def test_stance_solves_to_neutral(kin):
+    angles, ok = kin.solve(kin.stance())
+    assert list(ok) == [True] * 4
+    servos = kin.servo.servos
+    for leg_i, leg in enumerate(LEGS):
+        for j, joint in enumerate(JOINTS):
+            assert angles[leg_i][j] == pytest.approx(servos[f"{leg}_{joint}"]["neutral"], abs=1e-6)
+    pose = kin.solve_pose({leg: foot for leg, foot in zip(LEGS, kin.stance())})
+    assert pose == pytest.approx({nm: servos[nm]["neutral"] for nm in kin.names}, abs=1e-6)
+
+
+def test_unreachable_and_out_of_limit_mask(tmp_path):
+    with open(SERVO_MAP_PATH) as f:
+        data = json.load(f)
+    for cfg in data["servos"]:
+        if cfg["name"] == "fl_thigh":
+            cfg["angle_min"], cfg["angle_max"] = 80, 100
+    path = tmp_path / "servo_map.json"
+    path.write_text(json.dumps(data))
+    kin = LegKinematics(make_servo(str(path)))
+    feet = kin.stance()
+    g = kin.geometry
+    # fl: geometrically fine but swings the thigh past 100 deg; fr: out of reach
+    fx, fy, fz = feet[0]
+    feet[0] = (fx + 0.06, fy, fz + 0.02)
+    fx, fy, fz = feet[1]
+    feet[1] = (fx, fy, fz - (g.thigh + g.shank))
+    angles, ok = kin.solve(feet)
+    assert list(ok) == [False, False, True, True]
+    assert all(math.isfinite(a) for a in angles[0])
+    assert not (80 <= angles[0][1] <= 100)
+    assert all(math.isnan(a) for a in angles[1])
+    with pytest.raises(KinematicsError, match="fl .* unreachable"):
+        kin.solve_pose({"fl": feet[0]})
+    with pytest.raises(KinematicsError, match="fr .* unreachable"):
+        kin.solve_pose({"fr": feet[1]})
+    assert set(kin.solve_pose({"bl": feet[2]})) == {"bl_hip", "bl_thigh", "bl_knee"}
+
+
+def test_numpy_and_scalar_paths_agree(kin, monkeypatch):
+    pytest.importorskip("numpy")
+    frames = []
+    for dx in (-0.04, 0.0, 0.05):
+        for dz in (-0.03, 0.0, 0.04):
+            frames.append([(x + dx, y + dx / 2, z + dz) for x, y, z in kin.stance()])
+    frames.append([(x, y, z - 1.0) for x, y, z in kin.stance()])
+    np_angles, np_ok = kin.solve(frames)
+    monkeypatch.setattr(kinematics, "np", None)
+    py_angles, py_ok = kin.solve(frames)
+    assert [list(map(bool, row)) for row in np_ok] == py_ok
+    for f, frame in enumerate(py_angles):
+        for leg_i, leg_angles in enumerate(frame):
+            for j, a in enumerate(leg_angles):
+                b = float(np_angles[f][leg_i][j])
+                if math.isnan(a):
+                    assert math.isnan(b)
+                else:
+                    assert b == pytest.approx(a, abs=1e-3), (f, leg_i, j)
@@ -0,0 +1,130 @@
+# test_motion_engine.py
+# Goal lifecycle: PENDING -> ACTIVE -> terminal, cancel and preemption.
+#   python -m pytest -q test_motion_engine.py
+import threading
+import time
+
+import pytest
+
+from servo_controller import ServoController
+from motion_engine import (MotionEngine, MotionGoal, PENDING, ACTIVE, SUCCEEDED, PREEMPTED, ABORTED,
+                           TERMINAL_STATES)
+
+SERVO_MAP_PATH = "servo_map_dog.json"
+
+
+class Feedback:
+    """Collects feedback dicts; wait() blocks until a goal reaches a terminal status."""
+    def __init__(self):
+        self.messages = []
+        self._cond = threading.Condition()
+
+    def __call__(self, fb):
+        with self._cond:
+            self.messages.append(fb)
+            self._cond.notify_all()
+
+    def terminal(self, goal_id):
+        for fb in self.messages:
+            if fb["goal_id"] == goal_id and fb["status"] in TERMINAL_STATES:
+                return fb
+        return None
+
+    def wait(self, goal_id, timeout=5.0):
+        with self._cond:
+            self._cond.wait_for(lambda: self.terminal(goal_id) is not None, timeout)
+            return self.terminal(goal_id)
+
+
+@pytest.fixture
+def engine():
+    servo = ServoController(SERVO_MAP_PATH, simulate_if_no_hw=True, trace=False)
+    feedback = Feedback()
+    eng = MotionEngine(servo, feedback_cb=feedback, control_hz=100, limit_velocity=False)
+    eng.feedback = feedback
+    yield eng
+    eng.stop()
+
+
+def hold(goal_id, seconds, priority=5, **kw):
+    return MotionGoal(goal_id, "pose", [{"duration": seconds, "pose": {"fl_hip": 10}}], priority=priority, **kw)
+
+
+def wait_status(engine, goal_id, status, timeout=5.0):
+    end = time.monotonic() + timeout
+    while engine.get_status(goal_id) != status and time.monotonic() < end:
+        time.sleep(0.005)
+    return engine.get_status(goal_id)
+
+
+def test_goal_runs_to_success(engine):
+    engine.push_goal(hold("a", 0.1))
+    assert wait_status(engine, "a", ACTIVE) == ACTIVE
+    assert engine.feedback.wait("a")["status"] == SUCCEEDED
+    assert engine.get_status("a") == SUCCEEDED
+
+
+def test_unknown_goal(engine):
+    assert engine.get_status("nope") is None
+    assert engine.cancel_goal("nope") is False
+
+
+def test_cancel_pending_goal(engine):
+    engine.push_goal(hold("a", 1.0))
+    assert wait_status(engine, "a", ACTIVE) == ACTIVE
+    engine.push_goal(hold("b", 0.1))
+    assert engine.get_status("b") == PENDING
+    assert engine.queue_depth() == 1
+    assert engine.cancel_goal("b") is True
+    assert engine.get_status("b") == PREEMPTED
+    assert engine.queue_depth() == 0
+    assert engine.feedback.wait("b")["message"] == "cancelled before start"
+    # cancelled goals are not run once the active one is done
+    assert engine.cancel_goal("a") is True
+    assert engine.feedback.wait("a")["status"] == PREEMPTED
+    time.sleep(0.05)
+    assert engine.get_status("b") == PREEMPTED
+    assert not any(fb["goal_id"] == "b" and fb["status"] == ACTIVE for fb in engine.feedback.messages)
+
+
+def test_cancel_active_goal(engine):
+    engine.push_goal(hold("a", 5.0))
+    assert wait_status(engine, "a", ACTIVE) == ACTIVE
+    assert engine.cancel_goal("a") is True
+    assert engine.feedback.wait("a", timeout=1.0)["status"] == PREEMPTED
+    assert engine.get_status("a") == PREEMPTED
+    assert engine.cancel_goal("a") is False
+
+
+def test_higher_priority_preempts(engine):
+    engine.push_goal(hold("low", 5.0, priority=1))
+    assert wait_status(engine, "low", ACTIVE) == ACTIVE
+    engine.push_goal(hold("high", 0.05, priority=9))
+    assert engine.feedback.wait("low", timeout=1.0)["status"] == PREEMPTED
+    assert engine.feedback.wait("high")["status"] == SUCCEEDED
+
+
+def test_not_preemptable_goal_finishes(engine):
+    engine.push_goal(hold("a", 0.2, priority=1, preemptable=False))
+    assert wait_status(engine, "a", ACTIVE) == ACTIVE
+    engine.push_goal(hold("b", 0.05, priority=9))
+    assert engine.feedback.wait("a")["status"] == SUCCEEDED
+    assert engine.feedback.wait("b")["status"] == SUCCEEDED
+
+
+def test_queued_goal_times_out(engine):
+    engine.push_goal(hold("a", 1.0))
+    assert wait_status(engine, "a", ACTIVE) == ACTIVE
+    engine.push_goal(hold("b", 0.1, timeout=0.1))
+    fb = engine.feedback.wait("b", timeout=1.0)
+    assert fb["status"] == ABORTED
+    assert engine.get_status("b") == ABORTED
+    assert engine.queue_depth() == 0
+
+
+def test_stop_ends_active_goal(engine):
+    engine.push_goal(hold("a", 5.0))
+    assert wait_status(engine, "a", ACTIVE) == ACTIVE
+    engine.stop()
+    assert engine.get_status("a") == ABORTED
+    assert engine.feedback.terminal("a")["message"] == "engine stopped"
@@ -0,0 +1,81 @@
+# test_pose_telemetry.py
+# Seqlock pose segment: writer -> reader round trip.
+#   python -m pytest -q test_pose_telemetry.py
+import contextlib
+import io
+
+import pytest
+
+from pose_telemetry import GOAL_ID_BYTES, PoseTelemetry, PoseTelemetryReader
+from servo_controller import ServoController
+
+NAMES = ["fl_hip", "fl_thigh", "fl_knee"]
+
+
+@pytest.fixture
+def segment():
+    writer = PoseTelemetry(NAMES)
+    reader = PoseTelemetryReader(writer.name)
+    yield writer, reader
+    reader.close()
+    writer.close()
+
+
+def test_round_trip(segment):
+    writer, reader = segment
+    assert reader.names == NAMES
+    assert reader.read().seq == 0  # nothing published yet
+    writer.publish(7, [90.0, 45.5, -12.25], [307, 0x1000, 4095], goal_id="sit-1")
+    writer.publish(8, [91.0, 46.5, -11.25], [310, 200, 4000], goal_id="sit-2")
+    snap = reader.read()
+    assert snap.seq == 2
+    assert snap.tick == 8
+    assert snap.goal_id == "sit-2"
+    assert snap.angles == (91.0, 46.5, -11.25)
+    assert snap.pwm == (310, 200, 4000)
+    assert snap.t > 0.0
+    assert reader.read_pose() == dict(zip(NAMES, snap.angles))
+    assert reader.retries == 0
+
+
+def test_goal_id_is_truncated_and_optional(segment):
+    writer, reader = segment
+    writer.publish(1, [0.0] * 3, [0] * 3, goal_id="g" * (GOAL_ID_BYTES + 10))
+    assert reader.read().goal_id == "g" * GOAL_ID_BYTES
+    writer.publish(2, [0.0] * 3, [0] * 3)
+    assert reader.read().goal_id == ""
+
+
+def test_writer_in_progress_times_out(segment):
+    writer, reader = segment
+    writer.publish(1, [1.0, 2.0, 3.0], [1, 2, 3])
+    # writer stopped between its two counter updates
+    writer._seq[0] += 1
+    assert reader.read(timeout=0.02) is None
+    assert reader.read_pose() is None
+    assert reader.retries > 0
+    writer._seq[0] += 1
+    assert reader.read(timeout=0.02).angles == (1.0, 2.0, 3.0)
+
+
+def test_publish_servo_reports_shadow_pwm():
+    with contextlib.redirect_stdout(io.StringIO()):
+        servo = ServoController("servo_map_dog.json", simulate_if_no_hw=True, trace=False)
+    writer = PoseTelemetry(servo.servo_names)
+    reader = PoseTelemetryReader(writer.name)
+    try:
+        servo.set_pose({"fl_hip": 30.0, "br_knee": 120.0})
+        writer.publish_servo(servo, 3, "g")
+        snap = reader.read()
+        pose = servo.get_current_pose()
+        assert snap.angles == tuple(pose[nm] for nm in servo.servo_names)
+        idx = servo._servo_index
+        assert snap.pwm[idx["fl_hip"]] == servo._pwm12_at(idx["fl_hip"], 30.0)
+        assert snap.pwm[idx["br_knee"]] == servo._pwm12_at(idx["br_knee"], 120.0)
+        other = PoseTelemetry(NAMES)
+        with pytest.raises(ValueError):
+            other.publish_servo(servo, 1)
+        other.close()
+    finally:
+        reader.close()
+        writer.close()
@@ -0,0 +1,101 @@
+# test_scheduler.py
+# TickScheduler deadlines and overrun policies on a fake clock.
+#   python -m pytest -q test_scheduler.py
+import pytest
+
+import scheduler
+from metrics import Instrumentation
+from scheduler import CATCH_UP, SKIP, TickScheduler
+
+HZ = 8  # period 0.125 s: exact in binary, so deadlines compare exactly
+
+
+class FakeTime:
+    """Stands in for the time module inside scheduler: sleep() advances monotonic()."""
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(scheduler, "time", fake)
+    return fake
+
+
+def test_deadlines_do_not_drift(clock):
+    ticker = TickScheduler(HZ)
+    deadlines = []
+    for _ in range(5):
+        deadlines.append(ticker.wait())
+        clock.now += 0.05  # work between ticks
+    assert deadlines == [0.125, 0.25, 0.375, 0.5, 0.625]
+    assert clock.sleeps == pytest.approx([0.125] + [0.075] * 4)
+    stats = ticker.stats()
+    assert (stats["ticks"], stats["overruns"], stats["skipped"]) == (5, 0, 0)
+    assert stats["jitter_max"] == 0.0
+
+
+def test_skip_realigns_to_the_grid(clock):
+    ticker = TickScheduler(HZ, SKIP)
+    assert ticker.wait() == 0.125
+    clock.now += 0.4  # a stall of 3.2 periods
+    # tick 2 (0.25) is 0.275 s late: ticks 2 and 3 are dropped, this one is 0.5
+    assert ticker.wait() == 0.5
+    assert ticker.wait() == 0.625
+    assert clock.now == 0.625
+    stats = ticker.stats()
+    assert (stats["ticks"], stats["overruns"], stats["skipped"]) == (3, 1, 2)
+    assert stats["jitter_max"] == pytest.approx(0.025)
+    assert stats["jitter_mean"] == pytest.approx(0.025 / 3)
+
+
+def test_catch_up_runs_missed_ticks_back_to_back(clock):
+    ticker = TickScheduler(HZ, CATCH_UP)
+    assert ticker.wait() == 0.125
+    clock.now += 0.4
+    n_sleeps = len(clock.sleeps)
+    # every missed deadline is returned, without sleeping, until back on schedule
+    assert [ticker.wait() for _ in range(3)] == [0.25, 0.375, 0.5]
+    assert len(clock.sleeps) == n_sleeps
+    assert ticker.wait() == 0.625
+    stats = ticker.stats()
+    # 0.275 and 0.15 s late count as overruns; 0.025 s late does not
+    assert (stats["ticks"], stats["overruns"], stats["skipped"]) == (5, 2, 0)
+    assert stats["jitter_max"] == pytest.approx(0.275)
+
+
+def test_restart_starts_a_new_grid_now(clock):
+    ticker = TickScheduler(HZ)
+    ticker.wait()
+    clock.now = 10.0
+    origin = ticker.restart()
+    assert origin == 10.0 - 0.125
+    assert ticker.wait() == 10.0
+    assert ticker.wait() == 10.125
+    assert ticker.stats()["overruns"] == 0
+
+
+def test_instrumentation_records_lateness_and_overruns(clock):
+    inst = Instrumentation(enabled=True)
+    ticker = TickScheduler(HZ, SKIP, instrumentation=inst, name="ctl")
+    ticker.wait()
+    clock.now += 0.4
+    ticker.wait()
+    snap = inst.snapshot()
+    assert snap["counters"]["ctl_overruns"] == 1
+    assert snap["histograms"]["ctl_lateness"]["count"] == 2
+    assert snap["histograms"]["ctl_lateness"]["max"] == pytest.approx(0.275)
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        TickScheduler(HZ, "later")
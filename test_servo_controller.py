@@ -0,0 +1,156 @@
+# test_servo_controller.py
+#   python -m pytest -q test_servo_controller.py
+import contextlib
+import io
+import json
+
+import pytest
+
+from i2c_sim import SimI2C, PCA9685
+from servo_controller import ServoController
+
+SERVO_MAP_PATH = "servo_map_dog.json"
+
+
+def baseline_pwm12(angle_deg, cfg, freq):
+    """The original per-call angle -> PWM formula the compiled calibration replaced."""
+    amin, amax = cfg["angle_min"], cfg["angle_max"]
+    offset = cfg.get("offset", 0)
+    reversed_ = cfg.get("reversed", False)
+    angle = angle_deg + offset
+    if reversed_:
+        angle = 180 - angle
+        logical_min, logical_max = 180 - amax, 180 - amin
+    else:
+        logical_min, logical_max = amin, amax
+    angle = max(logical_min, min(logical_max, angle))
+    min_us = cfg.get("min_pulse_us", 500)
+    max_us = cfg.get("max_pulse_us", 2500)
+    us = min_us + (angle / 180.0) * (max_us - min_us)
+    duty_fraction = us / (1_000_000.0 / freq)
+    return int(round(max(0, min(4095, duty_fraction * 4096))))
+
+
+def controller(path=SERVO_MAP_PATH, freq=50):
+    return ServoController(path, freq=freq, simulate_if_no_hw=True, trace=False)
+
+
+ANGLES = [a / 4.0 for a in range(-160, 900)]  # -40 .. 225 deg in 0.25 deg steps
+
+
+@pytest.fixture
+def odd_map(tmp_path):
+    """Servo map exercising offset, reversal, pulse limits and a clamp that cuts the pulse range."""
+    servos = [
+        {"name": "plain", "board_addr": "0x40", "channel": 0, "angle_min": 0, "angle_max": 180},
+        {"name": "offset", "board_addr": "0x40", "channel": 1, "angle_min": 20, "angle_max": 150, "offset": -7.5},
+        {"name": "rev", "board_addr": "0x40", "channel": 2, "angle_min": 10, "angle_max": 170, "reversed": True,
+         "offset": 4},
+        {"name": "pulse", "board_addr": "0x41", "channel": 5, "angle_min": 0, "angle_max": 180,
+         "min_pulse_us": 600, "max_pulse_us": 2400},
+        {"name": "wide", "board_addr": "0x41", "channel": 6, "angle_min": 0, "angle_max": 180,
+         "min_pulse_us": 0, "max_pulse_us": 30000},
+    ]
+    path = tmp_path / "servo_map.json"
+    path.write_text(json.dumps({"servos": servos}))
+    return str(path)
+
+
+@pytest.mark.parametrize("freq", [50, 60, 200])
+def test_pwm_matches_baseline_formula(freq):
+    ctrl = controller(freq=freq)
+    for name, cfg in ctrl.servos.items():
+        for angle in ANGLES:
+            assert ctrl._angle_to_pwm12(angle, cfg) == baseline_pwm12(angle, cfg, freq), (name, angle)
+
+
+def test_pwm_matches_baseline_formula_odd_calibration(odd_map):
+    ctrl = controller(odd_map)
+    for name, cfg in ctrl.servos.items():
+        for angle in ANGLES:
+            assert ctrl._angle_to_pwm12(angle, cfg) == baseline_pwm12(angle, cfg, 50), (name, angle)
+
+
+def test_pwm12_array_matches_per_servo(odd_map):
+    ctrl = controller(odd_map)
+    for angle in ANGLES[::7]:
+        angles = ctrl.pose_array({nm: angle for nm in ctrl.servo_names})
+        expected = [baseline_pwm12(angle, ctrl.servos[nm], 50) for nm in ctrl.servo_names]
+        assert ctrl.pwm12_array(angles) == expected, angle
+
+
+# --- shadow registers: unchanged channels are skipped, changed runs go out as bursts ---
+def sim_controller():
+    bus = SimI2C(boards=(0x40,))
+    with contextlib.redirect_stdout(io.StringIO()):
+        ctrl = ServoController(SERVO_MAP_PATH, i2c=bus, pca_driver=PCA9685, trace=False)
+    ctrl.reset_bus_stats()
+    bus.reset_stats()
+    return ctrl, bus
+
+
+def test_unchanged_pose_is_skipped():
+    ctrl = controller()
+    pose = {nm: 45 for nm in ctrl.servo_names}
+    ctrl.set_pose(pose)
+    ctrl.reset_bus_stats()
+    ctrl.set_pose(pose)
+    stats = ctrl.get_bus_stats()
+    assert stats["transactions"] == 0
+    assert stats["bytes"] == 0
+    assert stats["channels_skipped"] == len(pose)
+    assert stats["transactions_saved"] == len(pose)
+
+
+def test_adjacent_changes_share_a_burst():
+    ctrl = controller()
+    ctrl.set_pose({nm: 45 for nm in ctrl.servo_names})
+    ctrl.reset_bus_stats()
+    # channels 1, 2, 3
+    ctrl.set_pose({"fl_hip": 50, "fl_thigh": 50, "fl_knee": 50})
+    stats = ctrl.get_bus_stats()
+    assert stats["transactions"] == 1
+    assert stats["bytes"] == 2 + 4 * 3
+    assert stats["channels_written"] == 3
+
+
+def test_gaps_are_not_bridged():
+    ctrl = controller()
+    ctrl.set_pose({nm: 45 for nm in ctrl.servo_names})
+    ctrl.reset_bus_stats()
+    # channels 1 and 11: two short writes, the 9 channels between are not re-sent
+    ctrl.set_pose({"fl_hip": 50, "br_knee": 50, "fr_hip": 45})
+    stats = ctrl.get_bus_stats()
+    assert stats["transactions"] == 2
+    assert stats["bytes"] == 2 * (2 + 4)
+    assert stats["channels_written"] == 2
+    assert stats["channels_skipped"] == 1
+    assert stats["bytes_saved"] == 3 * 6 - 12
+
+
+def test_bus_traffic_matches_stats_and_registers():
+    ctrl, bus = sim_controller()
+    chip = bus.devices[0x40]
+    poses = [{nm: 45 for nm in ctrl.servo_names},
+             {"fl_hip": 60, "fl_thigh": 60, "bl_knee": 30},
+             {"fl_hip": 60, "fl_thigh": 61, "bl_knee": 30},
+             {nm: 90 for nm in ctrl.servo_names}]
+    for pose in poses:
+        ctrl.set_pose(pose)
+        stats = ctrl.get_bus_stats()
+        assert bus.transactions == stats["transactions"]
+        assert bus.bytes == stats["bytes"]
+        for nm in ctrl.servo_names:
+            cfg = ctrl.servos[nm]
+            assert chip.channel(cfg["channel"]) == (0, baseline_pwm12(ctrl.get_current_value(nm), cfg, 50)), nm
+
+
+def test_force_rewrites_unchanged_channels():
+    ctrl = controller()
+    ctrl.set_pose({nm: 45 for nm in ctrl.servo_names})
+    ctrl.reset_bus_stats()
+    ctrl._write_board(0, [(1, 0, 300), (2, 0, 300)])
+    ctrl.reset_bus_stats()
+    ctrl._write_board(0, [(1, 0, 300), (2, 0, 300)], force=True)
+    assert ctrl.get_bus_stats()["transactions"] == 1
+    assert ctrl.get_bus_stats()["channels_written"] == 2
@@ -0,0 +1,123 @@
+# test_servo_trace.py
+# Servo command trace: record -> save -> load / replay onto a simulated bus.
+#   python -m pytest -q test_servo_trace.py
+import contextlib
+import io
+
+import pytest
+
+from i2c_sim import SimI2C, PCA9685, LED0_ON_L
+from servo_controller import ServoController
+from servo_trace import RECORD_SIZE, TraceRecorder, TraceReplayer, iter_records, load_trace
+
+SERVO_MAP_PATH = "servo_map_dog.json"
+
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def drive(servo):
+    """A few poses, including repeats (skipped) and single-joint moves."""
+    names = servo.servo_names
+    servo.set_pose({nm: 45 + 5 * i for i, nm in enumerate(names)})
+    servo.set_pose({"fl_hip": 100, "br_knee": 20})
+    servo.set_pose({"fl_hip": 100, "br_knee": 20})
+    servo.set_servo_angle("bl_thigh", 130)
+    servo.set_pose({nm: 90 for nm in names})
+    servo.set_pose({"fr_knee": 10, "fr_thigh": 170})
+
+
+def replay_onto_sim(source):
+    bus = SimI2C(boards=(0x40,))
+    target = quiet(ServoController, SERVO_MAP_PATH, i2c=bus, pca_driver=PCA9685, trace=False)
+    skipped = TraceReplayer(source).replay(target, speed=None)
+    return bus.devices[0x40], skipped
+
+
+def assert_same_registers(chip, servo):
+    """LED registers of every mapped channel on the chip equal the servo's shadow image."""
+    image = servo._shadow[0]
+    for cfg in servo.servos.values():
+        o = 4 * cfg["channel"]
+        assert bytes(chip.regs[LED0_ON_L + o:LED0_ON_L + o + 4]) == bytes(image[o:o + 4]), cfg["name"]
+
+
+@pytest.fixture
+def recorded():
+    servo = quiet(ServoController, SERVO_MAP_PATH, simulate_if_no_hw=True)
+    drive(servo)
+    return servo
+
+
+def test_save_load_round_trip(recorded, tmp_path):
+    trace = recorded.trace
+    path = str(tmp_path / "run.rdtr")
+    trace.save(path)
+    records = list(iter_records(trace.snapshot()))
+    assert len(records) == trace.count
+    loaded = load_trace(path)
+    if isinstance(loaded, memoryview):
+        assert list(iter_records(loaded)) == records
+    else:
+        assert len(loaded) == len(records)
+        for row, (t, board, ch, pwm) in zip(loaded, records):
+            assert (float(row["t"]), int(row["board"]), int(row["channel"]), int(row["pwm"])) == (t, board, ch, pwm)
+    assert {board for _, board, _, _ in records} == {0x40}
+
+
+def test_replay_reproduces_registers(recorded, tmp_path):
+    path = str(tmp_path / "run.rdtr")
+    recorded.trace.save(path)
+    chip, skipped = replay_onto_sim(path)
+    assert skipped == 0
+    assert_same_registers(chip, recorded)
+    # raw snapshot bytes replay the same way
+    chip, _ = replay_onto_sim(recorded.trace.snapshot())
+    assert_same_registers(chip, recorded)
+
+
+def test_file_recorder_matches_ring(tmp_path):
+    path = str(tmp_path / "live.rdtr")
+    ring = TraceRecorder()
+    to_file = TraceRecorder(path, capacity=4)  # forces several flushes
+    a = quiet(ServoController, SERVO_MAP_PATH, simulate_if_no_hw=True, trace=ring)
+    b = quiet(ServoController, SERVO_MAP_PATH, simulate_if_no_hw=True, trace=to_file)
+    drive(a)
+    drive(b)
+    to_file.close()
+    assert to_file.stats()["flushes"] > 1
+    with open(path, "rb") as f:
+        data = f.read()[16:]
+    # same channel / pwm stream; timestamps differ between the two runs
+    assert [r[1:] for r in iter_records(data)] == [r[1:] for r in iter_records(ring.snapshot())]
+    chip, _ = replay_onto_sim(path)
+    assert_same_registers(chip, b)
+
+
+def test_ring_keeps_the_newest_records():
+    rec = TraceRecorder(capacity=3)
+    for i in range(5):
+        rec.record(float(i), 0x40, i, 100 + i)
+    assert rec.stats()["dropped"] == 2
+    assert [r[0] for r in iter_records(rec.snapshot())] == [2.0, 3.0, 4.0]
+    assert len(rec.snapshot()) == 3 * RECORD_SIZE
+
+
+def test_replay_skips_unknown_boards():
+    rec = TraceRecorder()
+    rec.record(0.0, 0x40, 1, 300)
+    rec.record(0.0, 0x41, 1, 300)
+    rec.record(0.1, 0x40, 2, 400)
+    chip, skipped = replay_onto_sim(rec.snapshot())
+    assert skipped == 1
+    assert chip.channel(1) == (0, 300)
+    assert chip.channel(2) == (0, 400)
+
+
+def test_load_trace_rejects_other_files(tmp_path):
+    path = tmp_path / "junk.bin"
+    path.write_bytes(b"JUNK" + bytes(60))
+    with pytest.raises(ValueError):
+        load_trace(str(path))
@@ -0,0 +1,163 @@
+# test_trajectory.py
+# Keyframe curves (profiles, blending, preempt hand-off) and joint speed limits.
+#   python -m pytest -q test_trajectory.py
+import contextlib
+import io
+
+import pytest
+
+import trajectory
+from servo_controller import ServoController
+from trajectory import (KeyframeCurve, LINEAR, MIN_JERK, SPLINE, PEAK_SPEED_FACTOR, limit_durations,
+                        min_move_time)
+
+NAMES = ["a", "b"]
+START = [0.0, 90.0]
+POSES = [
+    {"duration": 0.5, "pose": {"a": 30.0, "b": 60.0}},
+    {"duration": 0.4, "pose": {"a": 60.0}},
+    {"duration": 0.6, "pose": {"a": 20.0, "b": 120.0}},
+]
+
+
+def curves(profile, **kw):
+    """The same curve with list rows and, when NumPy is installed, numpy rows."""
+    out = [KeyframeCurve(NAMES, POSES, START, profile, **kw)]
+    if trajectory.np is not None:
+        out.append(KeyframeCurve(NAMES, POSES, START, profile, vectorized=True, **kw))
+    return out
+
+
+def values(row):
+    return [float(v) for v in row]
+
+
+def knot_values():
+    """Joint values at every knot (held when a keyframe omits a joint)."""
+    rows = [list(START)]
+    for kf in POSES:
+        rows.append([kf["pose"].get(nm, rows[-1][c]) for c, nm in enumerate(NAMES)])
+    return rows
+
+
+def slope(curve, tau, h=1e-6):
+    return [(b - a) / (2 * h) for a, b in zip(values(curve.sample(tau - h)), values(curve.sample(tau + h)))]
+
+
+@pytest.mark.parametrize("profile", [LINEAR, MIN_JERK, SPLINE])
+def test_curve_passes_through_keyframes(profile):
+    for curve in curves(profile):
+        assert curve.duration == pytest.approx(1.5)
+        for tau, want in zip(curve.knots, knot_values()):
+            assert values(curve.sample(tau)) == pytest.approx(want, abs=1e-9), tau
+        assert values(curve.sample(99.0)) == knot_values()[-1]
+
+
+@pytest.mark.parametrize("profile", [MIN_JERK, SPLINE])
+def test_smooth_profiles_start_and_end_at_rest(profile):
+    for curve in curves(profile):
+        assert values(curve.velocity(0.0)) == pytest.approx([0.0, 0.0], abs=1e-9)
+        assert values(curve.velocity(curve.duration - 1e-9)) == pytest.approx([0.0, 0.0], abs=1e-5)
+        assert values(curve.velocity(curve.duration)) == [0.0, 0.0]
+
+
+def test_min_jerk_stops_at_every_keyframe():
+    for curve in curves(MIN_JERK):
+        for tau in curve.knots[1:-1]:
+            assert values(curve.velocity(tau)) == pytest.approx([0.0, 0.0], abs=1e-9)
+
+
+def test_spline_blends_through_interior_keyframes():
+    for curve in curves(SPLINE):
+        for tau in curve.knots[1:-1]:
+            v_in = values(curve.velocity(tau - 1e-9))
+            v_out = values(curve.velocity(tau))
+            # moving through the keyframe (tangent from its neighbours), same velocity on both sides
+            assert any(abs(v) > 1.0 for v in v_out), tau
+            assert v_in == pytest.approx(v_out, abs=1e-3), tau
+
+
+@pytest.mark.parametrize("profile", [LINEAR, MIN_JERK, SPLINE])
+def test_velocity_is_the_derivative_of_sample(profile):
+    for curve in curves(profile):
+        for tau in (0.1, 0.37, 0.55, 0.8, 1.2, 1.45):
+            assert values(curve.velocity(tau)) == pytest.approx(slope(curve, tau), rel=1e-4, abs=1e-3), tau
+
+
+@pytest.mark.parametrize("profile", [LINEAR, MIN_JERK, SPLINE])
+def test_preempt_hand_off_keeps_velocity(profile):
+    v0 = [-40.0, 25.0]
+    for curve in curves(profile, start_velocity=v0):
+        assert values(curve.sample(0.0)) == pytest.approx(START)
+        assert values(curve.velocity(0.0)) == pytest.approx(v0)
+        assert slope(curve, 1e-5) == pytest.approx(v0, rel=1e-3)
+        # the first keyframe is still reached on time
+        assert values(curve.sample(curve.knots[1])) == pytest.approx(knot_values()[1], abs=1e-9)
+    # at rest: same as no hand-off
+    for a, b in zip(curves(profile, start_velocity=[0.0, 0.0]), curves(profile)):
+        assert values(a.sample(0.2)) == values(b.sample(0.2))
+
+
+def test_zero_length_keyframe_jumps():
+    curve = KeyframeCurve(["a"], [{"duration": 0.0, "pose": {"a": 50.0}}, {"duration": 0.5, "pose": {"a": 0.0}}],
+                          [10.0], SPLINE)
+    assert values(curve.sample(0.0)) == [50.0]
+    assert values(curve.sample(0.5)) == [0.0]
+
+
+# --- joint speed limits ---
+@pytest.fixture
+def servo():
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ServoController("servo_map_dog.json", simulate_if_no_hw=True, trace=False)
+
+
+@pytest.mark.parametrize("profile", [LINEAR, MIN_JERK, SPLINE])
+def test_limit_durations_stretches_short_keyframes(servo, profile):
+    speed = servo.servos["fl_hip"]["default_speed_dps"]
+    poses = [{"duration": 0.1, "pose": {"fl_hip": 10.0}},
+             {"duration": 5.0, "pose": {"fl_hip": 30.0}},
+             {"duration": 0.2, "pose": {"fl_hip": 110.0, "fl_knee": 90.0}}]
+    limited, requested, adjusted = limit_durations(servo, poses, {"fl_hip": 90.0, "fl_knee": 90.0}, profile=profile)
+    peak = PEAK_SPEED_FACTOR[profile]
+    assert [kf["duration"] for kf in limited] == pytest.approx([80.0 / speed * peak, 5.0, 80.0 / speed * peak])
+    assert requested == pytest.approx(5.3)
+    assert adjusted == pytest.approx(sum(kf["duration"] for kf in limited))
+    # the input keyframes are left alone
+    assert poses[0]["duration"] == 0.1
+    assert limited[1] is poses[1]
+
+
+def test_limit_durations_min_time(servo):
+    speed = servo.servos["fl_hip"]["default_speed_dps"]
+    poses = [{"duration": 0.1, "pose": {"fl_hip": 10.0}},
+             {"duration": 5.0, "pose": {"fl_hip": 30.0}}]
+    limited = limit_durations(servo, poses, {"fl_hip": 90.0}, min_time=True, profile=MIN_JERK)[0]
+    peak = PEAK_SPEED_FACTOR[MIN_JERK]
+    # exactly the limit, shortening keyframes that were slower than needed
+    assert [kf["duration"] for kf in limited] == pytest.approx([80.0 / speed * peak, 20.0 / speed * peak])
+
+
+def test_limit_durations_measures_clamped_angles(servo):
+    lo = servo.servos["fl_hip"]["angle_min"]
+    speed = servo.servos["fl_hip"]["default_speed_dps"]
+    poses = [{"duration": 0.0, "pose": {"fl_hip": lo - 100.0}}]
+    limited = limit_durations(servo, poses, {"fl_hip": 90.0})[0]
+    assert limited[0]["duration"] == pytest.approx((90.0 - lo) / speed)
+
+
+def test_limit_durations_keeps_slow_enough_sequences(servo):
+    poses = [{"duration": 2.0, "pose": {"fl_hip": 10.0}}, {"duration": 1.0, "pose": {"fl_hip": 20.0}}]
+    limited, requested, adjusted = limit_durations(servo, poses, {"fl_hip": 90.0}, profile=SPLINE)
+    assert limited is poses
+    assert requested == adjusted == 3.0
+
+
+def test_min_move_time():
+    assert min_move_time(0.0, 100.0, 50.0) == 0.0
+    assert min_move_time(90.0, 180.0, 0.0) == 0.5
+    assert min_move_time(90.0, 0.0, 0.0) == 0.0
+    # triangle: 10 deg at 1000 deg/s^2 never reaches 200 deg/s
+    assert min_move_time(10.0, 200.0, 1000.0) == pytest.approx(2.0 * (10.0 / 1000.0) ** 0.5)
+    # trapezoid: accelerate 0.2 s, cruise, decelerate 0.2 s
+    assert min_move_time(100.0, 200.0, 1000.0) == pytest.approx(100.0 / 200.0 + 200.0 / 1000.0)
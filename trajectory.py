@@ -0,0 +1,315 @@
+# trajectory.py
+import math
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# interpolation profiles (MotionGoal.profile)
+LINEAR = "linear"      # constant velocity per keyframe, stops at each keyframe
+MIN_JERK = "min_jerk"  # quintic 10-15-6 ease per keyframe, zero vel/accel at each keyframe
+SPLINE = "spline"      # Catmull-Rom style cubic through all keyframes, no stop in between
+PROFILES = (LINEAR, MIN_JERK, SPLINE)
+
+# peak / average speed of one keyframe move, used when applying speed limits
+PEAK_SPEED_FACTOR = {LINEAR: 1.0, MIN_JERK: 1.875, SPLINE: 1.5}
+
+
+class CompiledTrajectory:
+    """
+    A keyframe sequence sampled once at a fixed rate into dense tables.
+
+    pwm / angles are flat row-major arrays, one row per frame and one column per
+    joint in `names` (servo map order). Frame i (1-based) is the pose at time
+    i * period after the start; the last frame is exactly the final keyframe.
+    """
+    __slots__ = ("names", "groups", "pwm", "angles", "n_frames", "n_joints",
+                 "period", "duration", "keyframe_ends")
+
+    def __init__(self, names, groups, pwm, angles, n_frames, period, duration, keyframe_ends):
+        self.names = names
+        self.groups = groups
+        self.pwm = pwm
+        self.angles = angles
+        self.n_frames = n_frames
+        self.n_joints = len(names)
+        self.period = period
+        self.duration = duration
+        self.keyframe_ends = keyframe_ends
+
+    def keyframe_at(self, frame):
+        """1-based keyframe index that `frame` belongs to."""
+        return min(len(self.keyframe_ends), bisect_left(self.keyframe_ends, frame) + 1)
+
+
+def sequence_joints(servo, poses):
+    """Joints touched by any keyframe, in servo map order."""
+    touched = set()
+    for kf in poses:
+        touched.update(kf["pose"])
+    for name in touched:
+        if name not in servo._servo_index:
+            raise KeyError(f"unknown servo in pose: {name}")
+    return [nm for nm in servo.servo_names if nm in touched]
+
+
+def min_move_time(distance, speed, accel):
+    """
+    Shortest rest-to-rest time to move `distance` degrees with max speed and
+    (optional) max acceleration; 0 means unlimited.
+    """
+    if distance <= 0.0:
+        return 0.0
+    if accel <= 0.0:
+        return distance / speed if speed > 0.0 else 0.0
+    if speed <= 0.0 or distance <= speed * speed / accel:
+        # triangular profile: never reaches max speed
+        return 2.0 * math.sqrt(distance / accel)
+    # trapezoid: accelerate, cruise, decelerate
+    return distance / speed + speed / accel
+
+
+def limit_durations(servo, poses, start_pose, min_time=False, profile=LINEAR):
+    """
+    Apply the servo map's per-joint speed limits (default_speed_dps, and
+    default_accel_dps2 when present) to a keyframe list.
+
+    Each keyframe's duration is stretched to the slowest joint's minimum move
+    time; with min_time=True it is set to exactly that, so the sequence runs as
+    fast as the limits allow. Distances are measured between clamped angles;
+    non-linear profiles peak above the average speed, so the time is scaled by
+    PEAK_SPEED_FACTOR[profile].
+    start_pose: {name: angle} for every joint in the poses.
+    Returns (poses, requested_duration, adjusted_duration); poses is the input
+    list itself when nothing changed.
+    """
+    index = servo._servo_index
+    lo, hi = servo._cal_lo, servo._cal_hi
+    speed, accel = servo._cal_speed, servo._cal_accel
+    peak = PEAK_SPEED_FACTOR[profile]
+    prev = dict(start_pose)
+    limited = []
+    requested = adjusted = 0.0
+    changed = False
+    for kf in poses:
+        dur = max(0.0, float(kf.get("duration", 0.5)))
+        need = 0.0
+        for name, angle in kf["pose"].items():
+            i = index[name]
+            a = min(hi[i], max(lo[i], prev.get(name, angle)))
+            b = min(hi[i], max(lo[i], angle))
+            need = max(need, peak * min_move_time(abs(b - a), speed[i], accel[i]))
+            prev[name] = angle
+        new_dur = need if min_time else max(dur, need)
+        requested += dur
+        adjusted += new_dur
+        if new_dur != dur:
+            changed = True
+            kf = dict(kf, duration=new_dur)
+        limited.append(kf)
+    return (limited if changed else poses), requested, adjusted
+
+
+class KeyframeCurve:
+    """
+    Piecewise-polynomial trajectory through a keyframe list for a fixed list of
+    joints. Polynomial coefficients for every segment are computed once here;
+    sample()/velocity() are a segment lookup plus a Horner evaluation.
+
+    Each segment k covers [knots[k], knots[k+1]) and stores coefficient rows
+    c0..cn (one value per joint) in u = tau - knots[k] seconds. Rows are numpy
+    arrays when vectorized=True and NumPy is installed, lists otherwise.
+
+    start_velocity (deg/s per joint) makes the first segment a cubic Hermite
+    leaving the start pose at that velocity, for hand-off from a preempted goal.
+    """
+    def __init__(self, names, poses, start_values, profile=LINEAR, vectorized=False, start_velocity=None):
+        if profile not in PROFILES:
+            raise ValueError(f"unknown interpolation profile: {profile}")
+        self.names = names
+        self.profile = profile
+        self._np = np is not None and vectorized
+        # knot times and per-joint values (joints a keyframe omits are held)
+        knots = [0.0]
+        values = [[float(v) for v in start_values]]
+        for kf in poses:
+            dur = max(0.0, float(kf.get("duration", 0.5)))
+            target = kf["pose"]
+            prev = values[-1]
+            values.append([float(target.get(nm, prev[c])) for c, nm in enumerate(names)])
+            knots.append(knots[-1] + dur)
+        self.knots = knots
+        self.duration = knots[-1]
+        self.n_keyframes = len(poses)
+        self._final = self._row(values[-1])
+
+        tangents = self._tangents(knots, values) if profile == SPLINE else None
+        moving = start_velocity is not None and any(start_velocity)
+        self._segments = []
+        for k in range(len(poses)):
+            T = knots[k + 1] - knots[k]
+            p0, p1 = values[k], values[k + 1]
+            if T <= 0.0:
+                rows = [p1]
+            elif k == 0 and moving:
+                m0 = [float(v) for v in start_velocity]
+                m1 = tangents[1] if tangents else [0.0] * len(m0)
+                rows = self._hermite(p0, p1, m0, m1, T)
+            elif profile == LINEAR:
+                rows = [p0, [(b - a) / T for a, b in zip(p0, p1)]]
+            elif profile == MIN_JERK:
+                # p0 + d * (10 x^3 - 15 x^4 + 6 x^5), x = u / T
+                d = [b - a for a, b in zip(p0, p1)]
+                zero = [0.0] * len(d)
+                rows = [p0, zero, zero,
+                        [10.0 * x / T ** 3 for x in d],
+                        [-15.0 * x / T ** 4 for x in d],
+                        [6.0 * x / T ** 5 for x in d]]
+            else:
+                # cubic Hermite with the shared knot tangents
+                rows = self._hermite(p0, p1, tangents[k], tangents[k + 1], T)
+            rows = [self._row(r) for r in rows]
+            deriv = [self._row([i * v for v in rows[i]]) for i in range(1, len(rows))] if len(rows) > 1 else []
+            self._segments.append((knots[k], rows, deriv))
+
+    @staticmethod
+    def _hermite(p0, p1, m0, m1, T):
+        return [p0, m0,
+                [(3.0 * (b - a) - (2.0 * ma + mb) * T) / T ** 2 for a, b, ma, mb in zip(p0, p1, m0, m1)],
+                [(2.0 * (a - b) + (ma + mb) * T) / T ** 3 for a, b, ma, mb in zip(p0, p1, m0, m1)]]
+
+    @staticmethod
+    def _tangents(knots, values):
+        """Knot velocities: central differences inside, at rest at both ends."""
+        n = len(knots)
+        zero = [0.0] * len(values[0])
+        tangents = [zero]
+        for k in range(1, n - 1):
+            dt = knots[k + 1] - knots[k - 1]
+            if dt <= 0.0 or knots[k + 1] == knots[k] or knots[k] == knots[k - 1]:
+                # around a jump (zero-length keyframe) just stop at the knot
+                tangents.append(zero)
+                continue
+            tangents.append([(b - a) / dt for a, b in zip(values[k - 1], values[k + 1])])
+        tangents.append(zero)
+        return tangents
+
+    def _row(self, values):
+        return np.array(values, dtype=float) if self._np else list(values)
+
+    def _segment(self, tau):
+        k = bisect_left(self.knots, tau, 1) - 1
+        return min(k, len(self._segments) - 1)
+
+    def _horner(self, rows, u):
+        acc = rows[-1]
+        if self._np:
+            for row in reversed(rows[:-1]):
+                acc = row + u * acc
+            return acc
+        for row in reversed(rows[:-1]):
+            acc = [r + u * a for r, a in zip(row, acc)]
+        return acc
+
+    def sample(self, tau):
+        """Joint angles at tau seconds (clamped to the curve), in `names` order."""
+        if tau >= self.duration:
+            return self._final
+        start, rows, _ = self._segments[self._segment(tau)]
+        return self._horner(rows, max(0.0, tau - start))
+
+    def velocity(self, tau):
+        """Joint velocities (deg/s) at tau seconds, in `names` order."""
+        if tau >= self.duration or tau < 0.0:
+            return self._row([0.0] * len(self.names))
+        start, _, deriv = self._segments[self._segment(tau)]
+        if not deriv:
+            return self._row([0.0] * len(self.names))
+        return self._horner(deriv, tau - start)
+
+    def keyframe_at(self, tau):
+        """1-based keyframe index active at tau seconds."""
+        return max(1, min(self.n_keyframes, bisect_left(self.knots, tau, 1)))
+
+
+def compile_sequence(servo, poses, start_pose, control_hz, profile=LINEAR):
+    """
+    Sample a list of {duration, pose} keyframes at control_hz along the given
+    interpolation profile and convert every sample to PWM with the servo's
+    compiled calibration.
+    start_pose: {name: angle} for every joint in sequence_joints().
+    """
+    names = sequence_joints(servo, poses)
+    index = servo._servo_index
+    cols = [index[nm] for nm in names]
+    n_joints = len(names)
+    period = 1.0 / control_hz
+    curve = KeyframeCurve(names, poses, [start_pose[nm] for nm in names], profile)
+    duration = curve.duration
+
+    n_frames = max(1, int(math.ceil(duration / period - 1e-9)))
+    pwm = array("H", bytes(2 * n_frames * n_joints))
+    angles = array("d", bytes(8 * n_frames * n_joints))
+    pwm12_at = servo._pwm12_at
+    keyframe_ends = [0] * curve.n_keyframes
+    for frame in range(1, n_frames + 1):
+        tau = min(frame * period, duration)
+        keyframe_ends[curve.keyframe_at(tau) - 1] = frame
+        base = (frame - 1) * n_joints
+        for c, ang in enumerate(curve.sample(tau)):
+            angles[base + c] = ang
+            pwm[base + c] = pwm12_at(cols[c], ang)
+    # keyframes skipped between two frames end where the previous one did
+    for k in range(1, len(keyframe_ends)):
+        keyframe_ends[k] = max(keyframe_ends[k], keyframe_ends[k - 1])
+
+    return CompiledTrajectory(names, servo.board_groups(cols), pwm, angles,
+                              n_frames, period, duration, keyframe_ends)
+
+
+class TrajectoryCache:
+    """
+    Bounded LRU of CompiledTrajectory objects. Each entry remembers the keyframes
+    it was compiled from; a lookup with different keyframes under the same key
+    (e.g. a goal queued before a behavior was reloaded) recompiles instead of
+    returning the other trajectory.
+    """
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._items = OrderedDict()  # key -> (source keyframes, CompiledTrajectory)
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get_or_compile(self, key, compile_fn, source=None):
+        entry = self._items.get(key)
+        if entry is not None:
+            # same list object on the usual path; equal content covers goals rebuilt from messages
+            if entry[0] is source or entry[0] == source:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.stale += 1
+        self.misses += 1
+        traj = compile_fn()
+        self._items[key] = (source, traj)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+        return traj
+
+    def invalidate(self, cache_key=None):
+        """Drop everything, or only the entries compiled for `cache_key` (any start pose / rate)."""
+        if cache_key is None:
+            self._items.clear()
+            return
+        for key in [k for k in self._items if k[0] == cache_key]:
+            del self._items[key]
+
+    def stats(self):
+        return {"size": len(self._items), "maxsize": self.maxsize,
+                "hits": self.hits, "misses": self.misses, "stale": self.stale}